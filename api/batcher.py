@@ -0,0 +1,117 @@
+import asyncio
+import time
+from src import config
+from src.cache import canonical_key
+
+# --- MICRO-BATCHING DE PETICIONES ---
+# Las peticiones de un solo paciente que llegan dentro de una ventana corta se
+# agrupan en UNA llamada vectorizada al motor (preprocesamiento + 4 modelos) y
+# luego se reparte cada resultado a su llamador.
+
+
+class MicroBatcher:
+    """
+    Cola asíncrona que agrupa pacientes hasta `max_batch_size` o hasta que
+    pasan `max_wait_ms` desde el primero, lo que ocurra antes.
+    """
+
+    def __init__(self, engine, max_batch_size=config.API_MAX_BATCH_SIZE,
+                 max_wait_ms=config.API_MAX_WAIT_MS):
+        self.engine = engine
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue()
+        self.stats = {"requests": 0, "batches": 0, "max_batch": 0}
+        self._worker = None
+
+    def start(self):
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, patient):
+        """Encola un paciente y espera su resultado (dict de InferenceEngine.describe)."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((patient, future))
+        return await future
+
+    async def _collect(self):
+        """Espera el primer paciente y junta los que lleguen dentro de la ventana."""
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            patients = [patient for patient, _ in batch]
+
+            self.stats["requests"] += len(batch)
+            self.stats["batches"] += 1
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+
+            # La inferencia corre en un hilo para no bloquear el event loop
+            try:
+                results = await loop.run_in_executor(None, self._score, patients)
+            except Exception as e:
+                results = [e] * len(batch)
+
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def _score(self, patients):
+        """
+        Sirve desde la caché del motor los pacientes ya vistos y puntúa el resto
+        en una sola llamada; si falla, aísla al paciente con error.
+        """
+        engine = self.engine
+        keys = [canonical_key(patient, engine.fingerprint) for patient in patients]
+        rows = [engine.cache.get(key) for key in keys]
+        pending = [i for i, row in enumerate(rows) if row is None]
+
+        # Agrupamos por "firma" (campos y si son texto): mezclar pacientes con
+        # campos o tipos distintos cambiaría el tipo inferido de cada columna
+        groups = {}
+        for i in pending:
+            signature = tuple(sorted((k, isinstance(v, str)) for k, v in patients[i].items()))
+            groups.setdefault(signature, []).append(i)
+
+        if pending:
+            try:
+                for indexes in groups.values():
+                    scored = engine.predict_many([patients[i] for i in indexes])
+                    for i, row in zip(indexes, scored):
+                        rows[i] = row.copy()
+                        engine.cache.put(keys[i], rows[i])
+            except Exception:
+                # predict_one guarda en caché los que sí se pueden puntuar
+                results = []
+                for i, patient in enumerate(patients):
+                    try:
+                        results.append(engine.describe(rows[i]) if rows[i] is not None else engine.predict_one(patient))
+                    except Exception as e:
+                        results.append(e)
+                return results
+
+        return [engine.describe(row) for row in rows]
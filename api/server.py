@@ -0,0 +1,222 @@
+import argparse
+import asyncio
+import json
+import numpy as np
+from src import config, validation
+from src.engine import InferenceEngine
+from src.instrumentation import configure_json_logs, telemetry
+from src.registry import ServingEngine
+from api.batcher import MicroBatcher
+
+# --- SERVICIO HTTP DE PUNTUACIÓN (100% LOCAL) ---
+# Servidor HTTP/1.1 mínimo sobre asyncio (solo librería estándar) para
+# integraciones EHR. Usa los mismos artefactos que la app (src/config.py).
+#
+#   GET  /health          -> estado, micro-batching y contadores de la caché
+#   GET  /metrics         -> latencias por etapa y filas/s (texto de Prometheus)
+#   GET  /drift           -> deriva de las entradas recibidas vs data/02_interim
+#   GET  /registry        -> versión de modelos vigente, cambios y desacuerdo del modo sombra
+#   POST /predict         -> un paciente (dict con los 11 campos)
+#   POST /predict/batch   -> lista de pacientes, puntuada en una sola llamada
+#
+# Las entradas se validan contra config.INPUT_SCHEMA: un paciente inválido
+# responde 422 con sus rechazos; en un lote solo se puntúan los válidos
+# (resultado null en la posición de los rechazados + lista "rejected").
+#
+# Uso: python -m api.server --port 8000 --max-batch-size 64 --max-wait-ms 5
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 422: "Unprocessable Entity", 500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, details=None):
+        super().__init__(message)
+        self.status = status
+        self.details = details
+
+
+class ScoringServer:
+    """Atiende las conexiones HTTP y delega la inferencia al motor / micro-batcher."""
+
+    def __init__(self, engine, max_batch_size=config.API_MAX_BATCH_SIZE,
+                 max_wait_ms=config.API_MAX_WAIT_MS):
+        self.engine = engine
+        self.batcher = MicroBatcher(engine, max_batch_size, max_wait_ms)
+
+    # --- RUTAS ---
+
+    async def route(self, method, path, body):
+        if path == "/health":
+            if method != "GET":
+                raise HTTPError(405, "Usa GET")
+            return {
+                "status": "ok",
+                "models": self.engine.model_names,
+                "batching": self.batcher.stats,
+                "cache": self.engine.cache.stats(),
+                "version": self.engine.version,
+            }
+
+        if path == "/registry":
+            if method != "GET":
+                raise HTTPError(405, "Usa GET")
+            if not hasattr(self.engine, "status"):
+                raise HTTPError(404, "Motor sin registro de versiones")
+            return self.engine.status()
+
+        if path == "/metrics":
+            if method != "GET":
+                raise HTTPError(405, "Usa GET")
+            # Texto plano en formato Prometheus (no JSON)
+            return telemetry.prometheus_text()
+
+        if path == "/drift":
+            if method != "GET":
+                raise HTTPError(405, "Usa GET")
+            if self.engine.monitor is None:
+                raise HTTPError(404, "Monitor de deriva desactivado (sin perfil de referencia)")
+            return self.engine.monitor.report()
+
+        if path not in ("/predict", "/predict/batch"):
+            raise HTTPError(404, f"Ruta no encontrada: {path}")
+        if method != "POST":
+            raise HTTPError(405, "Usa POST")
+
+        try:
+            payload = json.loads(body or b"null")
+        except json.JSONDecodeError as e:
+            raise HTTPError(400, f"JSON inválido: {e}")
+
+        try:
+            if path == "/predict":
+                if not isinstance(payload, dict):
+                    raise HTTPError(400, "Se esperaba un objeto JSON con los datos del paciente")
+                check = validation.validate(payload)
+                if check.n_rejected:
+                    raise HTTPError(422, "Paciente inválido", check.records())
+                # Las peticiones concurrentes se agrupan en el micro-batcher (paciente ya normalizado)
+                return await self.batcher.submit(check.patient())
+
+            if not isinstance(payload, list) or not all(isinstance(p, dict) for p in payload):
+                raise HTTPError(400, "Se esperaba una lista JSON de pacientes")
+            if not payload:
+                return {"results": [], "rejected": []}
+            check = validation.validate(payload)
+            results = [None] * check.n_rows
+            if check.n_valid:
+                # El lote ya viene agrupado: una sola llamada vectorizada en un hilo (solo filas válidas)
+                rows = await asyncio.get_running_loop().run_in_executor(
+                    None, self.engine.predict_many, check.valid_columns()
+                )
+                for i, row in zip(np.flatnonzero(check.valid), rows):
+                    results[i] = self.engine.describe(row)
+            return {"results": results, "rejected": check.records()}
+        except HTTPError:
+            raise
+        except Exception as e:
+            raise HTTPError(422, f"No se pudo puntuar: {e}")
+
+    # --- PROTOCOLO HTTP ---
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                try:
+                    method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "Petición mal formada"}, keep_alive=False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    length = int(headers.get("content-length", 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, {"error": "Content-Length inválido"}, keep_alive=False)
+                    break
+                if length > config.API_MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {"error": "Cuerpo demasiado grande"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                try:
+                    status, payload = 200, await self.route(method, path.split("?", 1)[0], body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e)}
+                    if e.details is not None:
+                        payload["details"] = e.details
+                except Exception as e:
+                    status, payload = 500, {"error": str(e)}
+
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        if isinstance(payload, str):
+            body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body, content_type = json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8"
+        head = (
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def serve(self, host=config.API_HOST, port=config.API_PORT):
+        self.batcher.start()
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Servicio de puntuación escuchando en http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.batcher.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servicio HTTP local de predicción cardíaca")
+    parser.add_argument("--host", default=config.API_HOST)
+    parser.add_argument("--port", type=int, default=config.API_PORT)
+    parser.add_argument("--max-batch-size", type=int, default=config.API_MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=config.API_MAX_WAIT_MS)
+    parser.add_argument("--json-logs", action="store_true", help="Logs JSON de telemetría por etapa")
+    args = parser.parse_args()
+
+    if args.json_logs or config.TELEMETRY_LOG_PATH:
+        # Un evento JSON por etapa (a stderr o al archivo de src.config)
+        configure_json_logs(config.TELEMETRY_LOG_PATH)
+    # Además de GET /metrics, el archivo para el textfile collector de Prometheus
+    telemetry.start_export()
+
+    # Recarga en caliente: promover otra versión (python -m src.registry promote) no requiere reiniciar
+    server = ScoringServer(ServingEngine(InferenceEngine.load_default()).start(), args.max_batch_size, args.max_wait_ms)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
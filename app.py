@@ -1,8 +1,8 @@
 import streamlit as st
-from src import preprocessing, utils
+from src import config, preprocessing, utils
 
 # Importamos los nuevos módulos
-from src.tabs import diagnosis, performance, history, batch
+from src.tabs import diagnosis, performance, history, batch, developer
 
 # --- CONFIGURACIÓN DE PÁGINA ---
 st.set_page_config(
@@ -12,22 +12,18 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# NOTA: PARTE IMPORTANTE PARA QUE FUNCIONE EL TAB 3
-# INICIO TAB 3
-
-# --- INICIALIZAR ESTADO DE SESIÓN (HISTORIAL) ---
-if "history" not in st.session_state:
-    st.session_state["history"] = []
-
-# FIN TAB 3
-
 # --- CARGA DE ARTEFACTOS (El Motor) ---
 # Usamos la función con caché que fue creada en src/preprocessing.py
-artifacts = preprocessing.load_all_artifacts()
+# El motor de inferencia (src/engine.py) es dueño de modelos y transformadores
+engine = preprocessing.load_engine()
 
-if not artifacts:
+if not engine:
     st.stop() # Si falla la carga, detenemos la app aquí.
 
+# --- HISTORIAL (TAB 3) ---
+# Persistente en SQLite (src/history_store.py) y compartido entre sesiones
+history_store = preprocessing.load_history_store()
+
 # --- BARRA LATERAL (INPUTS) ---
 def sidebar_inputs():
     with st.sidebar:
@@ -56,65 +52,70 @@ def sidebar_inputs():
         st.markdown("---")
 
         # Formulario de pacientes
-
-        # --- Grupo 1: Paciente ---
-        st.caption("👤 DATOS DEL PACIENTE")
+        # Dentro de st.form los widgets no provocan reruns: los 11 campos se
+        # envían juntos al pulsar ANALIZAR RIESGO
+        # Rangos y opciones del esquema de validación (los mismos que la carga masiva)
+        schema = config.INPUT_SCHEMA
+        with st.form("patient_form", border=False):
+
+            # --- Grupo 1: Paciente ---
+            st.caption("👤 DATOS DEL PACIENTE")
         
-        # Agregamos key="Age"
-        age = st.slider("Edad", 20, 90, 50, key="Age")
+            # Agregamos key="Age"
+            age = st.slider("Edad", schema["Age"]["min"], schema["Age"]["max"], 50, key="Age")
         
-        # Agregamos key="Sex"
-        sex = st.radio("Sexo", ["M", "F"], horizontal=True, format_func=lambda x: "Masculino" if x == "M" else "Femenino", key="Sex")
+            # Agregamos key="Sex"
+            sex = st.radio("Sexo", schema["Sex"]["values"], horizontal=True, format_func=lambda x: "Masculino" if x == "M" else "Femenino", key="Sex")
 
-        st.markdown("---")
+            st.markdown("---")
 
-        # --- Grupo 2: Signos Vitales ---
-        st.caption("🩺 SIGNOS VITALES")
-        c1, c2 = st.columns(2)
+            # --- Grupo 2: Signos Vitales ---
+            st.caption("🩺 SIGNOS VITALES")
+            c1, c2 = st.columns(2)
         
-        # Agregamos key="RestingBP"
-        resting_bp = c1.number_input("Presión (BP)", 80, 200, 120, key="RestingBP")
+            # Agregamos key="RestingBP"
+            resting_bp = c1.number_input("Presión (BP)", schema["RestingBP"]["min"], schema["RestingBP"]["max"], 120, key="RestingBP")
         
-        # Agregamos key="Cholesterol"
-        cholesterol = c2.number_input("Colesterol", 80, 600, 200, key="Cholesterol")
+            # Agregamos key="Cholesterol"
+            cholesterol = c2.number_input("Colesterol", schema["Cholesterol"]["min"], schema["Cholesterol"]["max"], 200, key="Cholesterol")
         
-        # Agregamos key="FastingBS"
-        fasting_bs = st.selectbox("Glucemia > 120 mg/dl?", [0, 1], format_func=lambda x: "No (Normal)" if x==0 else "Sí (Alta)", key="FastingBS")
+            # Agregamos key="FastingBS"
+            fasting_bs = st.selectbox("Glucemia > 120 mg/dl?", list(range(schema["FastingBS"]["min"], schema["FastingBS"]["max"] + 1)), format_func=lambda x: "No (Normal)" if x==0 else "Sí (Alta)", key="FastingBS")
         
-        # Agregamos key="MaxHR"
-        max_hr = st.slider("Frecuencia Cardíaca Máx.", 60, 220, 150, key="MaxHR")
+            # Agregamos key="MaxHR"
+            max_hr = st.slider("Frecuencia Cardíaca Máx.", schema["MaxHR"]["min"], schema["MaxHR"]["max"], 150, key="MaxHR")
 
-        st.markdown("---")
+            st.markdown("---")
 
-        # --- Grupo 3: Evaluación Cardíaca ---
-        st.caption("💔 EVALUACIÓN CARDÍACA")
+            # --- Grupo 3: Evaluación Cardíaca ---
+            st.caption("💔 EVALUACIÓN CARDÍACA")
         
-        # Agregamos key="ChestPainType"
-        chest_pain = st.selectbox(
-            "Tipo de Dolor (ChestPain)", 
-            ["ASY", "NAP", "ATA", "TA"],
-            help="ASY: Asintomático | NAP: No Anginoso | ATA: Atípica | TA: Típica",
-            key="ChestPainType"
-        )
+            # Agregamos key="ChestPainType"
+            chest_pain = st.selectbox(
+                "Tipo de Dolor (ChestPain)", 
+                schema["ChestPainType"]["values"],
+                help="ASY: Asintomático | NAP: No Anginoso | ATA: Atípica | TA: Típica",
+                key="ChestPainType"
+            )
         
-        # Agregamos key="ExerciseAngina"
-        exercise_angina = st.checkbox("Angina por Ejercicio?", value=False, key="ExerciseAngina")
-        ex_angina_val = "Y" if exercise_angina else "N"
+            # Agregamos key="ExerciseAngina"
+            exercise_angina = st.checkbox("Angina por Ejercicio?", value=False, key="ExerciseAngina")
+            ex_angina_val = "Y" if exercise_angina else "N"
 
-        c3, c4 = st.columns(2)
+            c3, c4 = st.columns(2)
         
-        # Agregamos key="Oldpeak"
-        oldpeak = c3.number_input("Oldpeak", 0.0, 6.0, 0.0, step=0.1, key="Oldpeak")
+            # Agregamos key="Oldpeak"
+            oldpeak = c3.number_input("Oldpeak", schema["Oldpeak"]["min"], schema["Oldpeak"]["max"], 0.0, step=0.1, key="Oldpeak")
         
-        # Agregamos key="ST_Slope"
-        st_slope = c4.selectbox("Slope", ["Up", "Flat", "Down"], key="ST_Slope")
+            # Agregamos key="ST_Slope"
+            st_slope = c4.selectbox("Slope", schema["ST_Slope"]["values"], key="ST_Slope")
         
-        # Agregamos key="RestingECG"
-        resting_ecg = st.selectbox("ECG en Reposo", ["Normal", "ST", "LVH"], key="RestingECG")
+            # Agregamos key="RestingECG"
+            resting_ecg = st.selectbox("ECG en Reposo", schema["RestingECG"]["values"], key="RestingECG")
 
-        # Botón de Acción Principal
-        st.markdown("---")
-        analyze_btn = st.button("ANALIZAR RIESGO", type="primary", use_container_width=True)
+            # Botón de Acción Principal
+            st.markdown("---")
+            analyze_btn = st.form_submit_button("ANALIZAR RIESGO", type="primary", use_container_width=True)
 
         # Retornamos los datos en un diccionario limpio
         input_data = {
@@ -140,13 +141,24 @@ tab1, tab2, tab3, tab4 = st.tabs([
 # --- LÓGICA DE PESTAÑAS (Ahora modularizada) ---
 
 with tab1:
-    diagnosis.render(user_input, artifacts, is_analyzing)
+    diagnosis.render(user_input, engine, is_analyzing, history_store)
 
 with tab2:
-    performance.render(artifacts)
+    performance.render(engine)
 
 with tab3:
-    history.render()
+    history.render(history_store)
 
 with tab4:
-    batch.render(artifacts)
\ No newline at end of file
+    batch.render(engine)
+
+# --- PANEL DE DESARROLLADOR (?dev=1) ---
+# Latencias p50/p95/p99 por etapa (src/instrumentation.py), refrescadas en vivo
+if st.query_params.get("dev") == "1":
+    with st.expander("🛠️ Panel de Desarrollador: versión de modelos y latencia por etapa", expanded=True):
+        developer.render(engine)
+
+# --- PRECARGA EN SEGUNDO PLANO ---
+# Con la primera página ya dibujada, cargamos el resto de artefactos (modelos,
+# transformadores) en un hilo para que el primer análisis no espere la deserialización
+engine.preload_async()
@@ -0,0 +1,307 @@
+import argparse
+import functools
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+import numpy as np
+from src import config
+from src.engine import InferenceEngine
+from src.parallel import ParallelBatchExecutor
+from src.synthetic import SyntheticPatientGenerator
+
+# --- SUITE DE BENCHMARKS DE INFERENCIA ---
+# Mide, con pacientes sintéticos reproducibles ajustados a data/01_raw
+# (src/synthetic.py):
+#
+#   - Tiempo de carga de artefactos (proceso nuevo: imports + motor + precarga)
+#   - Latencia de un paciente por modelo y del consenso completo
+#     (preprocesamiento + 4 modelos), en p50/p99
+#   - Throughput de lote (filas/s) y memoria pico para 1k, 100k y 1M filas
+#   - Escalado del ejecutor paralelo (src/parallel.py): speedup medido contra
+#     el motor en serie con 1, 2, 4... workers (`scaling`)
+#
+# Los resultados se guardan en JSON. El modo `compare` falla (código 1) si
+# p50/p99 o el throughput empeoran más que el umbral respecto a una línea base.
+#
+# Uso: python -m src.benchmark run [--baseline base.json]
+#      python -m src.benchmark scaling [--rows 200000] [--workers 1 2 4]
+#      python -m src.benchmark compare actual.json base.json --threshold 0.2
+
+
+@functools.lru_cache(maxsize=1)
+def _generator():
+    return SyntheticPatientGenerator.fit()
+
+
+def synthetic_patients(n_rows, seed=config.BENCHMARK_SEED):
+    """Pacientes sintéticos reproducibles con las columnas de data/01_raw (src/synthetic.py)."""
+    return _generator().sample_frame(n_rows, seed)[config.REQUIRED_COLUMNS]
+
+
+def _percentiles(samples):
+    samples = np.asarray(samples) * 1e6
+    return {
+        "p50_us": float(np.percentile(samples, 50)),
+        "p99_us": float(np.percentile(samples, 99)),
+        "mean_us": float(samples.mean()),
+        "n": int(samples.size),
+    }
+
+
+def _time_calls(fn, inputs):
+    """Tiempo de cada llamada fn(x) para x en inputs (tras un calentamiento)."""
+    fn(inputs[0])
+    timings = np.empty(len(inputs))
+    for i, x in enumerate(inputs):
+        began = time.perf_counter()
+        fn(x)
+        timings[i] = time.perf_counter() - began
+    return timings
+
+
+# --- MEDICIONES ---
+
+_LOAD_PROBE = """
+import json, time
+began = time.perf_counter()
+from src.engine import InferenceEngine
+imported = time.perf_counter()
+engine = InferenceEngine.load_default()
+constructed = time.perf_counter()
+engine.preload()
+loaded = time.perf_counter()
+print(json.dumps({"import_seconds": imported - began, "construct_seconds": constructed - imported,
+                  "preload_seconds": loaded - constructed, "total_seconds": loaded - began}))
+"""
+
+
+def measure_load():
+    """Carga en frío en un proceso nuevo (sin módulos ni artefactos en memoria)."""
+    output = subprocess.run(
+        [sys.executable, "-c", _LOAD_PROBE], cwd=config.PROJECT_DIR,
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def measure_latency(engine, n_patients):
+    """Latencia por paciente (sin caché): cada modelo por separado y el consenso completo."""
+    records = synthetic_patients(n_patients, config.BENCHMARK_SEED + 1).to_dict("records")
+    rows = [engine.preprocess(patient) for patient in records]
+
+    latency = {
+        name: _percentiles(_time_calls(engine.models[name].predict_scores, rows))
+        for name in engine.model_names
+    }
+    latency["Preprocesamiento"] = _percentiles(_time_calls(engine.preprocess, records))
+    latency["Consenso"] = _percentiles(
+        _time_calls(lambda patient: engine.scorer.score(engine.preprocess(patient)), records)
+    )
+    return latency
+
+
+def measure_throughput(engine, sizes, repeats):
+    """Filas/s de predict_many (preprocesamiento + 4 modelos) y memoria pico por tamaño."""
+    results = {}
+    for n_rows in sizes:
+        frame = synthetic_patients(n_rows)
+        engine.predict_many(frame.head(1_000))
+
+        timings = []
+        for _ in range(repeats):
+            began = time.perf_counter()
+            engine.predict_many(frame)
+            timings.append(time.perf_counter() - began)
+
+        # Memoria pico en una pasada aparte (tracemalloc ralentiza la medición de tiempo)
+        tracemalloc.start()
+        engine.predict_many(frame)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        seconds = float(np.median(timings))
+        results[str(n_rows)] = {
+            "seconds": seconds,
+            "rows_per_sec": n_rows / seconds,
+            "peak_mb": peak / 2**20,
+        }
+    return results
+
+
+def _default_workers():
+    """1, 2, 4... hasta BATCH_WORKERS (incluido)."""
+    workers = [1]
+    while workers[-1] * 2 < config.BATCH_WORKERS:
+        workers.append(workers[-1] * 2)
+    return workers + [config.BATCH_WORKERS] if config.BATCH_WORKERS > 1 else workers
+
+
+def measure_scaling(engine, n_rows=config.BENCHMARK_SCALING_ROWS, workers=None,
+                    backend=config.BATCH_PARALLEL_BACKEND, repeats=3):
+    """
+    Speedup del ejecutor paralelo por número de workers: tiempo de predict_many
+    en serie / tiempo con el pool (medianas), junto al speedup que reporta el
+    propio ejecutor (CPU de las tareas / tiempo real).
+    """
+    frame = synthetic_patients(n_rows)
+    engine.predict_many(frame.head(1_000))
+
+    def median_seconds(fn):
+        timings = []
+        for _ in range(repeats):
+            began = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - began)
+        return float(np.median(timings))
+
+    serial = median_seconds(lambda: engine.predict_many(frame))
+    results = {"rows": n_rows, "backend": backend, "serial_seconds": serial, "workers": {}}
+    for n_workers in workers or _default_workers():
+        executor = ParallelBatchExecutor(engine, max_workers=n_workers, backend=backend)
+        try:
+            # El primer lote arranca los workers y carga los modelos en cada uno
+            executor.predict_many(frame.head(1_000))
+            reported = []
+
+            def predict():
+                executor.predict_many(frame)
+                reported.append(executor.last_report["speedup"])
+
+            seconds = median_seconds(predict)
+        finally:
+            executor.close()
+        results["workers"][str(n_workers)] = {
+            "seconds": seconds,
+            "speedup": serial / seconds,
+            "reported_speedup": float(np.median(reported)),
+        }
+    return results
+
+
+def _print_scaling(scaling):
+    print(f"Escalado ({scaling['rows']:,} filas, backend {scaling['backend']}, "
+          f"serie {scaling['serial_seconds']:.2f} s)")
+    print(f"{'workers':>8} {'s':>8} {'speedup':>9} {'reportado':>10}")
+    for n_workers, stats in scaling["workers"].items():
+        print(f"{n_workers:>8} {stats['seconds']:>8.2f} {stats['speedup']:>8.2f}x {stats['reported_speedup']:>9.2f}x")
+
+
+def run(sizes=config.BENCHMARK_BATCH_SIZES, n_patients=config.BENCHMARK_LATENCY_SAMPLES, repeats=3):
+    """Ejecuta la suite completa y retorna el reporte (dict serializable a JSON)."""
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "seed": config.BENCHMARK_SEED,
+        },
+        "load": measure_load(),
+    }
+
+    engine = InferenceEngine.load_default()
+    engine.preload()
+    report["meta"]["engine_version"] = engine.version
+    report["latency"] = measure_latency(engine, n_patients)
+    report["throughput"] = measure_throughput(engine, sizes, repeats)
+    report["memory"] = {"max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+    return report
+
+
+# --- COMPARACIÓN CONTRA LÍNEA BASE ---
+
+def compare(current, baseline, threshold=config.BENCHMARK_THRESHOLD):
+    """
+    Lista de regresiones (textos) de `current` respecto a `baseline`:
+    latencia p50/p99 mayor que base * (1 + threshold) o
+    throughput menor que base * (1 - threshold).
+    """
+    regressions = []
+    for name, base in baseline.get("latency", {}).items():
+        now = current.get("latency", {}).get(name)
+        if now is None:
+            continue
+        for key in ("p50_us", "p99_us"):
+            if now[key] > base[key] * (1 + threshold):
+                regressions.append(f"Latencia {name} {key}: {base[key]:.1f} -> {now[key]:.1f}")
+
+    for size, base in baseline.get("throughput", {}).items():
+        now = current.get("throughput", {}).get(size)
+        if now is not None and now["rows_per_sec"] < base["rows_per_sec"] * (1 - threshold):
+            regressions.append(
+                f"Throughput {size} filas: {base['rows_per_sec']:,.0f} -> {now['rows_per_sec']:,.0f} filas/s"
+            )
+    return regressions
+
+
+def _print_report(report):
+    load = report["load"]
+    print(f"Carga en frío: {load['total_seconds']:.2f} s (imports {load['import_seconds']:.2f} s, "
+          f"precarga {load['preload_seconds']:.2f} s)")
+    print(f"\n{'Latencia (1 paciente)':<26} {'p50 µs':>10} {'p99 µs':>10}")
+    for name, stats in report["latency"].items():
+        print(f"{name:<26} {stats['p50_us']:>10.1f} {stats['p99_us']:>10.1f}")
+    print(f"\n{'Lote (filas)':<26} {'filas/s':>12} {'pico MB':>10}")
+    for size, stats in report["throughput"].items():
+        print(f"{int(size):<26,} {stats['rows_per_sec']:>12,.0f} {stats['peak_mb']:>10.1f}")
+
+
+def _check(current, baseline_path, threshold):
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)
+    regressions = compare(current, baseline, threshold)
+    for line in regressions:
+        print(f"REGRESIÓN: {line}")
+    if regressions:
+        raise SystemExit(1)
+    print(f"Sin regresiones respecto a {baseline_path} (umbral {threshold:.0%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de inferencia")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_parser = sub.add_parser("run", help="Ejecuta la suite y guarda el JSON")
+    run_parser.add_argument("--output", default=str(config.BENCHMARK_PATH))
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=list(config.BENCHMARK_BATCH_SIZES))
+    run_parser.add_argument("--samples", type=int, default=config.BENCHMARK_LATENCY_SAMPLES)
+    run_parser.add_argument("--repeats", type=int, default=3)
+    run_parser.add_argument("--baseline", default=None, help="JSON base para comparar al terminar")
+    run_parser.add_argument("--threshold", type=float, default=config.BENCHMARK_THRESHOLD)
+    compare_parser = sub.add_parser("compare", help="Compara dos reportes JSON")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("--threshold", type=float, default=config.BENCHMARK_THRESHOLD)
+    scaling_parser = sub.add_parser("scaling", help="Speedup del ejecutor paralelo contra el motor en serie")
+    scaling_parser.add_argument("--rows", type=int, default=config.BENCHMARK_SCALING_ROWS)
+    scaling_parser.add_argument("--workers", type=int, nargs="+", default=None)
+    scaling_parser.add_argument("--backend", choices=("process", "thread"), default=config.BATCH_PARALLEL_BACKEND)
+    args = parser.parse_args()
+
+    if args.command == "scaling":
+        engine = InferenceEngine.load_default()
+        engine.preload()
+        _print_scaling(measure_scaling(engine, args.rows, args.workers, args.backend))
+        return
+
+    if args.command == "compare":
+        with open(args.current, "r") as f:
+            current = json.load(f)
+        _check(current, args.baseline, args.threshold)
+        return
+
+    report = run(args.sizes, args.samples, args.repeats)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=1)
+    _print_report(report)
+    print(f"\nReporte guardado en {args.output}")
+    if args.baseline:
+        _check(report, args.baseline, args.threshold)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import shutil
+from datetime import datetime
+from pathlib import Path
+from src import config
+from src.compiled import compile_model
+
+# --- BUNDLE DE ARTEFACTOS VERSIONADO Y MAPEADO EN MEMORIA ---
+# Empaqueta los 4 modelos, scaler, imputer, features y metrics.json en UN
+# directorio versionado:
+#
+#   artefacts/bundles/<versión>/
+#       manifest.json       -> versión, métricas, índice de buffers y checksums SHA-256
+#       objects/NN.pkl      -> estructura de cada objeto (pickle protocolo 5)
+#       arrays.bin          -> arrays NumPy grandes (nodos, vectores soporte, coeficientes)
+#
+# Los arrays se guardan fuera del pickle ("out-of-band"), alineados a 64 bytes,
+# y al cargar se leen con mmap de solo lectura: los procesos que cargan el
+# mismo bundle comparten esas páginas a través del page cache del sistema.
+# Cada objeto (modelo, scaler, imputer, features) se puede cargar por separado.
+# Junto a cada estimador se guarda su evaluador nativo ("compiled:<nombre>",
+# src/compiled.py), que es lo que carga el motor: así los arrays con los que
+# se predice son los del mmap y no una copia privada de cada proceso.
+#
+# Uso: python -m src.bundle export   |   python -m src.bundle verify
+
+BUNDLE_FORMAT = 2
+_ALIGNMENT = 64
+_MANIFEST = "manifest.json"
+_OBJECTS_DIR = "objects"
+_ARRAYS = "arrays.bin"
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_sources():
+    """Lee los artefactos sueltos actuales (los mismos que usa InferenceEngine)."""
+    artifacts = {"models": {}}
+    for name, path in config.MODEL_FILES.items():
+        with open(path, "rb") as f:
+            artifacts["models"][name] = pickle.load(f)
+    for key, path in (("scaler", config.SCALER_PATH), ("imputer", config.IMPUTER_PATH),
+                      ("features_names", config.FEATURES_PATH)):
+        with open(path, "rb") as f:
+            artifacts[key] = pickle.load(f)
+    with open(config.METRICS_PATH, "r") as f:
+        artifacts["metrics"] = json.load(f)
+    return artifacts
+
+
+def export_bundle(artifacts=None, bundles_dir=config.BUNDLES_DIR, version=None, make_current=True):
+    """
+    Escribe un bundle nuevo con los artefactos dados (por defecto, los de src.config).
+    Retorna la ruta del bundle creado.
+    """
+    artifacts = artifacts if artifacts is not None else load_sources()
+    version = version or datetime.now().strftime("%Y%m%d-%H%M%S")
+    bundles_dir = Path(bundles_dir)
+    target = bundles_dir / version
+    staging = bundles_dir / f".{version}.tmp"
+    if target.exists():
+        raise FileExistsError(f"Ya existe el bundle {target}")
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir(parents=True)
+
+    # Claves de objeto: "model:<nombre>", "scaler", "imputer", "features_names"
+    entries = {f"model:{name}": model for name, model in artifacts["models"].items()}
+    entries.update({f"compiled:{name}": compile_model(model) for name, model in artifacts["models"].items()})
+    entries.update({key: artifacts[key] for key in ("scaler", "imputer", "features_names")})
+    if artifacts.get("refresh_state") is not None:
+        # Estadísticos del re-entrenamiento incremental (src/refresh.py)
+        entries["refresh_state"] = artifacts["refresh_state"]
+    (staging / _OBJECTS_DIR).mkdir()
+
+    objects = {}
+    with open(staging / _ARRAYS, "wb") as arrays:
+        for i, (key, obj) in enumerate(entries.items()):
+            # Pickle protocolo 5: los arrays contiguos salen como buffers separados
+            buffers = []
+            payload = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+            filename = f"{_OBJECTS_DIR}/{i:02d}.pkl"
+            (staging / filename).write_bytes(payload)
+
+            index = []
+            for buffer in buffers:
+                raw = buffer.raw()
+                arrays.write(b"\0" * (-arrays.tell() % _ALIGNMENT))
+                index.append([arrays.tell(), raw.nbytes])
+                arrays.write(raw)
+            objects[key] = {"file": filename, "buffers": index}
+
+    files = [_ARRAYS] + [entry["file"] for entry in objects.values()]
+    manifest = {
+        "format": BUNDLE_FORMAT,
+        "version": version,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "models": list(artifacts["models"]),
+        "features_names": list(artifacts["features_names"]),
+        "metrics": artifacts["metrics"],
+        "lineage": artifacts.get("lineage"),
+        "objects": objects,
+        "files": {
+            name: {"sha256": _sha256(staging / name), "bytes": (staging / name).stat().st_size}
+            for name in files
+        },
+    }
+    with open(staging / _MANIFEST, "w") as f:
+        json.dump(manifest, f, indent=1)
+
+    # Publicación atómica: el directorio final aparece completo o no aparece
+    os.replace(staging, target)
+    if make_current:
+        set_current(version, bundles_dir)
+    return target
+
+
+def set_current(version, bundles_dir=config.BUNDLES_DIR):
+    """Apunta CURRENT a una versión (escritura atómica)."""
+    pointer = Path(bundles_dir) / "CURRENT"
+    tmp = pointer.with_suffix(".tmp")
+    tmp.write_text(version)
+    os.replace(tmp, pointer)
+
+
+def current_bundle(bundles_dir=config.BUNDLES_DIR):
+    """Ruta del bundle vigente (según CURRENT) o None si no hay ninguno."""
+    pointer = Path(bundles_dir) / "CURRENT"
+    if not pointer.exists():
+        return None
+    path = Path(bundles_dir) / pointer.read_text().strip()
+    return path if path.is_dir() else None
+
+
+def read_manifest(bundle_dir):
+    with open(Path(bundle_dir) / _MANIFEST, "r") as f:
+        return json.load(f)
+
+
+def verify_bundle(bundle_dir):
+    """Comprueba los checksums del manifest. Lanza ValueError si alguno no coincide."""
+    bundle_dir = Path(bundle_dir)
+    manifest = read_manifest(bundle_dir)
+    if manifest.get("format") != BUNDLE_FORMAT:
+        raise ValueError(f"Formato de bundle no soportado: {manifest.get('format')}")
+    for name, expected in manifest["files"].items():
+        if _sha256(bundle_dir / name) != expected["sha256"]:
+            raise ValueError(f"Checksum inválido en {bundle_dir / name}")
+    return manifest
+
+
+class BundleReader:
+    """
+    Acceso granular a un bundle: el manifest (métricas, nombres) se lee al abrir
+    y cada objeto se deserializa solo cuando se pide. arrays.bin se mapea una vez.
+    """
+
+    def __init__(self, bundle_dir, verify=True):
+        self.bundle_dir = Path(bundle_dir)
+        self.manifest = verify_bundle(self.bundle_dir) if verify else read_manifest(self.bundle_dir)
+        self.version = self.manifest["version"]
+        self.fingerprint = hashlib.sha256(
+            "".join(self.manifest["files"][name]["sha256"] for name in sorted(self.manifest["files"])).encode()
+        ).hexdigest()
+        self._view = None
+
+    @property
+    def model_names(self):
+        return list(self.manifest["models"])
+
+    @property
+    def metrics(self):
+        return self.manifest["metrics"]
+
+    def _arrays(self):
+        if self._view is None:
+            with open(self.bundle_dir / _ARRAYS, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+            self._view = memoryview(mapped)
+        return self._view
+
+    def load(self, key):
+        """Deserializa un objeto ("model:<nombre>", "scaler", "imputer", "features_names")."""
+        entry = self.manifest["objects"][key]
+        view = self._arrays()
+        buffers = [view[offset:offset + nbytes] for offset, nbytes in entry["buffers"]]
+        return pickle.loads((self.bundle_dir / entry["file"]).read_bytes(), buffers=buffers)
+
+    def load_compiled(self, name):
+        """
+        Evaluador nativo del modelo. Los bundles exportados antes de guardar
+        "compiled:<nombre>" se compilan al cargar (arrays privados del proceso).
+        """
+        if f"compiled:{name}" in self.manifest["objects"]:
+            return self.load(f"compiled:{name}")
+        return compile_model(self.load(f"model:{name}"))
+
+
+def load_bundle(bundle_dir, verify=True):
+    """
+    Carga un bundle completo. Los arrays apuntan directamente al mmap de solo lectura de arrays.bin.
+    Retorna el diccionario de artefactos (models, scaler, imputer, features_names, metrics,
+    y refresh_state/lineage si los tiene) más 'fingerprint' (huella de contenido) y 'version'.
+    """
+    reader = BundleReader(bundle_dir, verify)
+    artifacts = {"models": {name: reader.load(f"model:{name}") for name in reader.model_names}}
+    for key in ("scaler", "imputer", "features_names"):
+        artifacts[key] = reader.load(key)
+    if "refresh_state" in reader.manifest["objects"]:
+        artifacts["refresh_state"] = reader.load("refresh_state")
+    artifacts["metrics"] = reader.metrics
+    artifacts["lineage"] = reader.manifest.get("lineage")
+    artifacts["version"] = reader.version
+    artifacts["fingerprint"] = reader.fingerprint
+    return artifacts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bundle versionado de artefactos")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="Empaqueta los artefactos actuales de src.config")
+    export.add_argument("--version", default=None)
+    export.add_argument("--no-current", action="store_true", help="No actualizar CURRENT")
+    verify = sub.add_parser("verify", help="Verifica los checksums de un bundle")
+    verify.add_argument("path", nargs="?", default=None)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        path = export_bundle(version=args.version, make_current=not args.no_current)
+        print(f"Bundle exportado en {path}")
+    else:
+        path = args.path or current_bundle()
+        if path is None:
+            parser.error("No hay bundle vigente (CURRENT)")
+        manifest = verify_bundle(path)
+        n_arrays = sum(len(entry["buffers"]) for entry in manifest["objects"].values())
+        print(f"Bundle {manifest['version']} OK ({len(manifest['objects'])} objetos, {n_arrays} arrays)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+# --- CACHÉ DE RESULTADOS DE PREDICCIÓN ---
+# Caché LRU con expiración (TTL) para los resultados del ensamble.
+# La clave combina la huella de contenido de los artefactos (.pkl) y el
+# paciente normalizado: si cambia cualquier artefacto, la clave cambia y las
+# entradas anteriores dejan de usarse (y terminan expulsadas por LRU/TTL).
+
+
+def _normalize_value(value):
+    """Normaliza un campo: números -> float, NaN/None -> None, texto sin cambios."""
+    if value is None:
+        return None
+    if isinstance(value, (bool, int, float, np.bool_, np.number)):
+        value = float(value)
+        return None if math.isnan(value) else value
+    return str(value)
+
+
+def canonical_key(patient, fingerprint):
+    """
+    Clave canónica de un paciente (dict del formulario, ver app.sidebar_inputs).
+    Incluye todos los campos (ordenados) porque cualquiera afecta el preprocesamiento.
+    """
+    fields = tuple(sorted((name, _normalize_value(v)) for name, v in patient.items()))
+    return fingerprint, fields
+
+
+class PredictionCache:
+    """
+    LRU acotado a `max_entries` con TTL de `ttl_seconds`.
+    Seguro entre hilos (las sesiones de Streamlit comparten el motor).
+    """
+
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.batch_rows = 0
+        self.batch_duplicates = 0
+
+    def get(self, key):
+        """Retorna el valor guardado o None (cuenta acierto/fallo)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, stored_at = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def record_batch(self, n_rows, n_unique):
+        """Registra cuántas filas de un lote eran duplicadas (deduplicación previa)."""
+        with self._lock:
+            self.batch_rows += n_rows
+            self.batch_duplicates += n_rows - n_unique
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Contadores para monitoreo (API /health, panel de desarrollo)."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "batch_rows": self.batch_rows,
+                "batch_duplicates": self.batch_duplicates,
+            }
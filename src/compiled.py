@@ -0,0 +1,544 @@
+import argparse
+import json
+import time
+from pathlib import Path
+import numpy as np
+from src import config
+from src.ensemble import EnsembleScorer, platt_probability, score_model
+
+# --- EVALUADORES NATIVOS (SOLO NUMPY) ---
+# Convierte los estimadores entrenados (.pkl de src.config) en evaluadores
+# compactos que no dependen de scikit-learn al predecir:
+#
+#   - Árbol / Random Forest -> nodos aplanados en arrays, recorrido vectorizado
+#   - Regresión Logística   -> producto punto + sigmoide
+#   - SVC (RBF)             -> kernel con normas precalculadas + escalado de Platt
+#   - SVC (lineal)          -> w = dual_coef · SV precalculado + escalado de Platt
+#
+# Para una fila, la validación de entrada de sklearn cuesta más que la
+# matemática de estos modelos de 15 features. Los resultados coinciden con
+# predict/predict_proba (diferencia < 1e-9).
+#
+# Modo compacto: con X en float32 la regresión logística y el kernel del SVC
+# también operan en float32 (mitad de ancho de banda); los árboles ya comparan
+# en float32, así que sus resultados no cambian. `python -m src.compiled check`
+# cuenta las predicciones que cambian respecto a float64.
+#
+# Persistencia: cada array (incluidas las copias float32 y normas derivadas) es
+# un .npy sin comprimir que se abre con mmap de solo lectura, así que los
+# procesos que cargan los mismos compilados comparten esas páginas a través
+# del page cache del sistema.
+#
+# Uso: python -m src.compiled build   |   python -m src.compiled bench   |   python -m src.compiled check
+
+_FORMAT = 2
+_MANIFEST = "manifest.json"
+_PLAN = "preprocessing"
+
+# Celdas por bloque (acotan las matrices filas x árboles y filas x vectores soporte)
+_TREE_BLOCK_CELLS = 1 << 16
+_KERNEL_BLOCK_CELLS = 1 << 20
+
+
+def _expit(x):
+    with np.errstate(over="ignore"):
+        return 1.0 / (1.0 + np.exp(-x))
+
+
+class CompiledModel:
+    """Interfaz común: predict_scores(X) -> (clases, P(clase 1)), igual que ensemble.score_model."""
+
+    kind = None
+    # Atributos que __init__ calcula a partir de los parámetros; se guardan
+    # con ellos para que al cargar también apunten al mmap
+    derived = ()
+
+    def predict_scores(self, X):
+        raise NotImplementedError
+
+    def arrays(self):
+        """Parámetros y atributos derivados como dict de arrays (un .npy por clave)."""
+        raise NotImplementedError
+
+
+class CompiledTrees(CompiledModel):
+    """
+    Uno o varios árboles de decisión con todos los nodos en arrays contiguos.
+    Los nodos se renumeran para que los dos hijos queden juntos: el siguiente
+    nodo es first_child + (x > umbral). Las hojas apuntan a sí mismas con
+    umbral +inf, así que basta iterar `max_depth` niveles sin ramas por fila.
+    """
+
+    kind = "trees"
+    derived = ("threshold32",)
+
+    def __init__(self, classes, feature, threshold, first_child, value, roots, max_depth):
+        self.classes = np.asarray(classes)
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.first_child = np.asarray(first_child, dtype=np.intp)
+        self.value = np.asarray(value, dtype=np.float64)  # (n_nodos, n_clases), normalizado
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.max_depth = int(max_depth)
+
+        # Umbral float32 redondeado hacia abajo: para x float32, x > t32 <=> x > umbral
+        # (exacto), y la comparación se hace sin convertir X a float64
+        self.threshold32 = self.threshold.astype(np.float32)
+        above = self.threshold32 > self.threshold
+        self.threshold32[above] = np.nextafter(self.threshold32[above], np.float32(-np.inf))
+
+    @classmethod
+    def from_estimators(cls, estimators, classes):
+        feature, threshold, first_child, value, roots = [], [], [], [], []
+        offset, max_depth = 0, 0
+        for estimator in estimators:
+            tree = estimator.tree_
+
+            # Renumeración en anchura: los hijos de cada nodo interno son consecutivos
+            order, new_id = [0], {0: 0}
+            for node in order:
+                if tree.children_left[node] >= 0:
+                    for child in (tree.children_left[node], tree.children_right[node]):
+                        new_id[child] = len(order)
+                        order.append(child)
+            order = np.array(order)
+            is_leaf = tree.children_left[order] < 0
+            ids = np.arange(order.size)
+            children = np.array([new_id[c] if c >= 0 else 0 for c in tree.children_left[order]])
+
+            feature.append(np.where(is_leaf, 0, tree.feature[order]))
+            threshold.append(np.where(is_leaf, np.inf, tree.threshold[order]))
+            first_child.append(np.where(is_leaf, ids, children) + offset)
+
+            # Igual que DecisionTreeClassifier.predict_proba: valores normalizados por nodo
+            node_value = tree.value[order, 0, :].astype(np.float64)
+            normalizer = node_value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            value.append(node_value / normalizer)
+
+            roots.append(offset)
+            offset += order.size
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(classes, np.concatenate(feature), np.concatenate(threshold),
+                   np.concatenate(first_child), np.concatenate(value), roots, max_depth)
+
+    def leaves(self, XT):
+        """
+        Hoja alcanzada en cada árbol: (n_árboles, n_filas).
+        XT es la entrada en float32 y por features: (n_features, n_filas).
+        """
+        n_rows = XT.shape[1]
+        flat = XT.reshape(-1)
+        columns = np.arange(n_rows)
+        node = np.repeat(self.roots[:, None], n_rows, axis=1)
+        for _ in range(self.max_depth):
+            x = flat.take(self.feature.take(node) * n_rows + columns)
+            node = self.first_child.take(node) + (x > self.threshold32.take(node))
+        return node
+
+    def predict_proba(self, X):
+        # sklearn evalúa los árboles sobre X en float32
+        XT = np.asarray(X, dtype=np.float32).T
+        n_rows, n_trees = XT.shape[1], self.roots.size
+        proba = np.empty((n_rows, self.value.shape[1]))
+        block = max(1, _TREE_BLOCK_CELLS // n_trees)
+
+        for start in range(0, n_rows, block):
+            leaves = self.leaves(np.ascontiguousarray(XT[:, start:start + block]))
+            # Reducción sobre el eje 0: suma árbol por árbol, en el orden de RandomForestClassifier
+            self.value.take(leaves, axis=0).sum(axis=0, out=proba[start:start + block])
+        if n_trees > 1:
+            proba /= n_trees
+        return proba
+
+    def predict_scores(self, X):
+        proba = self.predict_proba(X)
+        return self.classes.take(proba.argmax(axis=1)), proba[:, 1]
+
+    def arrays(self):
+        return {
+            "classes": self.classes, "feature": self.feature, "threshold": self.threshold,
+            "first_child": self.first_child, "value": self.value,
+            "roots": self.roots, "max_depth": np.array(self.max_depth), "threshold32": self.threshold32,
+        }
+
+
+class CompiledLogistic(CompiledModel):
+    """Regresión logística binaria: sigmoide(X · w + b)."""
+
+    kind = "logistic"
+    derived = ("coef32",)
+
+    def __init__(self, classes, coef, intercept):
+        self.classes = np.asarray(classes)
+        self.coef = np.asarray(coef, dtype=np.float64).reshape(-1)
+        self.intercept = float(np.asarray(intercept).reshape(-1)[0])
+        self.coef32 = self.coef.astype(np.float32)
+
+    @classmethod
+    def from_estimator(cls, model):
+        return cls(model.classes_, model.coef_, model.intercept_)
+
+    def predict_scores(self, X):
+        if X.dtype == np.float32:
+            p1 = _expit(X @ self.coef32 + np.float32(self.intercept))
+        else:
+            p1 = _expit(X @ self.coef + self.intercept)
+        # Mismo desempate que argmax([1 - p, p])
+        labels = self.classes.take((p1 > 1 - p1).astype(np.intp))
+        return labels, p1
+
+    def arrays(self):
+        return {"classes": self.classes, "coef": self.coef, "intercept": np.array(self.intercept),
+                "coef32": self.coef32}
+
+
+class CompiledSVC(CompiledModel):
+    """
+    SVC con kernel RBF: K(x, sv) = exp(-gamma * (|x|² + |sv|² - 2 x·sv)),
+    con |sv|² precalculado. Probabilidad con el Platt de libsvm (src/ensemble.py).
+    """
+
+    kind = "svc"
+    derived = ("sv_norms", "support_vectors32", "sv_norms32", "dual_coef32")
+
+    def __init__(self, classes, support_vectors, dual_coef, intercept, gamma, prob_a, prob_b):
+        self.classes = np.asarray(classes)
+        self.support_vectors = np.ascontiguousarray(support_vectors, dtype=np.float64)
+        self.dual_coef = np.asarray(dual_coef, dtype=np.float64).reshape(-1)
+        self.intercept = float(np.asarray(intercept).reshape(-1)[0])
+        self.gamma = float(gamma)
+        self.prob_a = float(prob_a)
+        self.prob_b = float(prob_b)
+        self.sv_norms = np.einsum("ij,ij->i", self.support_vectors, self.support_vectors)
+        self.support_vectors32 = self.support_vectors.astype(np.float32)
+        self.sv_norms32 = self.sv_norms.astype(np.float32)
+        self.dual_coef32 = self.dual_coef.astype(np.float32)
+
+    @classmethod
+    def from_estimator(cls, model):
+        if model.kernel != "rbf":
+            raise ValueError(f"Kernel no soportado para compilar: {model.kernel}")
+        return cls(model.classes_, model.support_vectors_, model.dual_coef_, model.intercept_,
+                   model._gamma, model.probA_[0], model.probB_[0])
+
+    def decision_function(self, X):
+        # float32 (modo compacto): kernel, decisión y Platt en float32; si no, todo en float64
+        if X.dtype == np.float32:
+            sv, sv_norms, dual_coef, gamma = (self.support_vectors32, self.sv_norms32,
+                                              self.dual_coef32, np.float32(self.gamma))
+        else:
+            X = np.asarray(X, dtype=np.float64)
+            sv, sv_norms, dual_coef, gamma = self.support_vectors, self.sv_norms, self.dual_coef, self.gamma
+        decision = np.empty(X.shape[0], dtype=sv.dtype)
+        block = max(1, _KERNEL_BLOCK_CELLS // sv.shape[0])
+
+        for start in range(0, X.shape[0], block):
+            Xb = X[start:start + block]
+            sq_dist = np.einsum("ij,ij->i", Xb, Xb)[:, None] + sv_norms - 2 * (Xb @ sv.T)
+            np.maximum(sq_dist, 0, out=sq_dist)
+            kernel = np.exp(-gamma * sq_dist, out=sq_dist)
+            decision[start:start + block] = kernel @ dual_coef + self.intercept
+        return decision
+
+    def predict_scores(self, X):
+        decision = self.decision_function(X)
+        labels = self.classes.take((decision >= 0).astype(np.intp))
+        return labels, platt_probability(decision, self.prob_a, self.prob_b)
+
+    def arrays(self):
+        return {
+            "classes": self.classes, "support_vectors": self.support_vectors,
+            "dual_coef": self.dual_coef, "intercept": np.array(self.intercept),
+            "gamma": np.array(self.gamma), "prob_a": np.array(self.prob_a), "prob_b": np.array(self.prob_b),
+            "sv_norms": self.sv_norms, "support_vectors32": self.support_vectors32,
+            "sv_norms32": self.sv_norms32, "dual_coef32": self.dual_coef32,
+        }
+
+
+class CompiledLinearSVC(CompiledModel):
+    """
+    SVC con kernel lineal: la suma sobre los vectores soporte se reduce a un
+    único vector de pesos (w = dual_coef · SV), así que decision = X · w + b.
+    Probabilidad con el Platt de libsvm, igual que CompiledSVC.
+    """
+
+    kind = "linear_svc"
+    derived = ("coef32",)
+
+    def __init__(self, classes, coef, intercept, prob_a, prob_b):
+        self.classes = np.asarray(classes)
+        self.coef = np.asarray(coef, dtype=np.float64).reshape(-1)
+        self.intercept = float(np.asarray(intercept).reshape(-1)[0])
+        self.prob_a = float(prob_a)
+        self.prob_b = float(prob_b)
+        self.coef32 = self.coef.astype(np.float32)
+
+    @classmethod
+    def from_estimator(cls, model):
+        coef = np.asarray(model.dual_coef_, dtype=np.float64) @ np.asarray(model.support_vectors_, dtype=np.float64)
+        return cls(model.classes_, coef, model.intercept_, model.probA_[0], model.probB_[0])
+
+    def decision_function(self, X):
+        if X.dtype == np.float32:
+            return X @ self.coef32 + np.float32(self.intercept)
+        return np.asarray(X, dtype=np.float64) @ self.coef + self.intercept
+
+    def predict_scores(self, X):
+        decision = self.decision_function(X)
+        labels = self.classes.take((decision >= 0).astype(np.intp))
+        return labels, platt_probability(decision, self.prob_a, self.prob_b)
+
+    def arrays(self):
+        return {
+            "classes": self.classes, "coef": self.coef, "intercept": np.array(self.intercept),
+            "prob_a": np.array(self.prob_a), "prob_b": np.array(self.prob_b), "coef32": self.coef32,
+        }
+
+
+_KINDS = {cls.kind: cls for cls in (CompiledTrees, CompiledLogistic, CompiledSVC, CompiledLinearSVC)}
+
+
+def compile_model(model):
+    """
+    Convierte un estimador de scikit-learn en su evaluador nativo.
+    Lanza ValueError si el tipo de modelo no está soportado.
+    """
+    if isinstance(model, CompiledModel):
+        return model
+    if len(getattr(model, "classes_", ())) != 2:
+        raise ValueError("Solo se compilan clasificadores binarios")
+
+    if hasattr(model, "estimators_") and all(hasattr(e, "tree_") for e in model.estimators_):
+        return CompiledTrees.from_estimators(model.estimators_, model.classes_)
+    if hasattr(model, "tree_"):
+        return CompiledTrees.from_estimators([model], model.classes_)
+    if hasattr(model, "support_vectors_") and getattr(model, "probability", False):
+        # La búsqueda de src/train.py prueba kernel lineal y RBF
+        if model.kernel == "linear":
+            return CompiledLinearSVC.from_estimator(model)
+        return CompiledSVC.from_estimator(model)
+    if hasattr(model, "coef_") and hasattr(model, "predict_proba"):
+        return CompiledLogistic.from_estimator(model)
+    raise ValueError(f"Modelo no soportado para compilar: {type(model).__name__}")
+
+
+# --- PERSISTENCIA (.npy sin comprimir, sin pickle) ---
+
+def _model_dirname(name):
+    return "model_" + name.lower().replace(" ", "_")
+
+
+def _save_arrays(directory, arrays):
+    """Un .npy por array dentro de `directory` (np.save no comprime: se puede mapear)."""
+    directory.mkdir(parents=True, exist_ok=True)
+    for stale in directory.glob("*.npy"):
+        stale.unlink()
+    for key, array in arrays.items():
+        np.save(directory / f"{key}.npy", np.asarray(array), allow_pickle=False)
+
+
+def _load_arrays(directory):
+    """Arrays de `directory` mapeados en solo lectura (comparten el page cache entre procesos)."""
+    # np.asarray: vista ndarray del memmap (sin el coste de la subclase al indexar)
+    return {path.stem: np.asarray(np.load(path, mmap_mode="r", allow_pickle=False))
+            for path in sorted(Path(directory).glob("*.npy"))}
+
+
+def save_compiled(models, plan, fingerprint, compiled_dir=config.COMPILED_DIR):
+    """
+    Guarda los evaluadores y el plan de preprocesamiento: un directorio por
+    modelo con un .npy por array.
+    `fingerprint` es la huella de los .pkl de origen (InferenceEngine.fingerprint):
+    si los .pkl cambian, los compilados dejan de usarse.
+    """
+    compiled_dir = Path(compiled_dir)
+    compiled_dir.mkdir(parents=True, exist_ok=True)
+
+    files = {}
+    for name, model in models.items():
+        files[name] = _model_dirname(name)
+        _save_arrays(compiled_dir / files[name], {"kind": np.array(model.kind), **model.arrays()})
+
+    _save_arrays(compiled_dir / _PLAN, {"features_names": np.array(plan.features_names),
+                                        "medians": plan.medians, "mean": plan.mean, "scale": plan.scale})
+
+    with open(compiled_dir / _MANIFEST, "w") as f:
+        json.dump({"format": _FORMAT, "fingerprint": fingerprint, "models": files}, f, indent=1)
+    return compiled_dir
+
+
+def load_model(path):
+    """Evaluador guardado por save_compiled; sus arrays (también los derivados) apuntan al mmap."""
+    arrays = _load_arrays(path)
+    cls = _KINDS[str(arrays.pop("kind"))]
+    derived = {key: arrays.pop(key) for key in cls.derived if key in arrays}
+    model = cls(**arrays)
+    # Reemplaza las copias privadas que calculó __init__
+    for key, array in derived.items():
+        setattr(model, key, array)
+    return model
+
+
+def load_plan_arrays(compiled_dir=config.COMPILED_DIR):
+    """Parámetros de PreprocessingPlan (features_names, medians, mean, scale)."""
+    arrays = _load_arrays(Path(compiled_dir) / _PLAN)
+    arrays["features_names"] = [str(f) for f in arrays["features_names"]]
+    return arrays
+
+
+def read_manifest(compiled_dir=config.COMPILED_DIR, fingerprint=None):
+    """Manifest de los compilados, o None si no existen o no corresponden a `fingerprint`."""
+    path = Path(compiled_dir) / _MANIFEST
+    if not path.exists():
+        return None
+    with open(path, "r") as f:
+        manifest = json.load(f)
+    # Compilados de un formato anterior (.npz): se ignoran hasta el siguiente build
+    if manifest.get("format") != _FORMAT:
+        return None
+    if fingerprint is not None and manifest.get("fingerprint") != fingerprint:
+        return None
+    return manifest
+
+
+# --- CLI ---
+
+def _benchmark(engine, sources, X, repeats):
+    """Latencia mediana (ms) de sklearn vs evaluador nativo con la matriz X."""
+
+    def median_ms(fn):
+        fn()
+        timings = []
+        for _ in range(repeats):
+            began = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - began)
+        return 1000 * float(np.median(timings))
+
+    rows = []
+    for name in engine.model_names:
+        source, native = sources[name], engine.models[name]
+        rows.append((name, median_ms(lambda: score_model(source, X)), median_ms(lambda: native.predict_scores(X))))
+
+    # Ruta completa del consenso (4 modelos + votos)
+    reference = EnsembleScorer(sources, config.CONSENSUS_MIN_VOTES)
+    rows.append(("Consenso (4 modelos)", median_ms(lambda: reference.score(X)), median_ms(lambda: engine.scorer.score(X))))
+    return rows
+
+
+def _flips(engine, X):
+    """Predicciones que cambian entre float64 y float32 (por modelo y en el consenso) y la mayor diferencia de probabilidad."""
+    full = engine.scorer.score(np.asarray(X, dtype=np.float64))
+    compact = engine.scorer.score(np.asarray(X, dtype=np.float32))
+    flips = dict(zip(engine.model_names, (full["predictions"] != compact["predictions"]).sum(axis=0).tolist()))
+    flips["Consenso"] = int((full["high_risk"] != compact["high_risk"]).sum())
+    worst = float(np.abs(full["probabilities"] - compact["probabilities"]).max(initial=0.0))
+    return flips, worst
+
+
+def _peak_mb(fn):
+    """Pico de memoria (MB, tracemalloc) al ejecutar fn."""
+    import tracemalloc
+
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def check_compact(engine, rows=200_000, seed=0):
+    """
+    Verificación del modo compacto (float32) contra la ruta float64:
+    predicciones que cambian en data/03_processed y en un lote sintético de
+    `rows` filas crudas, y pico de memoria de predict_many en ambos modos.
+    """
+    import pandas as pd
+
+    processed = pd.read_csv(config.PROCESSED_DATA_PATH)
+    X = processed.reindex(columns=engine.features_names, fill_value=0.0).to_numpy(dtype=np.float64)
+    report = {"processed": dict(zip(("flips", "max_proba_diff"), _flips(engine, X)))}
+
+    # Lote sintético: filas crudas re-muestreadas con ruido en las columnas continuas
+    rng = np.random.default_rng(seed)
+    raw = pd.read_csv(config.RAW_DATA_PATH).drop(columns=["HeartDisease"], errors="ignore")
+    batch = raw.sample(rows, replace=True, random_state=seed).reset_index(drop=True)
+    batch["Oldpeak"] = batch["Oldpeak"] + rng.normal(0, 0.1, rows).round(1)
+    batch["MaxHR"] = batch["MaxHR"] + rng.integers(-5, 6, rows)
+    report["synthetic"] = dict(zip(("flips", "max_proba_diff"), _flips(engine, engine.preprocess(batch))))
+
+    engine.predict_many(batch.head(10))  # Carga perezosa fuera de la medición
+    report["peak_mb"] = {
+        "float64": _peak_mb(lambda: engine.predict_many(batch)),
+        "compact": _peak_mb(lambda: engine.predict_many(batch, compact=True)),
+    }
+    report["rows"] = rows
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compila los modelos a evaluadores NumPy")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("build", help="Compila los .pkl de src.config en artefacts/compiled")
+    bench = sub.add_parser("bench", help="Compara latencia y resultados contra scikit-learn")
+    bench.add_argument("--rows", type=int, default=10_000)
+    bench.add_argument("--repeats", type=int, default=50)
+    check = sub.add_parser("check", help="Predicciones que cambian en modo compacto (float32) y memoria por lote")
+    check.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    import pickle
+    from src.engine import InferenceEngine
+
+    engine = InferenceEngine(compiled_dir=None)
+    if args.command == "build":
+        engine.preload()
+        path = save_compiled(engine.models, engine.plan, engine.fingerprint)
+        print(f"Modelos compilados en {path}")
+        return
+    if args.command == "check":
+        report = check_compact(InferenceEngine.load_default(), args.rows)
+        for label in ("processed", "synthetic"):
+            flips = ", ".join(f"{name} {n}" for name, n in report[label]["flips"].items())
+            print(f"{label}: cambios de predicción -> {flips} | "
+                  f"diferencia máxima de probabilidad {report[label]['max_proba_diff']:.2e}")
+        peak = report["peak_mb"]
+        print(f"Pico de memoria predict_many ({report['rows']:,} filas): float64 {peak['float64']:.1f} MB, "
+              f"compacto {peak['compact']:.1f} MB ({peak['compact'] / peak['float64']:.0%})")
+        return
+
+    sources = {}
+    for name, path in engine.model_files.items():
+        with open(path, "rb") as f:
+            sources[name] = pickle.load(f)
+
+    rng = np.random.default_rng(0)
+    X_batch = rng.standard_normal((args.rows, len(engine.features_names)))
+    X_one = X_batch[:1]
+
+    # Equivalencia: datos sintéticos y el dataset crudo real (valores en los umbrales)
+    import pandas as pd
+    raw = pd.read_csv(config.RAW_DATA_PATH).drop(columns=["HeartDisease"], errors="ignore")
+    X_raw = engine.preprocess(raw)
+
+    worst = 0.0
+    for name in engine.model_names:
+        for X in (X_one, X_batch, X_raw):
+            ref_labels, ref_proba = score_model(sources[name], X)
+            labels, proba = engine.models[name].predict_scores(X)
+            if not np.array_equal(ref_labels, labels):
+                raise SystemExit(f"{name}: las clases no coinciden con scikit-learn")
+            worst = max(worst, float(np.abs(ref_proba - proba).max()))
+    print(f"Diferencia máxima de probabilidad: {worst:.2e}")
+
+    for label, X, repeats in (("1 fila", X_one, args.repeats * 10), (f"{args.rows:,} filas", X_batch, args.repeats)):
+        print(f"\n{label}: {'modelo':<24} {'sklearn ms':>11} {'nativo ms':>10} {'speedup':>8}")
+        for name, ref_ms, native_ms in _benchmark(engine, sources, X, repeats):
+            print(f"{'':>{len(label) + 1}} {name:<24} {ref_ms:>11.3f} {native_ms:>10.3f} {ref_ms / native_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,9 @@ PROJECT_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = PROJECT_DIR / "data"
 MODELS_DIR = DATA_DIR / "05_models"
 REPORTS_DIR = DATA_DIR / "06_reporting"
+RAW_DATA_PATH = DATA_DIR / "01_raw" / "heart_disease_prediction_raw.csv"
+INTERIM_DATA_PATH = DATA_DIR / "02_interim" / "heart_disease_prediction_cleaned.csv"
+PROCESSED_DATA_PATH = DATA_DIR / "03_processed" / "heart_disease_prediction_scaled.csv"
 
 # Rutas de Artefactos
 ARTEFACTS_DIR = PROJECT_DIR / "artefacts"
@@ -24,4 +27,147 @@ MODEL_FILES = {
 SCALER_PATH = ARTEFACTS_DIR / "scaler.pkl"
 IMPUTER_PATH = ARTEFACTS_DIR / "imputer.pkl"
 FEATURES_PATH = ARTEFACTS_DIR / "features_names.pkl"
-METRICS_PATH = REPORTS_DIR / "metrics.json"
\ No newline at end of file
+METRICS_PATH = REPORTS_DIR / "metrics.json"
+
+# Bundles versionados (src/bundle.py): todos los artefactos en un solo paquete mapeable
+BUNDLES_DIR = ARTEFACTS_DIR / "bundles"
+
+# Registro de versiones (src/registry.py): promoción, recarga en caliente y modo sombra
+REGISTRY_POLL_SECONDS = 5.0                 # Cada cuánto el vigilante revisa CURRENT/SHADOW (o los .pkl)
+REGISTRY_SHADOW_SAMPLE_RATE = 1.0           # Fracción de predicciones individuales que se repiten en sombra
+REGISTRY_SHADOW_MAX_ROWS = 5_000            # Filas máximas por lote que se repiten en sombra
+REGISTRY_SHADOW_QUEUE = 8                   # Comparaciones pendientes; con la cola llena se descartan
+REGISTRY_SHADOW_BATCH_SECONDS = 1.0         # Las predicciones individuales se repiten agrupadas cada N s
+REGISTRY_SHADOW_REPORT_PATH = REPORTS_DIR / "shadow.json"
+REGISTRY_SHADOW_FLUSH_SECONDS = 10.0        # Escritura máxima del reporte de sombra
+
+# Evaluadores nativos (src/compiled.py): modelos y plan sin scikit-learn al predecir
+COMPILED_DIR = ARTEFACTS_DIR / "compiled"
+
+# Entrenamiento por línea de comandos (src/train.py)
+TRAIN_CACHE_DIR = ARTEFACTS_DIR / "cache"   # Matrices codificadas y escaladas, por huella de los datos
+TRAIN_TEST_SIZE = 0.2
+TRAIN_SEED = 42
+TRAIN_CV_FOLDS = 5
+TRAIN_SCORING = "recall"
+TRAIN_WORKERS = os.cpu_count() or 1         # Núcleos para (candidato, fold) de las 4 búsquedas
+
+# Re-entrenamiento incremental con casos etiquetados nuevos (src/refresh.py)
+REFRESH_BATCH_ROWS = 256                    # Filas nuevas absorbidas por lote
+REFRESH_NEWTON_ITERATIONS = 20              # Iteraciones máximas de la actualización de la Regresión Logística
+REFRESH_RF_MAX_TREES = 500                  # Tope del bosque: se descartan los árboles más antiguos
+
+# Monitor de deriva de las entradas (src/drift.py)
+DRIFT_MONITOR_ENABLED = True
+DRIFT_REFERENCE_PATH = ARTEFACTS_DIR / "drift_reference.json"   # python -m src.drift reference
+DRIFT_NUMERIC_COLUMNS = ("Age", "RestingBP", "Cholesterol", "MaxHR", "Oldpeak")
+DRIFT_MISSING_COLUMNS = ("Cholesterol", "RestingBP")   # Ceros registrados como faltantes (missing_codes -> NaN)
+DRIFT_MISSING_MARGIN = 0.10                 # Aviso si la tasa de faltantes se aleja de la referencia más que esto
+DRIFT_BINS = 10                             # Bins del histograma (deciles de la referencia)
+DRIFT_PSI_WARNING = 0.10
+DRIFT_PSI_ALERT = 0.25
+DRIFT_MIN_ROWS = 100                        # Filas mínimas antes de calificar la deriva
+
+# Instrumentación de latencia por etapa (src/instrumentation.py)
+TELEMETRY_ENABLED = True
+TELEMETRY_PROMETHEUS_PATH = REPORTS_DIR / "telemetry.prom"   # Archivo para el textfile collector
+TELEMETRY_PROMETHEUS_INTERVAL_SECONDS = 15  # Cada cuánto se reescribe ese archivo (0 = no se escribe)
+TELEMETRY_LOG_PATH = None                   # Ruta para logs JSON por evento (None = desactivados)
+TELEMETRY_PANEL_REFRESH_SECONDS = 2         # Refresco del panel de desarrollador (?dev=1)
+
+# Explicaciones por predicción (src/explain.py)
+EXPLAIN_TOP_FACTORS = 3                     # Factores principales por paciente (diagnóstico y lote)
+EXPLAIN_BACKGROUND_PATH = INTERIM_DATA_PATH # Fondo del SVC: pacientes de entrenamiento
+EXPLAIN_BACKGROUND_ROWS = 100
+EXPLAIN_SEED = 42
+EXPLAIN_BUDGET_US_PER_ROW = 100             # Presupuesto de latencia por fila en lote (4 modelos)
+
+# Regla de Negocio: mínimo de modelos positivos para declarar ALTO RIESGO
+CONSENSUS_MIN_VOTES = 2
+
+# Consenso en cascada: modelos en orden de costo creciente (p50 por fila del
+# benchmark); cada fila se detiene cuando el consenso ya no puede cambiar
+ENSEMBLE_CASCADE_ORDER = ["Logistic Regression", "Decision Tree", "Random Forest", "Support Vector Machine"]
+
+# Columnas crudas requeridas (formulario y carga masiva)
+REQUIRED_COLUMNS = [
+    'Age', 'Sex', 'ChestPainType', 'RestingBP', 'Cholesterol', 'FastingBS',
+    'RestingECG', 'MaxHR', 'ExerciseAngina', 'Oldpeak', 'ST_Slope'
+]
+# Columnas de texto (One-Hot); el resto son numéricas
+CATEGORICAL_COLUMNS = ['Sex', 'ChestPainType', 'RestingECG', 'ExerciseAngina', 'ST_Slope']
+
+# Esquema de validación de las entradas (src/validation.py). Los widgets del
+# formulario (app.py) leen de aquí sus rangos y opciones; cubre los valores de
+# references/data_dictionary.md y todos los de data/02_interim (Oldpeak < 0,
+# Cholesterol 603). `missing_codes`: valores que el EDA trató como faltantes
+# (0 en Cholesterol/RestingBP -> NaN -> mediana del imputer).
+INPUT_SCHEMA = {
+    'Age':            {'kind': 'integer', 'min': 20, 'max': 90},
+    'Sex':            {'kind': 'category', 'values': ['M', 'F']},
+    'ChestPainType':  {'kind': 'category', 'values': ['ASY', 'NAP', 'ATA', 'TA']},
+    'RestingBP':      {'kind': 'integer', 'min': 80, 'max': 200, 'nullable': True, 'missing_codes': [0]},
+    'Cholesterol':    {'kind': 'integer', 'min': 80, 'max': 620, 'nullable': True, 'missing_codes': [0]},
+    'FastingBS':      {'kind': 'integer', 'min': 0, 'max': 1},
+    'RestingECG':     {'kind': 'category', 'values': ['Normal', 'ST', 'LVH']},
+    'MaxHR':          {'kind': 'integer', 'min': 60, 'max': 220},
+    'ExerciseAngina': {'kind': 'category', 'values': ['Y', 'N']},
+    'Oldpeak':        {'kind': 'number', 'min': -3.0, 'max': 6.5},
+    'ST_Slope':       {'kind': 'category', 'values': ['Up', 'Flat', 'Down']},
+}
+VALIDATION_MAX_REPORT_ROWS = 10_000          # Rechazos detallados guardados por lote (el conteo es completo)
+
+# Procesamiento masivo por bloques (memoria acotada)
+BATCH_CHUNK_ROWS = 50_000                   # Filas leídas y puntuadas por bloque
+BATCH_PAGE_ROWS = 100                       # Filas por página en la vista previa
+BATCH_SPOOL_MAX_BYTES = 32 * 1024 * 1024    # Resultados en RAM hasta 32 MB, luego a disco
+BATCH_DOWNLOAD_MAX_BYTES = 256 * 1024 * 1024  # Descarga desde la app (Streamlit la sirve desde memoria)
+# Formatos de entrada/salida del lote -> extensiones reconocidas
+BATCH_FORMATS = {
+    "csv": (".csv",),
+    "parquet": (".parquet", ".pq"),
+    "arrow": (".arrow", ".feather", ".ipc"),     # Arrow IPC (archivo o stream)
+}
+BATCH_MIME_TYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+}
+
+# Ejecución paralela del lote: (modelo, bloque de filas) repartidos en un pool
+BATCH_WORKERS = os.cpu_count() or 1         # Procesos/hilos del pool
+BATCH_PARALLEL_BACKEND = "process"          # "process" o "thread"
+BATCH_TASK_ROWS = 10_000                    # Filas por unidad de trabajo
+
+# Cola de trabajos de la carga masiva (src/jobs.py): sobreviven a los reruns de Streamlit
+JOBS_DIR = REPORTS_DIR / "jobs"             # Un directorio por trabajo: entrada, resultados y resumen
+JOBS_DB_PATH = JOBS_DIR / "jobs.sqlite3"    # Estado, progreso, latido y cancelación
+JOBS_WORKERS = 2                            # Trabajos simultáneos; el resto espera en la cola
+JOBS_POLL_SECONDS = 1.0                     # Refresco del estado en la pestaña y espera de los workers
+JOBS_STALE_SECONDS = 120                    # Un trabajo en curso sin latido por más tiempo vuelve a la cola
+JOBS_HEARTBEAT_SECONDS = 10                 # Latido de un trabajo en curso (muy por debajo de JOBS_STALE_SECONDS)
+JOBS_MAX_ATTEMPTS = 3                       # Re-encolados máximos tras interrupciones
+JOBS_RETENTION_HOURS = 24                   # Trabajos terminados (y sus archivos) que se conservan
+
+# Servicio HTTP local (api/): micro-batching de peticiones concurrentes
+API_HOST = "127.0.0.1"
+API_PORT = 8000
+API_MAX_BATCH_SIZE = 64                     # Pacientes máximos por llamada vectorizada
+API_MAX_WAIT_MS = 5.0                       # Espera máxima para agrupar peticiones
+API_MAX_BODY_BYTES = 16 * 1024 * 1024       # Tamaño máximo del cuerpo JSON
+
+# Caché de resultados de predicción (LRU + TTL)
+CACHE_MAX_ENTRIES = 10_000
+CACHE_TTL_SECONDS = 60 * 60
+
+# Historial persistente de predicciones (src/history_store.py), compartido entre sesiones
+HISTORY_DB_PATH = REPORTS_DIR / "history.sqlite3"
+HISTORY_PAGE_ROWS = 50
+
+# Benchmarks de inferencia (src/benchmark.py)
+BENCHMARK_PATH = REPORTS_DIR / "benchmark.json"
+BENCHMARK_BATCH_SIZES = (1_000, 100_000, 1_000_000)
+BENCHMARK_LATENCY_SAMPLES = 2_000           # Pacientes distintos para p50/p99
+BENCHMARK_SEED = 42
+BENCHMARK_THRESHOLD = 0.20                  # Regresión tolerada (20%)
+BENCHMARK_SCALING_ROWS = 200_000            # Lote para medir el speedup del ejecutor paralelo por núcleos
@@ -0,0 +1,310 @@
+import argparse
+import bisect
+import json
+import math
+import threading
+from pathlib import Path
+import numpy as np
+from src import config
+from src.preprocessing_plan import as_columns
+
+# --- MONITOR DE DERIVA EN STREAMING ---
+# Compara los pacientes que llegan al motor con la distribución de
+# entrenamiento (data/02_interim) sin guardar las filas:
+#
+#   - Numéricas: momentos de Welford (n, media, M2), histograma de bins fijos
+#     (deciles de la referencia) y conteo de faltantes.
+#   - Categóricas: conteo por categoría de la referencia (+ "otras").
+#
+# La memoria es constante y cada observación cuesta unos µs (un paciente: ruta
+# escalar en Python puro; lotes: operaciones vectorizadas por columna).
+# El reporte da PSI y una distancia tipo KS sobre los histogramas, y la tasa
+# de faltantes de Cholesterol/RestingBP frente a la referencia. El monitor
+# observa las entradas ya validadas: sus ceros son faltantes registrados
+# (`missing_codes` de INPUT_SCHEMA) que llegan como NaN y el plan imputa con la
+# mediana, igual que en el EDA, así que se cuentan como faltantes.
+#
+# Uso: python -m src.drift reference        (perfil de referencia -> JSON)
+#      python -m src.drift check datos.csv  (reporte de deriva de un archivo)
+
+_PSI_EPSILON = 1e-4     # Proporción mínima por bin (evita log(0))
+
+
+def _psi(expected, actual):
+    """Population Stability Index entre dos vectores de proporciones."""
+    expected = np.maximum(np.asarray(expected, dtype=np.float64), _PSI_EPSILON)
+    actual = np.maximum(np.asarray(actual, dtype=np.float64), _PSI_EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def _ks(expected, actual):
+    """Distancia tipo Kolmogórov-Smirnov: máxima diferencia entre las CDF por bins."""
+    return float(np.abs(np.cumsum(actual) - np.cumsum(expected)).max(initial=0.0))
+
+
+def _status(psi):
+    if psi >= config.DRIFT_PSI_ALERT:
+        return "alerta"
+    if psi >= config.DRIFT_PSI_WARNING:
+        return "aviso"
+    return "estable"
+
+
+def build_reference(data_path=config.INTERIM_DATA_PATH, n_bins=config.DRIFT_BINS):
+    """Perfil de referencia (dict serializable a JSON) a partir de data/02_interim."""
+    import pandas as pd
+
+    df = pd.read_csv(data_path)
+    source = Path(data_path).resolve()
+    if source.is_relative_to(config.PROJECT_DIR):
+        source = source.relative_to(config.PROJECT_DIR)
+    profile = {"source": str(source), "rows": len(df), "numeric": {}, "categorical": {}}
+    for column in config.REQUIRED_COLUMNS:
+        values = df[column]
+        if column in config.DRIFT_NUMERIC_COLUMNS:
+            x = values.to_numpy(dtype=np.float64)
+            present = x[~np.isnan(x)]
+            edges = np.unique(np.quantile(present, np.linspace(0, 1, n_bins + 1)[1:-1]))
+            counts = np.bincount(np.searchsorted(edges, present, side="right"), minlength=edges.size + 1)
+            profile["numeric"][column] = {
+                "edges": edges.tolist(),
+                "proportions": (counts / present.size).tolist(),
+                "mean": float(present.mean()),
+                "std": float(present.std(ddof=1)),
+                "missing_rate": float(np.isnan(x).mean()),
+            }
+        else:
+            frequencies = values.value_counts(normalize=True, sort=False)
+            profile["categorical"][column] = {
+                "categories": [v.item() if hasattr(v, "item") else v for v in frequencies.index],
+                "proportions": frequencies.tolist(),
+            }
+    return profile
+
+
+class DriftMonitor:
+    """
+    Bocetos en streaming de las 11 columnas de entrada contra un perfil de
+    referencia. Seguro entre hilos (sesiones de Streamlit, servicio HTTP).
+    """
+
+    def __init__(self, reference):
+        self.reference = reference
+        self._lock = threading.Lock()
+        self._numeric = list(reference["numeric"].items())
+        self._categorical = list(reference["categorical"].items())
+        # Bordes como lista (bisect en la ruta escalar) y como array (lotes)
+        self._edges = {column: (ref["edges"], np.asarray(ref["edges"])) for column, ref in self._numeric}
+        self._index = {column: {value: k for k, value in enumerate(ref["categories"])}
+                       for column, ref in self._categorical}
+        self.reset()
+
+    @classmethod
+    def load_default(cls, path=config.DRIFT_REFERENCE_PATH):
+        """Monitor con el perfil de referencia guardado, o None si no existe."""
+        try:
+            with open(path, "r") as f:
+                return cls(json.load(f))
+        except FileNotFoundError:
+            return None
+
+    def reset(self):
+        with self._lock:
+            self.rows = 0
+            # [n, media, M2, faltantes, histograma]
+            self._moments = {column: [0, 0.0, 0.0, 0, [0] * (len(ref["edges"]) + 1)]
+                             for column, ref in self._numeric}
+            # Conteo por categoría de la referencia; la última posición es "otras"
+            self._counts = {column: [0] * (len(ref["categories"]) + 1) for column, ref in self._categorical}
+
+    # --- OBSERVACIÓN ---
+
+    def observe(self, data):
+        """Registra pacientes en cualquier formato que acepte el motor (paciente, lote, DataFrame)."""
+        if is_single_patient(data):
+            self.observe_one(data)
+            return
+        columns, n_rows = as_columns(data)
+        self.observe_columns(columns, n_rows)
+
+    def observe_columns(self, columns, n_rows):
+        """Registra la entrada ya normalizada por as_columns ({columna: array})."""
+        if n_rows == 0:
+            return
+        if n_rows == 1:
+            self.observe_one({column: values[0] for column, values in columns.items()})
+        else:
+            self._observe_many(columns, n_rows)
+
+    def observe_one(self, patient):
+        """Registra un paciente (dict de escalares): Python puro, sin crear arrays de NumPy."""
+        with self._lock:
+            self.rows += 1
+            for column, _ in self._numeric:
+                sketch = self._moments[column]
+                value = patient.get(column)
+                value = None if value is None else float(value)
+                if value is None or math.isnan(value):
+                    sketch[3] += 1
+                    continue
+                n = sketch[0] = sketch[0] + 1
+                delta = value - sketch[1]
+                sketch[1] += delta / n
+                sketch[2] += delta * (value - sketch[1])
+                sketch[4][bisect.bisect_right(self._edges[column][0], value)] += 1
+            for column, _ in self._categorical:
+                index = self._index[column]
+                self._counts[column][index.get(_scalar(patient.get(column)), len(index))] += 1
+
+    def _observe_many(self, columns, n_rows):
+        # Lote: se resume cada columna y luego se combinan los momentos (Chan et al.)
+        numeric, categorical = {}, {}
+        for column, _ in self._numeric:
+            values = columns.get(column)
+            x = np.full(n_rows, np.nan) if values is None else np.asarray(values, dtype=np.float64)
+            missing = np.isnan(x)
+            present = x[~missing] if missing.any() else x
+            histogram = np.bincount(np.searchsorted(self._edges[column][1], present, side="right"),
+                                    minlength=len(self._edges[column][0]) + 1)
+            mean = float(present.mean()) if present.size else 0.0
+            m2 = float(np.square(present - mean).sum()) if present.size else 0.0
+            numeric[column] = (present.size, mean, m2, int(missing.sum()), histogram)
+
+        for column, ref in self._categorical:
+            values = columns.get(column)
+            counts = [0] * (len(ref["categories"]) + 1)
+            if values is not None:
+                for k, category in enumerate(ref["categories"]):
+                    counts[k] = int(np.count_nonzero(values == category))
+            counts[-1] = n_rows - sum(counts)
+            categorical[column] = counts
+
+        with self._lock:
+            self.rows += n_rows
+            for column, (n_b, mean_b, m2_b, missing, histogram) in numeric.items():
+                sketch = self._moments[column]
+                n_a = sketch[0]
+                n = n_a + n_b
+                if n_b:
+                    delta = mean_b - sketch[1]
+                    sketch[1] += delta * n_b / n
+                    sketch[2] += m2_b + delta * delta * n_a * n_b / n
+                sketch[0] = n
+                sketch[3] += missing
+                sketch[4] = [a + int(b) for a, b in zip(sketch[4], histogram)]
+            for column, counts in categorical.items():
+                self._counts[column] = [a + b for a, b in zip(self._counts[column], counts)]
+
+    # --- REPORTE ---
+
+    def report(self):
+        """Deriva por columna (PSI, KS, medias, tasa de faltantes) y estado global."""
+        with self._lock:
+            rows = self.rows
+            moments = {column: list(sketch) for column, sketch in self._moments.items()}
+            counts = {column: list(c) for column, c in self._counts.items()}
+
+        columns = {}
+        for column, ref in self._numeric:
+            n, mean, m2, missing, histogram = moments[column]
+            entry = {
+                "type": "numérica",
+                "rows": n + missing,
+                "mean": mean if n else None,
+                "std": math.sqrt(m2 / (n - 1)) if n > 1 else None,
+                "reference_mean": ref["mean"],
+                "reference_std": ref["std"],
+                "missing_rate": missing / (n + missing) if n + missing else 0.0,
+                "reference_missing_rate": ref["missing_rate"],
+            }
+            if n:
+                proportions = np.asarray(histogram) / n
+                entry["psi"] = _psi(ref["proportions"], proportions)
+                entry["ks"] = _ks(ref["proportions"], proportions)
+            columns[column] = entry
+
+        for column, ref in self._categorical:
+            observed = counts[column]
+            total = sum(observed)
+            entry = {"type": "categórica", "rows": total,
+                     "unseen_rate": observed[-1] / total if total else 0.0}
+            if total:
+                # "Otras" no existe en la referencia: proporción esperada 0 (-> epsilon)
+                proportions = np.asarray(observed) / total
+                entry["psi"] = _psi(ref["proportions"] + [0.0], proportions)
+                entry["ks"] = _ks(ref["proportions"] + [0.0], proportions)
+            columns[column] = entry
+
+        for entry in columns.values():
+            if "psi" in entry:
+                entry["status"] = _status(entry["psi"]) if entry["rows"] >= config.DRIFT_MIN_ROWS else "pocos datos"
+
+        # Faltantes registrados (ceros de Cholesterol/RestingBP): se imputan con la mediana,
+        # así que una tasa muy distinta a la del entrenamiento cambia lo que ve el modelo
+        missing = {}
+        for column in config.DRIFT_MISSING_COLUMNS:
+            entry = columns.get(column)
+            if entry is None:
+                continue
+            missing[column] = {
+                "rate": entry["missing_rate"],
+                "reference_rate": entry["reference_missing_rate"],
+                "alert": entry["rows"] >= config.DRIFT_MIN_ROWS and abs(
+                    entry["missing_rate"] - entry["reference_missing_rate"]) > config.DRIFT_MISSING_MARGIN,
+            }
+        drifted = [column for column, entry in columns.items() if entry.get("status") in ("aviso", "alerta")]
+        return {"rows": rows, "drifted": drifted, "missing_values": missing, "columns": columns}
+
+
+def is_single_patient(data):
+    """True si `data` es un solo paciente (dict de escalares). Más barato que np.ndim por valor."""
+    return isinstance(data, dict) and all(isinstance(v, str) or not hasattr(v, "__len__") for v in data.values())
+
+
+def _scalar(value):
+    """Escalar de NumPy -> Python (las claves de la referencia vienen de JSON)."""
+    return value.item() if hasattr(value, "item") else value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monitor de deriva de las entradas")
+    sub = parser.add_subparsers(dest="command", required=True)
+    reference = sub.add_parser("reference", help="Calcula el perfil de referencia de data/02_interim")
+    reference.add_argument("--data", default=str(config.INTERIM_DATA_PATH))
+    reference.add_argument("--output", default=str(config.DRIFT_REFERENCE_PATH))
+    check = sub.add_parser("check", help="Reporte de deriva de un CSV contra la referencia")
+    check.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "reference":
+        profile = build_reference(args.data)
+        with open(args.output, "w") as f:
+            json.dump(profile, f, indent=1)
+        print(f"Perfil de referencia ({profile['rows']} filas) guardado en {args.output}")
+        return
+
+    import pandas as pd
+    from src.validation import validate
+
+    monitor = DriftMonitor.load_default()
+    if monitor is None:
+        parser.error(f"No existe {config.DRIFT_REFERENCE_PATH}: ejecuta primero 'python -m src.drift reference'")
+    for chunk in pd.read_csv(args.path, chunksize=config.BATCH_CHUNK_ROWS):
+        # Igual que el motor: se observan las filas válidas, con los missing_codes ya en NaN
+        check = validate(chunk)
+        monitor.observe_columns(check.valid_columns(), check.n_valid)
+    report = monitor.report()
+
+    print(f"{report['rows']:,} filas\n\n{'Columna':<16} {'PSI':>7} {'KS':>6} {'faltantes':>10}  estado")
+    for column, entry in report["columns"].items():
+        missing = f"{entry['missing_rate']:.1%}" if "missing_rate" in entry else ""
+        print(f"{column:<16} {entry.get('psi', float('nan')):>7.3f} {entry.get('ks', float('nan')):>6.3f} "
+              f"{missing:>10}  {entry.get('status', '')}")
+    for column, entry in report["missing_values"].items():
+        if entry["alert"]:
+            print(f"\nFALTANTES: {entry['rate']:.1%} de {column} sin dato (entrenamiento: "
+                  f"{entry['reference_rate']:.1%}); se imputan con la mediana")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+import hashlib
+import json
+import pickle
+import threading
+import time
+from collections.abc import Mapping
+from pathlib import Path
+import numpy as np
+from src import bundle, compiled, config
+from src.cache import PredictionCache, canonical_key
+from src.drift import DriftMonitor, is_single_patient
+from src.ensemble import EnsembleScorer
+from src.explain import Explainer, load_background
+from src.instrumentation import path_label, telemetry
+from src.preprocessing_plan import PreprocessingPlan, as_columns
+
+# --- MOTOR DE INFERENCIA (SIN STREAMLIT) ---
+# Este módulo solo depende de NumPy. Los modelos se evalúan con los
+# evaluadores nativos de src/compiled.py; scikit-learn solo se importa al
+# deserializar los .pkl cuando no hay compilados vigentes. Así cualquier
+# script, worker o servicio puede puntuar pacientes sin cargar Streamlit,
+# Plotly ni Pandas.
+#
+# Carga perezosa: al construir el motor solo se calcula la huella de los
+# artefactos. Métricas, transformadores y cada modelo se deserializan la
+# primera vez que se usan (o en segundo plano con preload_async).
+
+# Series de latencia de las rutas calientes, resueltas una sola vez
+_PREPROCESS_SERIES = {path: telemetry.series("preprocess", path=path) for path in ("single", "batch")}
+_PREDICT_SERIES = {path: telemetry.series("predict", path=path) for path in ("single", "batch")}
+_EXPLAIN_SERIES = {path: telemetry.series("explain", path=path) for path in ("single", "batch")}
+
+
+class LazyModels(Mapping):
+    """Diccionario nombre -> evaluador nativo, cargado al primer acceso."""
+
+    def __init__(self, engine, names):
+        self._engine = engine
+        self._names = list(names)
+
+    def __getitem__(self, name):
+        if name not in self._names:
+            raise KeyError(name)
+        return self._engine._load(f"model:{name}")
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+
+class InferenceEngine:
+    """
+    Dueño de los artefactos de src.config (modelos, imputer, scaler, features y métricas).
+    Expone predict_one (un paciente) y predict_many (lote vectorizado).
+    """
+
+    def __init__(self, model_files=None, scaler_path=None, imputer_path=None,
+                 features_path=None, metrics_path=None, bundle_dir=None,
+                 compiled_dir=config.COMPILED_DIR):
+        self.model_files = dict(model_files or config.MODEL_FILES)
+        self.bundle_dir = bundle_dir
+        # Directorio de cada modelo compilado vigente (vacío si se compilan al cargar)
+        self.compiled_files = {}
+        self._lock = threading.RLock()
+        self._loaded = {}
+        self._preload_thread = None
+
+        if bundle_dir is not None:
+            # Bundle versionado: cada objeto se lee por separado (src/bundle.py)
+            reader = bundle.BundleReader(bundle_dir)
+            names = reader.model_names
+            self._loaders = {key: (lambda key=key: reader.load(key)) for key in reader.manifest["objects"]}
+            for name in names:
+                self._loaders[f"model:{name}"] = lambda name=name: reader.load_compiled(name)
+            self._loaders["metrics"] = lambda: reader.metrics
+            self.fingerprint = reader.fingerprint
+            self.version = reader.version
+        else:
+            paths = {f"model:{name}": path for name, path in self.model_files.items()}
+            paths["scaler"] = scaler_path or config.SCALER_PATH
+            paths["imputer"] = imputer_path or config.IMPUTER_PATH
+            paths["features_names"] = features_path or config.FEATURES_PATH
+            names = list(self.model_files)
+            self._loaders = {key: (lambda path=path: self._read_pickle(path)) for key, path in paths.items()}
+            for name in names:
+                self._loaders[f"model:{name}"] = lambda path=paths[f"model:{name}"]: compiled.compile_model(
+                    self._read_pickle(path)
+                )
+            self._loaders["metrics"] = lambda: self._read_json(metrics_path or config.METRICS_PATH)
+            self.fingerprint = self._fingerprint(paths.values())
+            self.version = None
+
+            # Compilados vigentes (python -m src.compiled build): sin pickle ni scikit-learn
+            manifest = compiled.read_manifest(compiled_dir, self.fingerprint) if compiled_dir else None
+            if manifest is not None and set(manifest["models"]) == set(names):
+                compiled_dir = Path(compiled_dir)
+                self.compiled_files = {name: compiled_dir / filename for name, filename in manifest["models"].items()}
+                for name, path in self.compiled_files.items():
+                    self._loaders[f"model:{name}"] = lambda path=path: compiled.load_model(path)
+                self._loaders["plan"] = lambda: PreprocessingPlan(**compiled.load_plan_arrays(compiled_dir))
+
+        self._loaders.setdefault("plan", lambda: PreprocessingPlan.from_artifacts(
+            self.features_names, self.imputer, self.scaler
+        ))
+        # Explicador (src/explain.py): el fondo del SVC se carga al primer uso
+        self._loaders["explainer"] = lambda: Explainer(
+            self.models, self.plan.features_names, lambda: load_background(self.plan)
+        )
+        self.models = LazyModels(self, names)
+        # El scorer solo necesita los nombres; los modelos se cargan al puntuar
+        self.scorer = EnsembleScorer(self.models, config.CONSENSUS_MIN_VOTES)
+
+        # Caché de resultados (pacientes repetidos al re-ejecutar ANALIZAR RIESGO)
+        self.cache = PredictionCache(config.CACHE_MAX_ENTRIES, config.CACHE_TTL_SECONDS)
+
+        # Monitor de deriva de las entradas (lo activa load_default; None = sin monitor)
+        self.monitor = None
+
+    @classmethod
+    def load_default(cls):
+        """
+        Usa el bundle vigente (artefacts/bundles/CURRENT) si existe; si no, los .pkl sueltos.
+        Activa el monitor de deriva si hay perfil de referencia.
+        """
+        bundle_dir = bundle.current_bundle()
+        engine = cls(bundle_dir=bundle_dir) if bundle_dir is not None else cls()
+        if config.DRIFT_MONITOR_ENABLED:
+            engine.monitor = DriftMonitor.load_default()
+        return engine
+
+    # --- CARGA PEREZOSA ---
+
+    @staticmethod
+    def _fingerprint(paths):
+        """Huella de contenido de todos los .pkl (FileNotFoundError se propaga al llamador)."""
+        hasher = hashlib.sha256()
+        for path in paths:
+            with open(path, "rb") as f:
+                hasher.update(f.read())
+        return hasher.hexdigest()
+
+    @staticmethod
+    def _read_pickle(path):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    @staticmethod
+    def _read_json(path):
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def _load(self, key):
+        """Carga un artefacto una sola vez (seguro entre hilos/sesiones)."""
+        value = self._loaded.get(key)
+        if value is None:
+            with self._lock:
+                value = self._loaded.get(key)
+                if value is None:
+                    with telemetry.timer("load", artifact=key):
+                        value = self._loaded[key] = self._loaders[key]()
+        return value
+
+    @property
+    def loaded(self):
+        """Claves de los artefactos ya cargados en memoria."""
+        return list(self._loaded)
+
+    @property
+    def metrics(self):
+        return self._load("metrics")
+
+    @property
+    def scaler(self):
+        return self._load("scaler")
+
+    @property
+    def imputer(self):
+        return self._load("imputer")
+
+    @property
+    def features_names(self):
+        return list(self._load("features_names"))
+
+    @property
+    def plan(self):
+        """Plan de preprocesamiento compilado a partir de features, imputer y scaler."""
+        return self._load("plan")
+
+    @property
+    def explainer(self):
+        """Explicador de los modelos (contribuciones por factor clínico)."""
+        return self._load("explainer")
+
+    def preload(self):
+        """Carga todos los artefactos (métricas, plan y los modelos)."""
+        self.metrics
+        self.plan
+        for name in self.models:
+            self.models[name]
+
+    def preload_async(self):
+        """
+        Lanza (una sola vez) un hilo de fondo que precarga todos los artefactos,
+        para que el primer ANALIZAR RIESGO no pague la deserialización.
+        """
+        with self._lock:
+            if self._preload_thread is None:
+                self._preload_thread = threading.Thread(target=self.preload, name="engine-preload", daemon=True)
+                self._preload_thread.start()
+        return self._preload_thread
+
+    @property
+    def model_names(self):
+        """Orden de los modelos en los resultados de predict_many."""
+        return self.scorer.model_names
+
+    @property
+    def artifacts(self):
+        """Artefactos como diccionario (el formato que recibe preprocessing.preprocess_input)."""
+        return {
+            "models": self.models,
+            "scaler": self.scaler,
+            "imputer": self.imputer,
+            "features_names": self.features_names,
+            "metrics": self.metrics,
+            "plan": self.plan,
+        }
+
+    # --- PREPROCESAMIENTO ---
+
+    def preprocess(self, data, dtype=np.float64):
+        """
+        Aplica el plan compilado (One-Hot + Alineación + Imputer + Scaler)
+        usando solo NumPy. Retorna un array float64 de (n_filas, n_features)
+        (float32 con dtype=np.float32, modo compacto).
+        Si hay monitor de deriva, registra antes las entradas crudas.
+        """
+        began = time.perf_counter()
+        if self.monitor is None:
+            X = self.plan.transform(data, dtype=dtype)
+        elif is_single_patient(data):
+            # Un paciente: ruta escalar del monitor, sin normalizar a columnas dos veces
+            self.monitor.observe_one(data)
+            X = self.plan.transform(data, dtype=dtype)
+        else:
+            # Lote: se normaliza una vez y el monitor y el plan comparten las columnas
+            columns, n_rows = as_columns(data)
+            self.monitor.observe_columns(columns, n_rows)
+            X = self.plan.transform(columns, dtype=dtype)
+        _PREPROCESS_SERIES[path_label(X.shape[0])].observe(time.perf_counter() - began)
+        return X
+
+    # --- INFERENCIA ---
+
+    def describe(self, row):
+        """Convierte una fila del array de resultados a un dict (JSON serializable)."""
+        results = {
+            name: {"prediction": int(row["predictions"][k]), "probability": float(row["probabilities"][k])}
+            for k, name in enumerate(self.scorer.model_names)
+        }
+        return {
+            "models": results,
+            "votes": int(row["votes"]),
+            "high_risk": bool(row["high_risk"]),
+            "probability": float(row["probability"]),
+        }
+
+    def predict_one(self, patient):
+        """
+        Puntúa un paciente (dict con los 11 campos del formulario).
+        Retorna la predicción y probabilidad de cada modelo y el consenso.
+        Los pacientes ya vistos se sirven desde la caché.
+        """
+        began = time.perf_counter()
+        key = canonical_key(patient, self.fingerprint)
+        row = self.cache.get(key)
+        if row is None:
+            row = self.scorer.score(self.preprocess(patient))[0].copy()
+            self.cache.put(key, row)
+        _PREDICT_SERIES["single"].observe(time.perf_counter() - began)
+        telemetry.count("rows", path="single")
+        return self.describe(row)
+
+    def predict_many(self, data, cascade=False, compact=False):
+        """
+        Puntúa un lote completo de forma vectorizada.
+        Retorna el array estructurado de src/ensemble.py (clases y probabilidades
+        por modelo en el orden de self.model_names, votos, probabilidad promedio y consenso).
+        Las filas duplicadas se puntúan una sola vez.
+        cascade=True usa el consenso en cascada (EnsembleScorer.score_cascade):
+        mismo consenso, sin las probabilidades de los modelos que no hicieron falta.
+        compact=True (modo compacto) preprocesa y puntúa en float32 y retorna las
+        probabilidades en float32: cerca de la mitad de memoria por lote
+        (`python -m src.compiled check` reporta las predicciones que cambian).
+        """
+        began = time.perf_counter()
+        score = self.scorer.score_cascade if cascade else None
+        dtype = np.float32 if compact else np.float64
+        result = self.score_deduplicated(self.preprocess(data, dtype=dtype), score)
+        _PREDICT_SERIES["batch"].observe(time.perf_counter() - began)
+        telemetry.count("rows", result.shape[0], path="batch")
+        return result
+
+    def score_deduplicated(self, X, score=None):
+        """
+        Puntúa solo las filas únicas de X con `score` (por defecto el scorer serie)
+        y expande el resultado al orden original.
+        """
+        score = score or self.scorer.score
+        if X.shape[0] < 2:
+            return score(X)
+
+        # Filas idénticas tras el preprocesamiento dan el mismo resultado
+        unique_X, inverse = np.unique(X, axis=0, return_inverse=True)
+        self.cache.record_batch(X.shape[0], unique_X.shape[0])
+        if unique_X.shape[0] == X.shape[0]:
+            return score(X)
+        return score(unique_X)[inverse.reshape(-1)]
+
+    # --- EXPLICACIONES ---
+
+    def explain_many(self, data):
+        """
+        Contribuciones de cada factor clínico a la predicción de cada modelo
+        (src/explain.py) para un paciente o un lote. Retorna un Explanation.
+        No pasa por el monitor de deriva: las mismas filas ya se puntuaron.
+        Los lotes que superan EXPLAIN_BUDGET_US_PER_ROW se cuentan en
+        `explain_over_budget` (panel de desarrollador y /metrics).
+        """
+        began = time.perf_counter()
+        X = self.plan.transform(data)
+        # Igual que al puntuar: las filas idénticas se explican una sola vez
+        # (np.unique ordena las filas: sin duplicados se explica X tal cual, en su orden)
+        unique_X, inverse = np.unique(X, axis=0, return_inverse=True) if X.shape[0] > 1 else (X, None)
+        if unique_X.shape[0] == X.shape[0]:
+            explanation = self.explainer.explain(X)
+        else:
+            explanation = self.explainer.explain(unique_X).take(inverse.reshape(-1))
+        elapsed = time.perf_counter() - began
+        path = path_label(X.shape[0])
+        _EXPLAIN_SERIES[path].observe(elapsed)
+        if path == "batch" and X.shape[0] and elapsed > config.EXPLAIN_BUDGET_US_PER_ROW * 1e-6 * X.shape[0]:
+            telemetry.count("explain_over_budget", path=path)
+        return explanation
@@ -0,0 +1,226 @@
+import time
+import numpy as np
+from src import config
+from src.instrumentation import path_label, telemetry
+
+# --- SCORER DE ENSAMBLE (UNA SOLA PASADA) ---
+# Cada modelo se evalúa UNA vez por lote: de sus probabilidades (o de su
+# función de decisión, en el caso del SVC) salen tanto la clase como la
+# confianza. Antes se llamaba predict y luego predict_proba, duplicando el
+# kernel del SVM y el recorrido de los árboles del Random Forest.
+
+# Constantes de libsvm para el escalado de Platt (svm.cpp)
+_LIBSVM_MIN_PROB = 1e-7
+_LIBSVM_MAX_ITER = 100
+
+
+def result_dtype(n_models, compact=False):
+    """
+    Tipo estructurado del resultado: una fila por paciente.
+    compact=True guarda las probabilidades en float32 (clases, votos y
+    consenso ya son int8/bool): 26 bytes por fila en vez de 46 con 4 modelos.
+    """
+    real = np.float32 if compact else np.float64
+    return np.dtype([
+        ("predictions", np.int8, (n_models,)),      # Clase por modelo (0/1)
+        ("probabilities", real, (n_models,)),       # P(Enfermo) por modelo
+        ("votes", np.int8),                         # Modelos positivos
+        ("probability", real),                      # Probabilidad promedio
+        ("high_risk", np.bool_),                    # Consenso final
+    ])
+
+
+def platt_probability(decision, prob_a, prob_b):
+    """
+    Replica SVC.predict_proba (binario) a partir de decision_function:
+    sigmoide de Platt + el acoplamiento iterativo de libsvm (multiclass_probability),
+    que se detiene con eps = 0.005/k y por eso no es una sigmoide pura.
+    Retorna P(clase 1).
+    """
+    # libsvm usa la decisión con el signo opuesto al de sklearn en binario
+    f_ap_b = -decision * prob_a + prob_b
+    with np.errstate(over="ignore"):
+        r01 = np.where(
+            f_ap_b >= 0,
+            np.exp(-f_ap_b) / (1.0 + np.exp(-f_ap_b)),
+            1.0 / (1.0 + np.exp(f_ap_b)),
+        )
+    r01 = np.clip(r01, _LIBSVM_MIN_PROB, 1 - _LIBSVM_MIN_PROB)
+    r10 = 1 - r01
+
+    # multiclass_probability con k=2, vectorizado sobre filas
+    q00, q11 = r10 * r10, r01 * r01
+    q01 = -r10 * r01
+    p0 = np.full_like(r01, 0.5)
+    p1 = np.full_like(r01, 0.5)
+    active = np.ones(r01.shape, dtype=bool)
+    eps = 0.005 / 2
+
+    for _ in range(_LIBSVM_MAX_ITER):
+        qp0 = q00 * p0 + q01 * p1
+        qp1 = q01 * p0 + q11 * p1
+        pqp = p0 * qp0 + p1 * qp1
+        max_error = np.maximum(np.abs(qp0 - pqp), np.abs(qp1 - pqp))
+        active &= ~(max_error < eps)
+        if not active.any():
+            break
+
+        # t = 0
+        diff = (-qp0 + pqp) / q00
+        n0, n1 = p0 + diff, p1
+        pqp_n = (pqp + diff * (diff * q00 + 2 * qp0)) / (1 + diff) / (1 + diff)
+        qp0_n = (qp0 + diff * q00) / (1 + diff)
+        qp1_n = (qp1 + diff * q01) / (1 + diff)
+        n0, n1 = n0 / (1 + diff), n1 / (1 + diff)
+
+        # t = 1
+        diff = (-qp1_n + pqp_n) / q11
+        n1 = n1 + diff
+        n0, n1 = n0 / (1 + diff), n1 / (1 + diff)
+
+        p0 = np.where(active, n0, p0)
+        p1 = np.where(active, n1, p1)
+
+    return p1
+
+
+def score_model(model, X):
+    """Retorna (clase, P(clase 1)) evaluando el modelo una sola vez."""
+    # Evaluadores nativos (src/compiled.py): ya retornan (clase, probabilidad)
+    if hasattr(model, "predict_scores"):
+        return model.predict_scores(X)
+
+    # SVC con probability=True: predict usa el signo de la decisión, no
+    # argmax(proba), así que partimos de decision_function
+    if getattr(model, "probability", False) and hasattr(model, "probA_"):
+        decision = model.decision_function(X)
+        labels = model.classes_.take((decision >= 0).astype(np.intp))
+        return labels, platt_probability(decision, model.probA_[0], model.probB_[0])
+
+    # Árboles, bosques y regresión logística: predict == argmax(predict_proba)
+    if hasattr(model, "predict_proba"):
+        proba = model.predict_proba(X)
+        labels = model.classes_.take(proba.argmax(axis=1))
+        return labels, proba[:, 1]
+
+    # Sin probabilidades: asumimos 100% o 0%
+    labels = model.predict(X)
+    return labels, (labels == 1).astype(np.float64)
+
+
+def invocation_counts(result, model_names):
+    """Filas evaluadas por cada modelo (en cascada, las omitidas tienen clase -1)."""
+    return dict(zip(model_names, (result["predictions"] >= 0).sum(axis=0).tolist()))
+
+
+class EnsembleScorer:
+    """
+    Evalúa los modelos del ensamble en una sola pasada por modelo y
+    calcula clases, votos y consenso con NumPy vectorizado.
+    """
+
+    def __init__(self, models, min_votes, cascade_order=config.ENSEMBLE_CASCADE_ORDER, metrics=telemetry):
+        # Se guarda el mapeo tal cual: puede ser perezoso (engine.LazyModels)
+        self.models = models
+        self.model_names = list(self.models)
+        self.min_votes = min_votes
+        self.dtype = result_dtype(len(self.models))
+        self.compact_dtype = result_dtype(len(self.models), compact=True)
+        # Orden de la cascada: los modelos conocidos por costo, el resto al final
+        self.cascade_order = [name for name in cascade_order if name in self.model_names]
+        self.cascade_order += [name for name in self.model_names if name not in self.cascade_order]
+        # Series de latencia por (modelo, ruta), resueltas una vez. `metrics` permite
+        # aislarlas (ej. la versión en sombra de src/registry.py no se mezcla con producción)
+        self._metrics = metrics
+        self._model_series = {
+            (name, path): metrics.series("model", model=name, path=path)
+            for name in self.model_names for path in ("single", "batch")
+        }
+        self._consensus_series = {path: metrics.series("consensus", path=path) for path in ("single", "batch")}
+
+    def empty(self, n_rows, compact=False):
+        """Reserva el array de resultados para n_rows pacientes (compact: probabilidades en float32)."""
+        return np.empty(n_rows, dtype=self.compact_dtype if compact else self.dtype)
+
+    def finalize(self, result):
+        """Calcula votos, probabilidad promedio y consenso a partir de las columnas por modelo."""
+        result["votes"] = result["predictions"].sum(axis=1)
+        result["probability"] = result["probabilities"].mean(axis=1)
+        result["high_risk"] = result["votes"] >= self.min_votes
+        return result
+
+    def score(self, X, cascade=False):
+        """
+        Puntúa la matriz preprocesada y retorna el array estructurado de resultados.
+        cascade=True delega en score_cascade (mismo consenso, menos evaluaciones).
+        Con X en float32 (modo compacto) el resultado también es compacto.
+        """
+        if cascade:
+            return self.score_cascade(X)
+
+        result = self.empty(X.shape[0], compact=X.dtype == np.float32)
+        path = path_label(X.shape[0])
+
+        for k, (name, model) in enumerate(self.models.items()):
+            began = time.perf_counter()
+            labels, proba = score_model(model, X)
+            self._model_series[name, path].observe(time.perf_counter() - began)
+            result["predictions"][:, k] = labels
+            result["probabilities"][:, k] = proba
+
+        began = time.perf_counter()
+        self.finalize(result)
+        self._consensus_series[path].observe(time.perf_counter() - began)
+        return result
+
+    def score_cascade(self, X, evaluate=None):
+        """
+        Consenso en cascada: los modelos corren en orden de costo creciente y
+        cada fila sale en cuanto su consenso queda decidido (votos >= min_votes,
+        o ni con todos los modelos restantes positivos se llegaría). Los modelos
+        caros solo ven las filas aún abiertas. El consenso es idéntico al de la
+        evaluación completa.
+
+        En las filas que un modelo no evaluó su clase es -1 y su probabilidad NaN;
+        `votes` cuenta los positivos entre los modelos evaluados y `probability`
+        solo se calcula en las filas que pasaron por todos los modelos (NaN en el resto).
+        `evaluate(nombre, filas) -> (clases, probabilidades)` reemplaza la evaluación
+        de cada etapa (ej. el ejecutor paralelo reparte las filas abiertas en su pool).
+        """
+        evaluate = evaluate or (lambda name, rows: score_model(self.models[name], rows))
+        n_rows = X.shape[0]
+        path = path_label(n_rows)
+        result = self.empty(n_rows, compact=X.dtype == np.float32)
+        result["predictions"] = -1
+        result["probabilities"] = np.nan
+        votes = np.zeros(n_rows, dtype=np.int8)
+
+        pending = np.arange(n_rows)
+        remaining = len(self.cascade_order)
+        for name in self.cascade_order:
+            if pending.size == 0:
+                break
+            k = self.model_names.index(name)
+            rows = X if pending.size == n_rows else X[pending]
+
+            began = time.perf_counter()
+            labels, proba = evaluate(name, rows)
+            self._model_series[name, path].observe(time.perf_counter() - began)
+            self._metrics.count("model_rows", pending.size, model=name, mode="cascade")
+
+            result["predictions"][pending, k] = labels
+            result["probabilities"][pending, k] = proba
+            votes[pending] += labels.astype(np.int8)
+            remaining -= 1
+
+            # Siguen abiertas las filas que aún no llegan al umbral pero todavía pueden llegar
+            open_votes = votes[pending]
+            pending = pending[(open_votes < self.min_votes) & (open_votes + remaining >= self.min_votes)]
+
+        began = time.perf_counter()
+        result["votes"] = votes
+        result["high_risk"] = votes >= self.min_votes
+        complete = (result["predictions"] >= 0).all(axis=1)
+        result["probability"] = np.where(complete, result["probabilities"].mean(axis=1), np.nan)
+        self._consensus_series[path].observe(time.perf_counter() - began)
+        return result
@@ -0,0 +1,273 @@
+import argparse
+import time
+import numpy as np
+from src import config
+from src.compiled import CompiledLinearSVC, CompiledLogistic, CompiledSVC, CompiledTrees
+
+# --- EXPLICACIONES POR PREDICCIÓN (EN LOTE) ---
+# Contribución de cada feature a la predicción de cada modelo, vectorizada
+# sobre todas las filas (sin permutaciones ni una librería SHAP por fila):
+#
+#   - Regresión Logística -> exacta: coef_j * x_j en el espacio escalado
+#     (log-odds respecto al paciente medio, que tras el StandardScaler es 0).
+#     Un SVC lineal igual, en unidades de la función de decisión.
+#   - Árbol / Random Forest -> por camino (Saabas): cada división suma a su
+#     feature el cambio de P(Enfermo) entre el nodo y el hijo elegido.
+#     base + suma de contribuciones == predict_proba, exacto.
+#   - SVC (RBF) -> aproximación con una muestra de fondo: f(x) - E_b[f(x con x_j := b_j)],
+#     en unidades de la función de decisión. El kernel RBF se factoriza por
+#     feature, así que E_b[exp(-gamma (b_j - sv_j)²)] se precalcula UNA vez por
+#     vector soporte (caché) y el costo no depende del tamaño del fondo.
+#
+# Las features One-Hot se agrupan en su factor clínico (ChestPainType_ATA ->
+# ChestPainType). Cada modelo habla en sus propias unidades; la combinación
+# normaliza cada modelo por fila (suma de |contribuciones| = 1) y promedia.
+#
+# Presupuesto: EXPLAIN_BUDGET_US_PER_ROW (µs por fila en lote).
+# Uso: python -m src.explain bench [--rows 10000]
+
+# Celdas por bloque (acotan las matrices árboles x filas y filas x vectores soporte)
+_BLOCK_CELLS = 1 << 16
+_KERNEL_BLOCK_CELLS = 1 << 20
+
+# Con pocos valores distintos en una feature (One-Hot, FastingBS), el término
+# esperado del SVC sale de una tabla por valor y un producto matricial
+_SVC_LOOKUP_VALUES = 32
+
+
+def factor_groups(features_names):
+    """Features del modelo -> (factores clínicos, matriz de agrupación (n_features, n_factores))."""
+    factors, index = [], []
+    for name in features_names:
+        factor = name if name in config.REQUIRED_COLUMNS else name.rpartition("_")[0]
+        if factor not in factors:
+            factors.append(factor)
+        index.append(factors.index(factor))
+    groups = np.zeros((len(features_names), len(factors)))
+    groups[np.arange(len(features_names)), index] = 1.0
+    return factors, groups
+
+
+def load_background(plan, path=config.EXPLAIN_BACKGROUND_PATH, n_rows=config.EXPLAIN_BACKGROUND_ROWS,
+                    seed=config.EXPLAIN_SEED):
+    """Muestra de fondo del SVC: pacientes de entrenamiento preprocesados con `plan`."""
+    import pandas as pd
+
+    data = pd.read_csv(path)[config.REQUIRED_COLUMNS]
+    sample = data.sample(min(n_rows, len(data)), random_state=seed)
+    return plan.transform(sample)
+
+
+# --- CONTRIBUCIONES POR TIPO DE MODELO ---
+
+def linear_contributions(model, X):
+    """Regresión logística (log-odds) o SVC lineal (función de decisión): (base, contribuciones)."""
+    return model.intercept, np.asarray(X, dtype=np.float64) * model.coef
+
+
+def tree_contributions(model, X):
+    """Árboles: (base, contribuciones) en P(Enfermo), por camino y promediadas entre árboles."""
+    XT = np.asarray(X, dtype=np.float32).T
+    n_features, n_rows = XT.shape
+    n_trees = model.roots.size
+    value = model.value[:, 1]
+    contributions = np.zeros((n_rows, n_features))
+    block = max(1, _BLOCK_CELLS // n_trees)
+
+    for start in range(0, n_rows, block):
+        xt = np.ascontiguousarray(XT[:, start:start + block])
+        m = xt.shape[1]
+        flat = xt.reshape(-1)
+        columns = np.arange(m)
+        node = np.repeat(model.roots[:, None], m, axis=1)
+        for _ in range(model.max_depth):
+            feature = model.feature.take(node)
+            # Mismo recorrido que CompiledTrees.leaves (umbrales float32)
+            child = model.first_child.take(node) + (flat.take(feature * m + columns) > model.threshold32.take(node))
+            # En las hojas child == node: el cambio es 0
+            delta = value.take(child) - value.take(node)
+            contributions[start:start + m] += np.bincount(
+                (columns * n_features + feature).reshape(-1), weights=delta.reshape(-1), minlength=m * n_features
+            ).reshape(m, n_features)
+            node = child
+
+    if n_trees > 1:
+        contributions /= n_trees
+    return float(value.take(model.roots).mean()), contributions
+
+
+def svc_background_terms(model, background):
+    """
+    Caché del SVC a partir del fondo: E_b[exp(-gamma (b_j - sv_j)²)] por feature
+    y vector soporte (n_features, n_sv), y la decisión media del fondo (base).
+    """
+    diff = background[:, None, :] - model.support_vectors[None, :, :]
+    terms = np.exp(-model.gamma * diff * diff).mean(axis=0).T
+    return terms, float(model.decision_function(background).mean())
+
+
+def svc_contributions(model, X, terms):
+    """SVC: contribuciones (n_filas, n_features) en unidades de la función de decisión."""
+    X = np.asarray(X, dtype=np.float64)
+    sv, alpha, gamma = model.support_vectors, model.dual_coef, model.gamma
+    n_rows, n_features = X.shape
+    contributions = np.empty((n_rows, n_features))
+    block = max(1, _KERNEL_BLOCK_CELLS // sv.shape[0])
+
+    for start in range(0, n_rows, block):
+        Xb = X[start:start + block]
+        m = Xb.shape[0]
+        sq_dist = np.einsum("ij,ij->i", Xb, Xb)[:, None] + model.sv_norms - 2.0 * (Xb @ sv.T)
+        np.maximum(sq_dist, 0.0, out=sq_dist)
+        kernel = np.exp(-gamma * sq_dist)
+        decision = kernel @ alpha
+
+        if m <= _SVC_LOOKUP_VALUES:
+            # Pocas filas (un paciente): todas las features en una sola operación
+            d = Xb[:, :, None] - sv.T[None, :, :]
+            expected = (np.exp(-gamma * (sq_dist[:, None, :] - d * d)) * terms[None]) @ alpha
+            contributions[start:start + m] = decision[:, None] - expected
+            continue
+
+        for j in range(n_features):
+            # K(x_{j <- b}, sv) = K(x, sv) * exp(gamma (x_j - sv_j)²) * exp(-gamma (b_j - sv_j)²)
+            values, inverse = np.unique(Xb[:, j], return_inverse=True)
+            if values.size <= _SVC_LOOKUP_VALUES:
+                d = values[:, None] - sv[None, :, j]
+                weights = np.exp(gamma * d * d) * (terms[j] * alpha)
+                expected = (kernel @ weights.T)[np.arange(m), inverse.reshape(-1)]
+            else:
+                d = Xb[:, j, None] - sv[None, :, j]
+                expected = (np.exp(-gamma * (sq_dist - d * d)) * terms[j]) @ alpha
+            contributions[start:start + m, j] = decision - expected
+    return contributions
+
+
+class Explanation:
+    """
+    Contribuciones por factor clínico de cada modelo para un lote.
+    Positivo = empuja hacia "Enfermo".
+    """
+
+    def __init__(self, factors, base, contributions):
+        self.factors = factors
+        self.base = base                    # {modelo: valor base en sus unidades}
+        self.contributions = contributions  # {modelo: (n_filas, n_factores)} en sus unidades
+        # Peso relativo por modelo (cada fila suma 1 en valor absoluto), promediado
+        shares = []
+        for values in contributions.values():
+            norm = np.abs(values).sum(axis=1, keepdims=True)
+            norm[norm == 0.0] = 1.0
+            shares.append(values / norm)
+        self.combined = np.mean(shares, axis=0)
+
+    def __len__(self):
+        return self.combined.shape[0]
+
+    def take(self, rows):
+        """Explicación de las filas indicadas (ej. expandir las filas únicas al lote original)."""
+        return Explanation(self.factors, self.base, {name: values[rows] for name, values in self.contributions.items()})
+
+    def top(self, i=0, k=config.EXPLAIN_TOP_FACTORS):
+        """Los k factores con más peso en la fila i: [(factor, peso combinado)]."""
+        weights = self.combined[i]
+        order = np.argsort(-np.abs(weights), kind="stable")[:k]
+        return [(self.factors[j], float(weights[j])) for j in order]
+
+    def top_indices(self, k=config.EXPLAIN_TOP_FACTORS):
+        """Índices (n_filas, k) de los k factores con más peso por fila y su signo (+1 / -1)."""
+        order = np.argsort(-np.abs(self.combined), axis=1, kind="stable")[:, :k]
+        signs = np.where(np.take_along_axis(self.combined, order, axis=1) >= 0, 1, -1)
+        return order, signs
+
+    def model_table(self, i=0):
+        """Fila i: {factor: {modelo: contribución}} (unidades de cada modelo)."""
+        return {factor: {name: float(values[i, j]) for name, values in self.contributions.items()}
+                for j, factor in enumerate(self.factors)}
+
+
+class Explainer:
+    """
+    Explicador de los modelos del ensamble. La muestra de fondo y los términos
+    del SVC se calculan la primera vez que se usan y quedan en caché.
+    """
+
+    def __init__(self, models, features_names, background):
+        self.models = models
+        self.factors, self.groups = factor_groups(features_names)
+        self._background = background       # Matriz preprocesada o función que la retorna
+        self._svc_terms = {}
+
+    @property
+    def background(self):
+        if callable(self._background):
+            self._background = self._background()
+        return self._background
+
+    def model_contributions(self, name, X):
+        """(base, contribuciones por feature) de un modelo."""
+        model = self.models[name]
+        if isinstance(model, (CompiledLogistic, CompiledLinearSVC)):
+            return linear_contributions(model, X)
+        if isinstance(model, CompiledTrees):
+            return tree_contributions(model, X)
+        if isinstance(model, CompiledSVC):
+            cached = self._svc_terms.get(name)
+            if cached is None:
+                cached = self._svc_terms[name] = svc_background_terms(model, self.background)
+            terms, base = cached
+            return base, svc_contributions(model, X, terms)
+        raise ValueError(f"Modelo sin explicador: {type(model).__name__}")
+
+    def explain(self, X):
+        """Matriz preprocesada (n_filas, n_features) -> Explanation por factor clínico."""
+        base, contributions = {}, {}
+        for name in self.models:
+            base[name], values = self.model_contributions(name, X)
+            contributions[name] = values @ self.groups
+        return Explanation(self.factors, base, contributions)
+
+
+# --- BENCHMARK ---
+
+def _per_row_us(fn, X, repeats):
+    """Mejor tiempo de `repeats` corridas, en µs por fila."""
+    best = float("inf")
+    for _ in range(repeats):
+        began = time.perf_counter()
+        fn(X)
+        best = min(best, time.perf_counter() - began)
+    return best / X.shape[0] * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Explicaciones por predicción")
+    sub = parser.add_subparsers(dest="command", required=True)
+    bench = sub.add_parser("bench", help="Latencia por fila de las explicaciones frente al presupuesto")
+    bench.add_argument("--rows", type=int, default=10_000)
+    bench.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    import pandas as pd
+    from src.engine import InferenceEngine
+
+    engine = InferenceEngine.load_default()
+    explainer = engine.explainer
+    # Pacientes reales repetidos hasta `rows` (el explicador no deduplica)
+    data = pd.read_csv(config.INTERIM_DATA_PATH)[config.REQUIRED_COLUMNS]
+    X = engine.plan.transform(data.sample(args.rows, replace=True, random_state=config.EXPLAIN_SEED))
+    explainer.explain(X[:10])   # Fondo y caché del SVC fuera de la medición
+
+    for name in explainer.models:
+        us = _per_row_us(lambda X, name=name: explainer.model_contributions(name, X), X, args.repeats)
+        print(f"{name:<24} {us:8.2f} µs/fila")
+    total = _per_row_us(explainer.explain, X, args.repeats)
+    single = _per_row_us(explainer.explain, X[:1], max(args.repeats, 20))
+    print(f"{'Total (lote)':<24} {total:8.2f} µs/fila (presupuesto {config.EXPLAIN_BUDGET_US_PER_ROW} µs)")
+    print(f"{'Un paciente':<24} {single:8.2f} µs")
+    if total > config.EXPLAIN_BUDGET_US_PER_ROW:
+        raise SystemExit(f"Explicaciones sobre el presupuesto: {total:.1f} > {config.EXPLAIN_BUDGET_US_PER_ROW} µs/fila")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import csv
+import io
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from src import config
+
+# --- HISTORIAL PERSISTENTE DE PREDICCIONES ---
+# Almacén local en SQLite, solo de inserción y compartido por todas las
+# sesiones de la app. Los KPIs (total, alto riesgo, último análisis) se
+# actualizan en la misma transacción que cada inserción, así que leerlos es
+# O(1). La pestaña de historial pide solo la página visible (con filtros),
+# paginando por clave (id) en vez de OFFSET.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp   TEXT    NOT NULL,
+    age         INTEGER,
+    sex         TEXT,
+    cholesterol REAL,
+    high_risk   INTEGER NOT NULL,
+    probability REAL    NOT NULL,
+    votes       INTEGER NOT NULL,
+    n_models    INTEGER NOT NULL,
+    patient     TEXT    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_risk ON predictions (high_risk, id);
+CREATE INDEX IF NOT EXISTS idx_predictions_risk_sex ON predictions (high_risk, sex, id);
+CREATE INDEX IF NOT EXISTS idx_predictions_sex ON predictions (sex, id);
+CREATE TABLE IF NOT EXISTS kpis (
+    id             INTEGER PRIMARY KEY CHECK (id = 1),
+    total          INTEGER NOT NULL,
+    high_risk      INTEGER NOT NULL,
+    last_timestamp TEXT
+);
+INSERT OR IGNORE INTO kpis (id, total, high_risk, last_timestamp) VALUES (1, 0, 0, NULL);
+"""
+
+_COLUMNS = ("id", "timestamp", "age", "sex", "cholesterol", "high_risk", "probability", "votes", "n_models")
+
+
+class HistoryStore:
+    """
+    Historial de predicciones en SQLite (modo WAL). Una conexión compartida
+    protegida con un lock: las sesiones de Streamlit corren en hilos distintos.
+    """
+
+    def __init__(self, path=config.HISTORY_DB_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def append(self, patient, result, timestamp=None):
+        """
+        Guarda un diagnóstico (paciente del formulario + resultado de engine.predict_one)
+        y actualiza los KPIs en la misma transacción. Retorna el id del registro.
+        """
+        timestamp = timestamp or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        high_risk = int(bool(result["high_risk"]))
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO predictions (timestamp, age, sex, cholesterol, high_risk, probability,"
+                " votes, n_models, patient) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (timestamp, patient.get("Age"), patient.get("Sex"), patient.get("Cholesterol"), high_risk,
+                 float(result["probability"]), int(result["votes"]), len(result["models"]),
+                 json.dumps(patient, default=str)),
+            )
+            self._conn.execute(
+                "UPDATE kpis SET total = total + 1, high_risk = high_risk + ?, last_timestamp = ? WHERE id = 1",
+                (high_risk, timestamp),
+            )
+            return cursor.lastrowid
+
+    def kpis(self):
+        """Contadores mantenidos de forma incremental: total, high_risk y last_timestamp."""
+        with self._lock:
+            total, high_risk, last = self._conn.execute(
+                "SELECT total, high_risk, last_timestamp FROM kpis WHERE id = 1"
+            ).fetchone()
+        return {"total": total, "high_risk": high_risk, "last_timestamp": last}
+
+    @staticmethod
+    def _where(high_risk=None, sex=None):
+        clauses, params = [], []
+        if high_risk is not None:
+            clauses.append("high_risk = ?")
+            params.append(int(bool(high_risk)))
+        if sex is not None:
+            clauses.append("sex = ?")
+            params.append(sex)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def count(self, high_risk=None, sex=None):
+        """Registros que cumplen los filtros (sin filtros usa el KPI incremental)."""
+        if high_risk is None and sex is None:
+            return self.kpis()["total"]
+        where, params = self._where(high_risk, sex)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM predictions{where}", params).fetchone()[0]
+
+    @staticmethod
+    def _before(where, params, before_id):
+        """Agrega la condición de clave `id < before_id` (paginación por clave, sin OFFSET)."""
+        if before_id is None:
+            return where, params
+        return where + (" AND " if where else " WHERE ") + "id < ?", params + [before_id]
+
+    def page(self, before_id=None, page_rows=config.HISTORY_PAGE_ROWS, high_risk=None, sex=None):
+        """
+        Página de registros, del más reciente al más antiguo, como lista de dicts:
+        los primeros `page_rows` con id menor que `before_id` (None: desde el más reciente).
+        La página siguiente empieza antes del id del último registro de esta; cada
+        una cuesta lo mismo (el índice salta al id, OFFSET recorre las anteriores).
+        """
+        where, params = self._before(*self._where(high_risk, sex), before_id)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM predictions{where} ORDER BY id DESC LIMIT ?",
+                params + [page_rows],
+            ).fetchall()
+        return [dict(zip(_COLUMNS, row)) for row in rows]
+
+    def iter_rows(self, high_risk=None, sex=None, batch_rows=10_000):
+        """Recorre todos los registros filtrados por bloques (para exportar sin cargar todo)."""
+        base_where, base_params = self._where(high_risk, sex)
+        last_id = None
+        while True:
+            where, params = self._before(base_where, base_params, last_id)
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT {', '.join(_COLUMNS)}, patient FROM predictions{where} ORDER BY id DESC LIMIT ?",
+                    params + [batch_rows],
+                ).fetchall()
+            if not rows:
+                return
+            yield from rows
+            last_id = rows[-1][0]
+
+    def export_csv(self, high_risk=None, sex=None):
+        """CSV (bytes) con los registros filtrados y los 11 campos de cada paciente."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(list(_COLUMNS) + config.REQUIRED_COLUMNS)
+        for row in self.iter_rows(high_risk, sex):
+            patient = json.loads(row[-1])
+            writer.writerow(list(row[:-1]) + [patient.get(column) for column in config.REQUIRED_COLUMNS])
+        return buffer.getvalue().encode("utf-8")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,285 @@
+import bisect
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from src import config
+
+# --- INSTRUMENTACIÓN DE LATENCIA POR ETAPA ---
+# Temporizadores y contadores de bajo costo para las etapas de inferencia:
+#
+#   load         -> deserialización de cada artefacto (artifact=...)
+#   preprocess   -> plan de preprocesamiento (path=single|batch)
+#   model        -> evaluación de cada modelo (model=..., path=single|batch)
+#   consensus    -> votos, probabilidad promedio y consenso (path=...)
+#   predict      -> predicción completa (path=...), con filas procesadas
+#   render       -> dibujo de cada pestaña de la app (tab=...)
+#
+# Cada serie es un histograma de buckets fijos (memoria constante, bisect en
+# una lista pequeña). Las rutas calientes resuelven su Series una vez y observar
+# cuesta ~1 µs (lock + bisect), así que queda activo en producción.
+# Se exporta en formato de texto de Prometheus (GET /metrics del servicio HTTP
+# o un archivo) y como logs JSON de una línea por evento (logger
+# "heart_disease.telemetry", a nivel DEBUG: sin handler configurado no se formatea nada).
+
+# Bordes de los buckets en segundos: 1-2.5-5 por década, de 1 µs a 100 s
+_BUCKETS = tuple(float(f"{m}e{e}") for e in range(-6, 2) for m in (1, 2.5, 5)) + (100.0,)
+
+logger = logging.getLogger("heart_disease.telemetry")
+
+
+class LatencyHistogram:
+    """Histograma acumulativo de latencias (conteo por bucket, suma y total)."""
+
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(_BUCKETS) + 1)    # Último bucket: > 100 s
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(_BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """Cuantil estimado por interpolación lineal dentro del bucket (como histogram_quantile)."""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                low = _BUCKETS[i - 1] if i > 0 else 0.0
+                high = _BUCKETS[i] if i < len(_BUCKETS) else _BUCKETS[-1]
+                return low + (high - low) * (rank - seen) / n
+            seen += n
+        return _BUCKETS[-1]
+
+
+class Series:
+    """
+    Una serie (etapa + etiquetas) ya resuelta. Las rutas calientes guardan la
+    serie y llaman a observe directamente, sin reconstruir la clave en cada llamada.
+    """
+
+    __slots__ = ("telemetry", "stage", "labels", "histogram")
+
+    def __init__(self, telemetry, stage, labels, histogram):
+        self.telemetry = telemetry
+        self.stage = stage
+        self.labels = labels
+        self.histogram = histogram
+
+    def observe(self, seconds):
+        if not self.telemetry.enabled:
+            return
+        with self.telemetry._lock:
+            self.histogram.observe(seconds)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(json.dumps({"event": "stage", "stage": self.stage, "seconds": seconds, **self.labels},
+                                    ensure_ascii=False, default=str))
+
+
+class Telemetry:
+    """Registro de histogramas y contadores por (nombre, etiquetas). Seguro entre hilos."""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._series = {}
+        self._counters = {}
+        self._exporter = None
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def series(self, stage, **labels):
+        """Serie de latencias de una etapa (se crea la primera vez)."""
+        key = self._key(stage, labels)
+        series = self._series.get(key)
+        if series is None:
+            with self._lock:
+                series = self._series.get(key)
+                if series is None:
+                    histogram = self._histograms[key] = LatencyHistogram()
+                    series = self._series[key] = Series(self, stage, labels, histogram)
+        return series
+
+    def observe(self, stage, seconds, **labels):
+        """Registra la duración de una etapa."""
+        if self.enabled:
+            self.series(stage, **labels).observe(seconds)
+
+    def count(self, name, value=1, **labels):
+        """Incrementa un contador (filas procesadas, llamadas, aciertos...)."""
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    @contextmanager
+    def timer(self, stage, **labels):
+        """with telemetry.timer("preprocess", path="batch"): ..."""
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - began, **labels)
+
+    def timed(self, stage, **labels):
+        """Decorador equivalente a timer (ej. para las funciones render de las pestañas)."""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(stage, **labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def reset(self):
+        """Pone a cero todas las series (las referencias guardadas siguen siendo válidas)."""
+        with self._lock:
+            for histogram in self._histograms.values():
+                histogram.__init__()
+            self._counters.clear()
+
+    # --- LECTURA Y EXPORTACIÓN ---
+
+    def snapshot(self):
+        """Lista de series con observaciones: conteo, media y p50/p95/p99 en milisegundos."""
+        with self._lock:
+            items = [(key, h.count, h.total, h.quantile(0.5), h.quantile(0.95), h.quantile(0.99))
+                     for key, h in self._histograms.items() if h.count]
+        return [
+            {
+                "stage": name, "labels": dict(labels), "count": count,
+                "mean_ms": total / count * 1e3,
+                "p50_ms": p50 * 1e3, "p95_ms": p95 * 1e3, "p99_ms": p99 * 1e3,
+            }
+            for (name, labels), count, total, p50, p95, p99 in sorted(items, key=lambda item: item[0])
+        ]
+
+    def counters(self):
+        with self._lock:
+            return [{"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self._counters.items())]
+
+    def throughput(self):
+        """Filas/s por ruta: filas procesadas / tiempo acumulado de la etapa predict."""
+        with self._lock:
+            rows = {dict(labels).get("path"): value for (name, labels), value in self._counters.items()
+                    if name == "rows"}
+            seconds = {dict(labels).get("path"): h.total for (name, labels), h in self._histograms.items()
+                       if name == "predict"}
+        return {path: rows[path] / seconds[path] for path in rows if seconds.get(path)}
+
+    def prometheus_text(self, prefix="heart_disease"):
+        """Exposición en formato de texto de Prometheus (histogramas y contadores)."""
+        def render_labels(labels, extra=()):
+            pairs = [f'{k}="{_escape(v)}"' for k, v in (*labels, *extra)]
+            return "{" + ",".join(pairs) + "}" if pairs else ""
+
+        with self._lock:
+            histograms = [(key, list(h.counts), h.total, h.count) for key, h in self._histograms.items()]
+            counters = list(self._counters.items())
+
+        lines = [f"# HELP {prefix}_stage_seconds Duración de cada etapa de inferencia",
+                 f"# TYPE {prefix}_stage_seconds histogram"]
+        for (name, labels), counts, total, count in sorted(histograms):
+            labels = (("stage", name), *labels)
+            cumulative = 0
+            for bound, n in zip(_BUCKETS, counts):
+                cumulative += n
+                lines.append(f"{prefix}_stage_seconds_bucket{render_labels(labels, [('le', repr(bound))])} {cumulative}")
+            lines.append(f"{prefix}_stage_seconds_bucket{render_labels(labels, [('le', '+Inf')])} {count}")
+            lines.append(f"{prefix}_stage_seconds_sum{render_labels(labels)} {total!r}")
+            lines.append(f"{prefix}_stage_seconds_count{render_labels(labels)} {count}")
+
+        for name in sorted({name for (name, _), _ in counters}):
+            lines += [f"# TYPE {prefix}_{name}_total counter"]
+            for (counter, labels), value in sorted(counters):
+                if counter == name:
+                    lines.append(f"{prefix}_{name}_total{render_labels(labels)} {value}")
+
+        lines += [f"# TYPE {prefix}_rows_per_second gauge"]
+        for path, rate in sorted(self.throughput().items()):
+            lines.append(f"{prefix}_rows_per_second{render_labels([('path', path)])} {rate!r}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path=config.TELEMETRY_PROMETHEUS_PATH):
+        """Escribe el archivo de texto (para el textfile collector de node_exporter). Escritura atómica."""
+        from pathlib import Path
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Temporal por proceso: la app y el servicio HTTP pueden exportar al mismo archivo
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(self.prometheus_text(), encoding="utf-8")
+        tmp.replace(path)
+        return path
+
+    def start_export(self, path=config.TELEMETRY_PROMETHEUS_PATH,
+                     interval=config.TELEMETRY_PROMETHEUS_INTERVAL_SECONDS):
+        """
+        Reescribe el archivo de Prometheus cada `interval` segundos en un hilo daemon.
+        Un solo hilo por proceso: las llamadas siguientes no hacen nada.
+        """
+        if not self.enabled or not interval:
+            return None
+        with self._lock:
+            if self._exporter is None:
+                self._exporter = threading.Thread(target=self._export_loop, args=(path, interval),
+                                                  name="telemetry-export", daemon=True)
+                self._exporter.start()
+        return self._exporter
+
+    def _export_loop(self, path, interval):
+        while True:
+            try:
+                self.write_prometheus(path)
+            except OSError:
+                logger.exception("No se pudo escribir %s", path)
+            time.sleep(interval)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class JsonLogFormatter(logging.Formatter):
+    """Formato de una línea JSON por registro (los eventos ya vienen como JSON)."""
+
+    def format(self, record):
+        message = record.getMessage()
+        try:
+            payload = json.loads(message)
+        except ValueError:
+            payload = {"message": message}
+        payload = {"ts": record.created, "level": record.levelname, **payload}
+        return json.dumps(payload, ensure_ascii=False)
+
+
+def configure_json_logs(path=None, level=logging.DEBUG):
+    """Envía los eventos de telemetría como JSON (a un archivo o a stderr)."""
+    handler = logging.FileHandler(path, encoding="utf-8") if path else logging.StreamHandler()
+    handler.setFormatter(JsonLogFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    return handler
+
+
+def path_label(n_rows):
+    """Etiqueta de ruta: un paciente o lote."""
+    return "single" if n_rows == 1 else "batch"
+
+
+# Registro global del proceso (motor, app y servicio HTTP lo comparten)
+telemetry = Telemetry(enabled=config.TELEMETRY_ENABLED)
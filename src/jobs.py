@@ -0,0 +1,420 @@
+import argparse
+import json
+import logging
+import os
+import secrets
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from src import config, streaming
+
+# --- COLA DE TRABAJOS DE CARGA MASIVA ---
+# Un lote ya no se puntúa dentro del hilo del script de Streamlit (bloqueado
+# mientras corre y perdido en el siguiente rerun): la pestaña envía un trabajo
+# y consulta su estado. Cada trabajo tiene:
+#
+#   - una fila en SQLite (JOBS_DB_PATH): estado, progreso, latido y cancelación;
+#   - un directorio en JOBS_DIR/<id>/: la entrada copiada al enviarlo,
+#     results.arrow (Arrow IPC, se escribe al terminar con os.replace) y
+#     summary.json (conteos, rechazos e invocaciones para reabrir los resultados).
+#
+# Un pool acotado de JOBS_WORKERS hilos toma los trabajos en cola con
+# planificación justa: primero el dueño (sesión) con menos trabajos en curso y,
+# a igualdad, el que hace más tiempo que no arranca uno; dentro de cada dueño,
+# en orden de envío. Así un usuario con diez archivos no bloquea al siguiente.
+#
+# Sin trabajo perdido: la entrada se persiste antes de encolar y un trabajo
+# "running" cuyo latido lleva más de JOBS_STALE_SECONDS sin avanzar (el
+# proceso murió) vuelve a la cola, hasta JOBS_MAX_ATTEMPTS intentos. El latido
+# lo da un hilo aparte cada JOBS_HEARTBEAT_SECONDS mientras el trabajo corre,
+# no el avance por bloques: un bloque (o la escritura final) más lento que
+# JOBS_STALE_SECONDS no hace que otro proceso re-encole un trabajo vivo.
+#
+# Uso: python -m src.jobs list | submit <archivo> [--cascade] [--compact] [--explain] | cancel <id> | worker
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id               TEXT    PRIMARY KEY,
+    owner            TEXT    NOT NULL,
+    filename         TEXT    NOT NULL,
+    fmt              TEXT    NOT NULL,
+    options          TEXT    NOT NULL,
+    status           TEXT    NOT NULL,
+    progress         REAL    NOT NULL DEFAULT 0,
+    rows             INTEGER NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    attempts         INTEGER NOT NULL DEFAULT 0,
+    submitted_at     REAL    NOT NULL,
+    started_at       REAL,
+    heartbeat_at     REAL,
+    finished_at      REAL,
+    error            TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, submitted_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_owner ON jobs (owner, submitted_at);
+"""
+
+_COLUMNS = ("id", "owner", "filename", "fmt", "options", "status", "progress", "rows", "cancel_requested",
+            "attempts", "submitted_at", "started_at", "heartbeat_at", "finished_at", "error")
+
+# Siguiente trabajo en cola, en orden justo entre dueños
+_NEXT_JOB = """
+SELECT id FROM jobs AS j
+WHERE status = 'queued' AND cancel_requested = 0
+ORDER BY
+    (SELECT COUNT(*) FROM jobs WHERE owner = j.owner AND status = 'running'),
+    (SELECT COALESCE(MAX(started_at), 0) FROM jobs WHERE owner = j.owner),
+    submitted_at
+LIMIT 1
+"""
+
+_RESULTS_FILE = "results.arrow"
+_SUMMARY_FILE = "summary.json"
+
+logger = logging.getLogger("heart_disease.jobs")
+
+
+class JobCancelled(Exception):
+    """El trabajo se canceló mientras se puntuaba."""
+
+
+class JobManager:
+    """
+    Cola de trabajos persistente y pool acotado de workers. Una conexión
+    SQLite compartida con un lock (igual que HistoryStore); varios procesos
+    pueden compartir la base: la toma de un trabajo es un UPDATE condicionado.
+    """
+
+    def __init__(self, engine, path=config.JOBS_DB_PATH, jobs_dir=config.JOBS_DIR, workers=config.JOBS_WORKERS):
+        self.engine = engine                # InferenceEngine, ServingEngine o ParallelBatchExecutor
+        self.jobs_dir = Path(jobs_dir)
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.workers = workers
+        self.heartbeat_seconds = config.JOBS_HEARTBEAT_SECONDS
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._stop = threading.Event()
+        self._threads = []
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    # --- ENVÍO Y CONSULTA ---
+
+    def submit(self, source, filename, owner, cascade=False, compact=False, explain=False):
+        """
+        Copia la entrada (ruta o archivo abierto, ej. el UploadedFile de Streamlit)
+        al directorio del trabajo y lo encola. Retorna el id del trabajo.
+        """
+        fmt = streaming.detect_format(filename)
+        job_id = f"{datetime.now():%Y%m%d-%H%M%S}-{secrets.token_hex(4)}"
+        job_dir = self.jobs_dir / job_id
+        job_dir.mkdir(parents=True)
+        target = job_dir / f"input{Path(filename).suffix.lower()}"
+
+        # La entrada queda completa en disco antes de que el trabajo exista en la cola
+        partial = target.with_name(target.name + ".tmp")
+        if isinstance(source, (str, Path)):
+            shutil.copyfile(source, partial)
+        else:
+            if hasattr(source, "seek"):
+                source.seek(0)
+            with open(partial, "wb") as f:
+                shutil.copyfileobj(source, f, length=1024 * 1024)
+        os.replace(partial, target)
+
+        options = {"cascade": cascade, "compact": compact, "explain": explain}
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, owner, filename, fmt, options, status, submitted_at)"
+                " VALUES (?, ?, ?, ?, ?, 'queued', ?)",
+                (job_id, owner, Path(filename).name, fmt, json.dumps(options), time.time()),
+            )
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def get(self, job_id):
+        """Estado del trabajo como dict (None si no existe)."""
+        with self._lock:
+            row = self._conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _as_job(row) if row is not None else None
+
+    def list(self, owner=None, limit=50):
+        """Trabajos del más reciente al más antiguo (de un dueño o de todos)."""
+        where, params = ("WHERE owner = ?", [owner]) if owner is not None else ("", [])
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs {where} ORDER BY submitted_at DESC LIMIT ?",
+                params + [limit],
+            ).fetchall()
+        return [_as_job(row) for row in rows]
+
+    def queue_position(self, job_id):
+        """Trabajos en cola enviados antes que este (0 = el siguiente en su turno)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND submitted_at <"
+                " (SELECT submitted_at FROM jobs WHERE id = ?)", (job_id,)
+            ).fetchone()
+        return row[0]
+
+    def cancel(self, job_id):
+        """
+        Pide cancelar un trabajo. Uno en cola se cancela de inmediato; uno en
+        curso se detiene al terminar el bloque que está puntuando.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status IN ('queued', 'running')", (job_id,)
+            )
+            self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id),
+            )
+
+    def results(self, job_id, page_rows=config.BATCH_PAGE_ROWS):
+        """Resultados de un trabajo terminado (StreamedResults de solo lectura, mapeado en memoria)."""
+        job_dir = self.jobs_dir / job_id
+        with open(job_dir / _SUMMARY_FILE, "r") as f:
+            summary = json.load(f)
+        return streaming.StreamedResults.open(job_dir / _RESULTS_FILE, summary, page_rows)
+
+    def export(self, job_id, fmt="csv"):
+        """
+        Archivo de descarga de un trabajo terminado en `fmt` ('csv', 'parquet' o
+        'arrow'). Se escribe por bloques en el directorio del trabajo (memoria
+        constante, nunca el archivo entero en RAM) y se reutiliza en las
+        descargas siguientes. Arrow IPC es el propio archivo de resultados.
+        """
+        if fmt not in config.BATCH_FORMATS:
+            raise ValueError(f"Formato no soportado: '{fmt}'")
+        job_dir = self.jobs_dir / job_id
+        if fmt == "arrow":
+            return job_dir / _RESULTS_FILE
+
+        path = job_dir / f"results{config.BATCH_FORMATS[fmt][0]}"
+        if not path.exists():
+            results = self.results(job_id)
+            # Temporal por hilo: dos sesiones pueden pedir la misma descarga a la vez
+            partial = job_dir / f"{path.name}.{threading.get_ident()}.tmp"
+            try:
+                results.write(partial, fmt)
+                os.replace(partial, path)
+            finally:
+                results.close()
+                partial.unlink(missing_ok=True)
+        return path
+
+    # --- WORKERS ---
+
+    def start(self):
+        """Re-encola los trabajos interrumpidos y lanza el pool de workers (idempotente)."""
+        if self._threads:
+            return self
+        self.recover()
+        self.purge()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"batch-job-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=None):
+        """Detiene los workers al terminar su trabajo actual (los pendientes siguen en la cola)."""
+        self._stop.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def recover(self, stale_seconds=config.JOBS_STALE_SECONDS):
+        """
+        Trabajos "running" sin latido reciente (su proceso murió): vuelven a la
+        cola o, tras JOBS_MAX_ATTEMPTS intentos, quedan fallidos. Retorna cuántos se re-encolaron.
+        """
+        now = time.time()
+        stale = now - stale_seconds
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, error = 'Intentos agotados tras interrupciones'"
+                " WHERE status = 'running' AND heartbeat_at < ? AND attempts >= ?",
+                (now, stale, config.JOBS_MAX_ATTEMPTS),
+            )
+            self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ?"
+                " WHERE status = 'running' AND heartbeat_at < ? AND cancel_requested = 1",
+                (now, stale),
+            )
+            requeued = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', progress = 0, rows = 0"
+                " WHERE status = 'running' AND heartbeat_at < ?", (stale,)
+            ).rowcount
+        if requeued:
+            logger.warning("%d trabajos interrumpidos vuelven a la cola", requeued)
+        return requeued
+
+    def purge(self, retention_hours=config.JOBS_RETENTION_HOURS):
+        """Borra los trabajos terminados hace más de `retention_hours` y sus archivos."""
+        limit = time.time() - retention_hours * 3600
+        with self._lock:
+            old = [row[0] for row in self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('done', 'failed', 'cancelled') AND finished_at < ?", (limit,)
+            )]
+        for job_id in old:
+            shutil.rmtree(self.jobs_dir / job_id, ignore_errors=True)
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        return len(old)
+
+    def _claim(self):
+        """Toma el siguiente trabajo (orden justo). None si la cola está vacía."""
+        with self._lock, self._conn:
+            while True:
+                row = self._conn.execute(_NEXT_JOB).fetchone()
+                if row is None:
+                    return None
+                now = time.time()
+                # Otro proceso pudo tomarlo entre el SELECT y el UPDATE
+                claimed = self._conn.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ?, heartbeat_at = ?,"
+                    " attempts = attempts + 1 WHERE id = ? AND status = 'queued'", (now, now, row[0])
+                ).rowcount
+                if claimed:
+                    return row[0]
+
+    def _work(self):
+        last_recover = time.monotonic()
+        while not self._stop.is_set():
+            job_id = self._claim()
+            if job_id is not None:
+                self._run(job_id)
+                continue
+            # Cola vacía: esperar un envío (o revisar cada JOBS_POLL_SECONDS, otros procesos también encolan)
+            with self._wakeup:
+                self._wakeup.wait(config.JOBS_POLL_SECONDS)
+            if time.monotonic() - last_recover > config.JOBS_STALE_SECONDS:
+                self.recover()
+                last_recover = time.monotonic()
+
+    def _keepalive(self, job_id, done):
+        """Latido periódico del trabajo en curso hasta que `done` se active."""
+        while not done.wait(self.heartbeat_seconds):
+            with self._lock, self._conn:
+                self._conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = 'running'",
+                                   (time.time(), job_id))
+
+    def _heartbeat(self, job_id, fraction, n_rows):
+        """Progreso + latido tras cada bloque; lanza JobCancelled si se pidió cancelar."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET progress = ?, rows = ?, heartbeat_at = ? WHERE id = ?",
+                (fraction, n_rows, time.time(), job_id),
+            )
+            cancel = self._conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+        if cancel:
+            raise JobCancelled(job_id)
+
+    def _finish(self, job_id, status, error=None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, error = ?,"
+                " progress = CASE WHEN ? = 'done' THEN 1 ELSE progress END WHERE id = ?",
+                (status, time.time(), error, status, job_id),
+            )
+
+    def _run(self, job_id):
+        job = self.get(job_id)
+        job_dir = self.jobs_dir / job_id
+        source = next(job_dir.glob("input.*"))
+        results = None
+        done = threading.Event()
+        keepalive = threading.Thread(target=self._keepalive, args=(job_id, done),
+                                     name=f"heartbeat-{job_id}", daemon=True)
+        keepalive.start()
+        try:
+            results = streaming.score_stream(
+                self.engine, source, job["fmt"],
+                progress=lambda fraction, n_rows: self._heartbeat(job_id, fraction, n_rows),
+                **job["options"],
+            )
+            # Archivos completos o ninguno: se escriben aparte y se renombran
+            for name, write in ((_RESULTS_FILE, lambda path: results.write(path, "arrow")),
+                                (_SUMMARY_FILE, lambda path: path.write_text(json.dumps(results.summary())))):
+                partial = job_dir / f"{name}.tmp"
+                write(partial)
+                os.replace(partial, job_dir / name)
+            self._finish(job_id, DONE)
+        except JobCancelled:
+            self._finish(job_id, CANCELLED)
+        except Exception as e:
+            logger.exception("Falló el trabajo %s", job_id)
+            self._finish(job_id, FAILED, f"{type(e).__name__}: {e}")
+        finally:
+            done.set()
+            keepalive.join()
+            if results is not None:
+                results.close()
+
+
+def _as_job(row):
+    job = dict(zip(_COLUMNS, row))
+    job["options"] = json.loads(job["options"])
+    job["cancel_requested"] = bool(job["cancel_requested"])
+    return job
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cola de trabajos de carga masiva")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="Trabajos recientes y su estado")
+    submit = sub.add_parser("submit", help="Encola un archivo (lo procesa un worker o la app)")
+    submit.add_argument("input")
+    submit.add_argument("--cascade", action="store_true")
+    submit.add_argument("--compact", action="store_true")
+    submit.add_argument("--explain", action="store_true")
+    cancel = sub.add_parser("cancel", help="Cancela un trabajo en cola o en curso")
+    cancel.add_argument("job_id")
+    sub.add_parser("worker", help="Procesa la cola en este proceso hasta Ctrl+C")
+    args = parser.parse_args()
+
+    if args.command == "worker":
+        from src.registry import ServingEngine
+
+        logging.basicConfig(level=logging.INFO)
+        manager = JobManager(ServingEngine.load_default()).start()
+        print(f"Procesando la cola con {manager.workers} workers (Ctrl+C para salir)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            manager.stop()
+        return
+
+    manager = JobManager(engine=None)
+    if args.command == "submit":
+        job_id = manager.submit(args.input, args.input, owner="cli", cascade=args.cascade,
+                                compact=args.compact, explain=args.explain)
+        print(f"Trabajo {job_id} en cola")
+    elif args.command == "cancel":
+        manager.cancel(args.job_id)
+        print(f"Cancelación pedida para {args.job_id}")
+    else:
+        for job in manager.list():
+            submitted = datetime.fromtimestamp(job["submitted_at"]).strftime("%Y-%m-%d %H:%M:%S")
+            print(f"{job['id']}  {job['status']:<9} {job['progress']:>4.0%} {job['rows']:>12,} filas  "
+                  f"{submitted}  {job['owner']}  {job['filename']}" + (f"  {job['error']}" if job["error"] else ""))
+
+
+if __name__ == "__main__":
+    main()
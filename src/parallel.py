@@ -0,0 +1,317 @@
+import contextlib
+import copy
+import functools
+import pickle
+import threading
+import time
+import weakref
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from src import config
+from src.bundle import BundleReader
+from src.compiled import compile_model, load_model
+from src.ensemble import score_model
+
+# --- EJECUTOR PARALELO DE LOTES ---
+# Reparte unidades de trabajo (modelo, bloque de filas) en un pool de procesos
+# o hilos y une los resultados en el orden original. Con procesos, cada worker
+# carga los modelos UNA vez (initializer) y la matriz preprocesada viaja por
+# memoria compartida: las tareas solo envían índices, nunca modelos ni datos.
+
+# Estado por proceso worker (lo llena _init_worker)
+_WORKER_MODELS = []
+
+
+def _init_worker(bundle_dir, model_paths):
+    """
+    Carga los modelos una sola vez en cada proceso del pool como evaluadores
+    nativos (src/compiled.py). Los del bundle y los directorios compilados
+    apuntan al mmap, así que los workers comparten esas páginas; los .pkl
+    sueltos se compilan en cada proceso.
+    """
+    global _WORKER_MODELS
+    if bundle_dir is not None:
+        reader = BundleReader(bundle_dir, verify=False)
+        _WORKER_MODELS = [reader.load_compiled(name) for name in reader.model_names]
+        return
+
+    _WORKER_MODELS = []
+    for path in map(Path, model_paths):
+        if path.is_dir():
+            _WORKER_MODELS.append(load_model(path))
+            continue
+        with open(path, "rb") as f:
+            _WORKER_MODELS.append(compile_model(pickle.load(f)))
+
+
+def _score_shared(model_index, shm_name, shape, dtype, start, stop):
+    """Tarea de proceso: puntúa las filas [start, stop) leyendo X de memoria compartida."""
+    began = time.thread_time()
+    shm = shared_memory.SharedMemory(name=shm_name)
+    X = np.ndarray(shape, dtype=dtype, buffer=shm.buf)[start:stop]
+    labels, proba = score_model(_WORKER_MODELS[model_index], X)
+
+    # Liberamos la vista antes de cerrar el segmento
+    del X
+    shm.close()
+    return labels, proba, time.thread_time() - began
+
+
+def _score_local(model, X):
+    """Tarea de hilo: comparte los modelos y la matriz del proceso principal."""
+    began = time.thread_time()
+    labels, proba = score_model(model, X)
+    return labels, proba, time.thread_time() - began
+
+
+class _ProcessPools:
+    """
+    Un pool de procesos por versión de los modelos (huella del motor). Cada lote
+    toma el pool de su versión al empezar y lo suelta al terminar, incluidas
+    todas las etapas de la cascada; las copias de pinned() lo retienen mientras
+    existan. Un pool que ya no es el de la versión vigente se cierra cuando
+    nadie lo retiene.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._lock = threading.RLock()
+        self._pools = {}        # huella -> pool
+        self._holders = {}      # huella -> lotes en curso y copias fijadas
+
+    def acquire(self, engine, latest):
+        """Pool con los modelos de `engine` (se crea si no existe). Retorna (pool, huella)."""
+        fingerprint = engine.fingerprint
+        with self._lock:
+            if fingerprint not in self._pools:
+                self._pools[fingerprint] = self._factory(engine)
+                self._holders[fingerprint] = 0
+            self._holders[fingerprint] += 1
+            pool = self._pools[fingerprint]
+            idle = self._pop_idle(latest)
+        for old in idle:
+            old.shutdown(wait=False)
+        return pool, fingerprint
+
+    def release(self, fingerprint, latest):
+        with self._lock:
+            if fingerprint in self._holders:
+                self._holders[fingerprint] -= 1
+            idle = self._pop_idle(latest)
+        for old in idle:
+            old.shutdown(wait=False)
+
+    def _pop_idle(self, latest):
+        """Pools de otras versiones que nadie retiene (se llama con el lock tomado)."""
+        idle = [fp for fp, n in self._holders.items() if n == 0 and fp != latest]
+        for fp in idle:
+            del self._holders[fp]
+        return [self._pools.pop(fp) for fp in idle]
+
+    def shutdown(self):
+        with self._lock:
+            pools, self._pools, self._holders = list(self._pools.values()), {}, {}
+        for pool in pools:
+            pool.shutdown()
+
+
+class ParallelBatchExecutor:
+    """
+    Misma interfaz de lote que InferenceEngine (predict_many, model_names),
+    pero repartiendo el trabajo en varios núcleos.
+    Tras cada llamada, `last_report` guarda tiempos, el speedup conseguido y la
+    utilización del pool. El speedup compara el tiempo en serie de la misma
+    puntuación (la suma del CPU de cada tarea) con el tiempo real del lote;
+    `python -m src.benchmark scaling` lo mide contra el motor en serie.
+    Con un motor de recarga en caliente (src/registry.py) cada lote usa una sola
+    versión y, con procesos, el pool de esa versión (_ProcessPools): una versión
+    nueva crea un pool nuevo y los lotes en curso terminan en el anterior.
+    """
+
+    def __init__(self, engine, max_workers=config.BATCH_WORKERS,
+                 backend=config.BATCH_PARALLEL_BACKEND, task_rows=config.BATCH_TASK_ROWS):
+        if backend not in ("process", "thread"):
+            raise ValueError(f"Backend no soportado: {backend}")
+
+        self.engine = engine
+        self._serving = engine          # Motor servido (las copias de pinned() lo conservan)
+        self.backend = backend
+        self.max_workers = max_workers
+        self.task_rows = task_rows
+        self.last_report = None
+
+        if backend == "process":
+            # Las copias de pinned() comparten los pools
+            self._pools = _ProcessPools(self._process_pool)
+            # Arranca los workers de la versión vigente
+            self._release(self._pools.acquire(self._latest(), self._latest().fingerprint)[1])
+        else:
+            self._pools = None
+            self.pool = ThreadPoolExecutor(max_workers=max_workers)
+
+    def _process_pool(self, engine):
+        # 'spawn' evita clonar el servidor (hilos de Streamlit) con fork
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(engine.bundle_dir, [str(engine.compiled_files.get(name, path))
+                                          for name, path in engine.model_files.items()]),
+        )
+
+    def _latest(self):
+        """Versión vigente del motor servido (la de un pool que no se debe cerrar aunque esté ocioso)."""
+        return getattr(self._serving, "current", self._serving)
+
+    @contextlib.contextmanager
+    def _pool_for(self, engine):
+        """Pool del lote: con procesos, el de la versión de `engine` mientras dure el lote."""
+        if self._pools is None:
+            yield self.pool
+            return
+        pool, fingerprint = self._pools.acquire(engine, self._latest().fingerprint)
+        try:
+            yield pool
+        finally:
+            self._release(fingerprint)
+
+    def _release(self, fingerprint):
+        self._pools.release(fingerprint, self._latest().fingerprint)
+
+    @property
+    def model_names(self):
+        return self.engine.model_names
+
+    @property
+    def scorer(self):
+        return self.engine.scorer
+
+    def pinned(self):
+        """Copia que comparte el pool con el motor fijado en su versión vigente (un archivo completo)."""
+        pinned = copy.copy(self)
+        if hasattr(self.engine, "pinned"):
+            pinned.engine = self.engine.pinned()
+        if self._pools is not None:
+            # El pool de la versión fijada sigue abierto mientras exista la copia
+            engine = getattr(pinned.engine, "current", pinned.engine)
+            fingerprint = self._pools.acquire(engine, self._latest().fingerprint)[1]
+            weakref.finalize(pinned, self._release, fingerprint)
+        return pinned
+
+    def predict_many(self, data, cascade=False, compact=False):
+        """
+        Preprocesa, deduplica y puntúa el lote en paralelo. Retorna el array estructurado de src/ensemble.py.
+        Sin cascada el pool reparte (modelo, bloque) de los 4 modelos a la vez.
+        cascade=True: consenso en cascada (EnsembleScorer.score_cascade); cada etapa
+        reparte en el pool solo las filas aún abiertas del siguiente modelo.
+        compact=True: matriz float32 (también en memoria compartida) y resultado compacto.
+        """
+        # Una sola versión del motor para todo el lote
+        engine = getattr(self.engine, "current", self.engine)
+        X = engine.preprocess(data, dtype=np.float32 if compact else np.float64)
+        with self._pool_for(engine) as pool:
+            result = engine.score_deduplicated(X, functools.partial(self.score, engine=engine, cascade=cascade,
+                                                                    pool=pool))
+
+        # Modo sombra del registro (si el motor lo tiene)
+        mirror = getattr(self.engine, "mirror", None)
+        if mirror is not None:
+            mirror(data, result, engine.model_names)
+        return result
+
+    def explain_many(self, data):
+        """Explicaciones del lote (vectorizadas, en el proceso principal: ver InferenceEngine.explain_many)."""
+        return getattr(self.engine, "current", self.engine).explain_many(data)
+
+    def _submit(self, pool, scorer, k, X, shm):
+        """Envía las tareas (modelo k, bloque de filas) de X. Con procesos, X ya está al inicio de `shm`."""
+        futures = []
+        for start in range(0, X.shape[0], self.task_rows):
+            stop = min(start + self.task_rows, X.shape[0])
+            if shm is not None:
+                future = pool.submit(_score_shared, k, shm.name, X.shape, X.dtype.str, start, stop)
+            else:
+                future = pool.submit(_score_local, scorer.models[scorer.model_names[k]], X[start:stop])
+            futures.append((future, start, stop))
+        return futures
+
+    def score(self, X, engine=None, cascade=False, pool=None):
+        """
+        Puntúa la matriz preprocesada repartiendo (modelo, bloque) en el pool.
+        `pool` es el que tomó predict_many para el lote; si no se indica, se toma aquí.
+        """
+        engine = engine or getattr(self.engine, "current", self.engine)
+        if pool is None:
+            with self._pool_for(engine) as pool:
+                return self.score(X, engine, cascade, pool)
+
+        began = time.perf_counter()
+        n_rows = X.shape[0]
+        scorer = engine.scorer
+        busy_seconds, n_tasks = 0.0, 0
+
+        shm = shared = None
+        try:
+            if self.backend == "process":
+                shm = shared_memory.SharedMemory(create=True, size=max(X.nbytes, 1))
+                shared = np.ndarray(X.shape, dtype=X.dtype, buffer=shm.buf)
+                shared[:] = X
+
+            if cascade:
+                def evaluate(name, rows):
+                    # Etapa de la cascada: las filas abiertas van al inicio del segmento compartido
+                    nonlocal busy_seconds, n_tasks
+                    if shm is not None and rows is not X:
+                        shared[:rows.shape[0]] = rows
+                    labels, proba = np.empty(rows.shape[0], dtype=np.int64), np.empty(rows.shape[0])
+                    futures = self._submit(pool, scorer, scorer.model_names.index(name), rows, shm)
+                    for future, start, stop in futures:
+                        labels[start:stop], proba[start:stop], elapsed = future.result()
+                        busy_seconds += elapsed
+                    n_tasks += len(futures)
+                    return labels, proba
+
+                result = scorer.score_cascade(X, evaluate=evaluate)
+            else:
+                result = scorer.empty(n_rows, compact=X.dtype == np.float32)
+                futures = {k: self._submit(pool, scorer, k, X, shm) for k in range(len(scorer.model_names))}
+                # Unimos cada bloque en su posición original
+                for k, tasks in futures.items():
+                    for future, start, stop in tasks:
+                        labels, proba, elapsed = future.result()
+                        result["predictions"][start:stop, k] = labels
+                        result["probabilities"][start:stop, k] = proba
+                        busy_seconds += elapsed
+                    n_tasks += len(tasks)
+                scorer.finalize(result)
+        finally:
+            if shm is not None:
+                # Liberamos la vista antes de cerrar el segmento
+                shared = None
+                shm.close()
+                shm.unlink()
+
+        wall_seconds = time.perf_counter() - began
+        self.last_report = {
+            "backend": self.backend,
+            "workers": self.max_workers,
+            "tasks": n_tasks,
+            "rows": n_rows,
+            "cascade": cascade,
+            "wall_seconds": wall_seconds,
+            "busy_seconds": busy_seconds,
+            # CPU acumulado de las tareas (= tiempo en serie de esa puntuación) / tiempo real
+            "speedup": busy_seconds / wall_seconds if wall_seconds > 0 else 1.0,
+            # Fracción del tiempo real en que los workers estuvieron puntuando
+            "utilization": busy_seconds / (wall_seconds * self.max_workers) if wall_seconds > 0 else 0.0,
+        }
+        return result
+
+    def close(self):
+        if self._pools is not None:
+            self._pools.shutdown()
+        else:
+            self.pool.shutdown()
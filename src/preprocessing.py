@@ -1,50 +1,67 @@
-import pandas as pd
-import numpy as np
-import pickle
-import json
 import streamlit as st
 from src import config
+from src.engine import InferenceEngine
+from src.history_store import HistoryStore
+from src.instrumentation import configure_json_logs, path_label, telemetry
+from src.jobs import JobManager
+from src.parallel import ParallelBatchExecutor
+from src.preprocessing_plan import PreprocessingPlan
+from src.registry import ServingEngine
 
 # --- FUNCIÓN DE CARGA DE MODELOS Y ARTEFACTOS ---
 
 # Carga en caché para mejor la velocidad 
 @st.cache_resource
-def load_all_artifacts():
+def load_engine():
     """
-    Carga todos los modelos y transformadores una sola vez en memoria.
-    Retorna un diccionario con todo listo para usar.
+    Crea el motor de inferencia (src/engine.py) una sola vez en memoria.
+    Si hay un bundle vigente (src/bundle.py) se lee desde él; si no, desde los .pkl.
+    Los artefactos se cargan de forma perezosa (al primer uso o con engine.preload_async).
+    El motor se recarga en caliente al promover otra versión (src/registry.py),
+    sin reiniciar el proceso ni perder sesiones.
+    El motor es independiente de Streamlit; aquí solo reportamos los errores en la UI.
     """
-    artifacts = {}
-    
-    # Cargar Modelos
-    artifacts["models"] = {}
-    for name, path in config.MODEL_FILES.items():
-        try:
-            with open(path, "rb") as f:
-                artifacts["models"][name] = pickle.load(f)
-        except FileNotFoundError:
-            st.error(f"Error Crítico: No se encontró el modelo {name} en {path}")
-            return None
-
-    # Cargar Scaler, Imputer y Features Names y las Metrics
+    if config.TELEMETRY_LOG_PATH:
+        # Logs JSON por etapa (una sola vez: esta función se cachea)
+        configure_json_logs(config.TELEMETRY_LOG_PATH)
+    # Archivo para el textfile collector de Prometheus (data/06_reporting/telemetry.prom)
+    telemetry.start_export()
     try:
-        with open(config.SCALER_PATH, "rb") as f:
-            artifacts["scaler"] = pickle.load(f)
-            
-        with open(config.IMPUTER_PATH, "rb") as f:
-            artifacts["imputer"] = pickle.load(f)
-            
-        with open(config.FEATURES_PATH, "rb") as f:
-            artifacts["features_names"] = pickle.load(f)
-            
-        with open(config.METRICS_PATH, "r") as f:
-            artifacts["metrics"] = json.load(f)
-            
+        with telemetry.timer("load", artifact="engine"):
+            return ServingEngine(InferenceEngine.load_default()).start()
     except FileNotFoundError as e:
-        st.error(f"Error Crítico: Falta un artefacto de preprocesamiento. {e}")
+        st.error(f"Error Crítico: Falta un modelo o artefacto de preprocesamiento. {e}")
+        return None
+    except ValueError as e:
+        st.error(f"Error Crítico: El bundle de artefactos está dañado. {e}")
         return None
-        
-    return artifacts
+
+
+@st.cache_resource
+def load_executor(_engine):
+    """
+    Pool paralelo para la carga masiva (src/parallel.py), compartido entre sesiones.
+    Retorna None si solo hay un worker configurado (se puntúa en serie con el motor).
+    """
+    if config.BATCH_WORKERS <= 1:
+        return None
+    return ParallelBatchExecutor(_engine)
+
+
+@st.cache_resource
+def load_job_manager(_engine):
+    """
+    Cola de trabajos de la carga masiva (src/jobs.py), compartida entre sesiones.
+    Los workers viven en el proceso del servidor: los reruns no interrumpen un lote.
+    """
+    return JobManager(load_executor(_engine) or _engine).start()
+
+
+@st.cache_resource
+def load_history_store():
+    """Historial persistente de predicciones (src/history_store.py), compartido entre sesiones."""
+    return HistoryStore()
+
 
 # --- MOTOR DE TRANSFORMACIÓN ---
 
@@ -53,25 +70,13 @@ def preprocess_input(input_df, artifacts):
     """
     Toma el DataFrame crudo del usuario (formulario) y lo transforma
     exactamente como se hizo en el entrenamiento (One-Hot + Imputer + Scaler).
+    Usa el plan compilado (src/preprocessing_plan.py): sin get_dummies ni reindex.
     """
-    # --- One-Hot Encoding ---
-    # Pandas genera columnas como 'Sex_M', 'ChestPainType_TA', etc.
-    df_encoded = pd.get_dummies(input_df)
-    
-    # --- ALINEACIÓN ---
-    # El modelo espera ver TODAS las columnas con las que fue entrenado (artifacts['features_names']).
-    # Si el usuario eligió "Male", la columna "Sex_F" no existirá. 
-    # 'reindex' crea las columnas faltantes y las rellena con 0.
-    expected_columns = artifacts["features_names"]
-    df_aligned = df_encoded.reindex(columns=expected_columns, fill_value=0)
-    
-    # --- Imputación ---
-    # Rellenar nulos si hubiese, por seguridad
-    imputer = artifacts["imputer"]
-    array_imputed = imputer.transform(df_aligned)
-    
-    # --- Escalado (Normalización)---
-    scaler = artifacts["scaler"]
-    array_scaled = scaler.transform(array_imputed)
-    
-    return array_scaled
\ No newline at end of file
+    # El motor ya trae el plan compilado; si no, lo construimos desde los artefactos
+    plan = artifacts.get("plan")
+    if plan is None:
+        plan = PreprocessingPlan.from_artifacts(
+            artifacts["features_names"], artifacts["imputer"], artifacts["scaler"]
+        )
+    with telemetry.timer("preprocess", path=path_label(len(input_df))):
+        return plan.transform(input_df)
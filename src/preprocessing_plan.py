@@ -0,0 +1,176 @@
+import numpy as np
+
+# --- PLAN DE PREPROCESAMIENTO COMPILADO ---
+# Sustituye la cadena get_dummies -> reindex -> SimpleImputer -> StandardScaler
+# por un único kernel NumPy. El plan se construye UNA vez a partir de
+# features_names.pkl, las medianas del imputer y la media/escala del scaler.
+
+
+# Filas por bloque en modo compacto (acota el buffer float64 intermedio)
+_COMPACT_BLOCK_ROWS = 8192
+
+
+def as_columns(data):
+    """
+    Normaliza la entrada a un diccionario {columna: array} y su número de filas.
+    Acepta un paciente (dict de escalares), una lista de pacientes (dicts),
+    un dict de columnas, un DataFrame o una tabla / RecordBatch de Arrow.
+    """
+    # Tabla o RecordBatch de Arrow (antes que DataFrame: también tiene .columns)
+    if hasattr(data, "column_names"):
+        return {name: _column_from_arrow(data.column(name)) for name in data.column_names}, data.num_rows
+
+    # DataFrame (detectado por duck typing para no importar pandas)
+    if hasattr(data, "columns"):
+        return {col: _column_from_series(data[col]) for col in data.columns}, len(data)
+
+    # Lista de registros: la convertimos a columnas
+    if isinstance(data, (list, tuple)):
+        keys = []
+        for record in data:
+            keys.extend(k for k in record if k not in keys)
+        columns = {k: _column_from_values([r.get(k) for r in data]) for k in keys}
+        return columns, len(data)
+
+    # Un solo paciente (todos los valores escalares)
+    if all(np.ndim(v) == 0 for v in data.values()):
+        return {k: _column_from_values([v]) for k, v in data.items()}, 1
+
+    # Diccionario de columnas
+    columns = {k: np.asarray(v) for k, v in data.items()}
+    n_rows = len(next(iter(columns.values()))) if columns else 0
+    return columns, n_rows
+
+
+def _column_from_values(values):
+    """Infiere el tipo de una columna igual que Pandas: texto -> object, resto -> float/int."""
+    if any(isinstance(v, str) for v in values):
+        return np.array(values, dtype=object)
+    if any(v is None for v in values):
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    return np.asarray(values)
+
+
+def _column_from_series(series):
+    """
+    Columna de un DataFrame -> array NumPy. Las de texto se factorizan: cada
+    categoría es un único str compartido (to_numpy sobre texto de Arrow crea un
+    str por celda, el mayor costo de memoria de un lote grande).
+    """
+    if series.dtype.kind != "O":
+        return series.to_numpy()
+    codes, uniques = series.factorize()
+    # Código -1 (faltante) -> último elemento de la tabla (NaN, como to_numpy)
+    return np.append(np.asarray(uniques, dtype=object), np.nan)[codes]
+
+
+def _column_from_arrow(column):
+    """Columna de Arrow -> array NumPy (nulos numéricos como NaN, texto como object)."""
+    if hasattr(column.type, "value_type"):
+        # Diccionario (categórica de Pandas/Parquet): se decodifica antes de convertir,
+        # to_numpy sobre los índices no respeta los nulos
+        column = column.cast(column.type.value_type)
+    return column.to_numpy(zero_copy_only=False)
+
+
+def _is_categorical(column):
+    # pd.get_dummies solo codifica columnas de texto/objeto
+    return column.dtype.kind in "OUS"
+
+
+class PreprocessingPlan:
+    """
+    Kernel de preprocesamiento compilado.
+
+    - Columnas numéricas: se copian directo a su posición.
+    - Columnas categóricas: tabla de búsqueda valor -> columna One-Hot.
+    - Imputación de NaN con las medianas y Escalado en un solo paso afín
+      sobre el array preasignado.
+
+    El resultado es idéntico (bit a bit) a preprocess_input.
+    """
+
+    def __init__(self, features_names, medians, mean, scale):
+        self.features_names = list(features_names)
+        self.n_features = len(self.features_names)
+        self.medians = np.asarray(medians, dtype=np.float64)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+
+        # Tablas de búsqueda: 'ST_Slope_Flat' -> lookup['ST_Slope'] = {'Flat': j}
+        self.lookup = {}
+        for j, feature in enumerate(self.features_names):
+            raw_name, _, value = feature.rpartition("_")
+            if raw_name:
+                self.lookup.setdefault(raw_name, {})[value] = j
+
+    @classmethod
+    def from_artifacts(cls, features_names, imputer, scaler):
+        """Compila el plan a partir de los artefactos serializados del entrenamiento."""
+        n = len(features_names)
+        mean = scaler.mean_ if scaler.with_mean else np.zeros(n)
+        scale = scaler.scale_ if scaler.with_std else np.ones(n)
+        return cls(features_names, imputer.statistics_, mean, scale)
+
+    def transform(self, data, out=None, dtype=np.float64):
+        """
+        Transforma la entrada cruda a la matriz escalada (n_filas, n_features).
+        `out` permite reutilizar un buffer ya reservado (ej. procesamiento por bloques).
+        dtype=np.float32 (modo compacto): se calcula en float64 por bloques de
+        filas y se redondea una sola vez, así X32 == float32(X64) bit a bit.
+        """
+        columns, n_rows = as_columns(data)
+        if out is None:
+            out = np.empty((n_rows, self.n_features), dtype=dtype)
+        else:
+            out = out[:n_rows]
+
+        if out.dtype == np.float64:
+            return self._transform_rows(columns, 0, n_rows, out)
+
+        block = np.empty((min(n_rows, _COMPACT_BLOCK_ROWS), self.n_features), dtype=np.float64)
+        for start in range(0, n_rows, _COMPACT_BLOCK_ROWS):
+            stop = min(start + _COMPACT_BLOCK_ROWS, n_rows)
+            out[start:stop] = self._transform_rows(columns, start, stop, block[:stop - start])
+        return out
+
+    def _transform_rows(self, columns, start, stop, out):
+        """Filas [start, stop) de las columnas crudas -> `out` float64 (n_filas, n_features)."""
+        n_rows = stop - start
+
+        # Buffer por feature (cada fila contigua): escribir columnas sueltas en
+        # `out` (C-order) sería un acceso con saltos, mucho más lento en lotes grandes
+        staging = np.empty((self.n_features, n_rows), dtype=np.float64)
+        written = np.zeros(self.n_features, dtype=bool)
+
+        for j, feature in enumerate(self.features_names):
+            column = columns.get(feature)
+            if column is not None and not _is_categorical(column):
+                # Columna numérica (o ya codificada) presente en la entrada
+                staging[j] = column[start:stop]
+                written[j] = True
+
+                # --- Imputación --- (NaN -> mediana del entrenamiento)
+                missing = np.isnan(staging[j])
+                if missing.any():
+                    staging[j][missing] = self.medians[j]
+
+        for raw_name, table in self.lookup.items():
+            raw = columns.get(raw_name)
+            if raw is None or not _is_categorical(raw):
+                continue
+            raw = raw[start:stop]
+            # Cada valor conocido activa su columna One-Hot (valores no vistos quedan en 0)
+            for value, j in table.items():
+                if not written[j]:
+                    staging[j] = raw == value
+                    written[j] = True
+
+        # Toda columna ausente vale 0 (igual que reindex(fill_value=0))
+        staging[~written] = 0.0
+
+        # --- Escalado --- (mismas operaciones que StandardScaler: restar y dividir)
+        # La resta lee el buffer transpuesto y escribe directo en `out`
+        np.subtract(staging.T, self.mean, out=out)
+        np.divide(out, self.scale, out=out)
+        return out
@@ -0,0 +1,315 @@
+import argparse
+import copy
+import math
+import time
+import numpy as np
+import pandas as pd
+from scipy.special import expit
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, f1_score, recall_score
+from sklearn.svm import SVC
+from sklearn.tree import DecisionTreeClassifier
+from src import bundle, config, train
+from src.preprocessing_plan import PreprocessingPlan
+
+# --- RE-ENTRENAMIENTO INCREMENTAL ---
+# Absorbe casos con diagnóstico confirmado (mismo formato que data/02_interim:
+# las 11 columnas + HeartDisease, NaN donde falte el dato) sin repetir la
+# búsqueda de hiperparámetros sobre todo el histórico. Por cada lote nuevo:
+#
+#   - Imputer: medianas exactas a partir del conteo de valores de cada columna.
+#   - Scaler: media/varianza acumuladas (StandardScaler.partial_fit).
+#   - Los modelos se re-expresan en la nueva escala: Regresión Logística y
+#     árboles de forma exacta (coeficientes y umbrales, salvo el redondeo a
+#     float32 de los árboles); el SVC trasladando sus vectores soporte (exacto
+#     en la media, aproximado en la escala).
+#   - Regresión Logística: pasos de Newton sobre el lote nuevo + la aproximación
+#     cuadrática (Laplace) de la función objetivo del histórico.
+#   - Random Forest: árboles nuevos entrenados con el lote (en proporción a su
+#     tamaño) que se añaden al bosque; pasado REFRESH_RF_MAX_TREES se descartan
+#     los más antiguos.
+#
+# El coste de cada lote depende de sus filas, no del histórico: el estado
+# acumulado (conteos, precisión de la logística, filas vistas) viaja dentro
+# del bundle. Cada refresco publica una versión nueva con sus métricas en el
+# test set original y las métricas "prequential" (cada lote se puntúa antes
+# de absorberlo).
+#
+# Uso: python -m src.refresh casos_nuevos.csv [--batch-rows 256] [--no-current]
+
+# Nombre en la app -> clave de metrics.json
+_METRIC_KEYS = {name: key for key, (name, _, _) in train.SEARCHES.items()}
+
+
+def _median_from_counts(counts):
+    """Mediana exacta (como np.median) a partir de {valor: conteo}."""
+    values = np.array(sorted(counts))
+    cumulative = np.cumsum([counts[v] for v in values])
+    n = int(cumulative[-1])
+    low = values[np.searchsorted(cumulative, (n - 1) // 2, side="right")]
+    high = values[np.searchsorted(cumulative, n // 2, side="right")]
+    return (low + high) / 2
+
+
+def _encode(frame, features_names):
+    """Filas crudas -> matriz One-Hot sin imputar ni escalar (NaN se conserva)."""
+    n = len(features_names)
+    plan = PreprocessingPlan(features_names, np.full(n, np.nan), np.zeros(n), np.ones(n))
+    return plan.transform(frame[config.REQUIRED_COLUMNS])
+
+
+# --- REGRESIÓN LOGÍSTICA: NEWTON CON PRIOR CUADRÁTICO ---
+
+def _theta(model):
+    return np.append(model.coef_[0], model.intercept_[0])
+
+
+def _set_theta(model, theta):
+    model.coef_ = theta[None, :-1].copy()
+    model.intercept_ = theta[-1:].copy()
+
+
+def _logistic_curvature(model, X):
+    """Hessiano de C·Σ log-loss en los parámetros (coef, intercepto)."""
+    Xa = np.column_stack([X, np.ones(len(X))])
+    p = expit(Xa @ _theta(model))
+    return model.C * (Xa.T * (p * (1 - p))) @ Xa
+
+
+def _logistic_regularization(model):
+    """Hessiano del término L2 (liblinear también penaliza el intercepto)."""
+    diagonal = np.ones(model.coef_.shape[1] + 1)
+    if model.solver != "liblinear":
+        diagonal[-1] = 0.0
+    return np.diag(diagonal)
+
+
+def _newton_update(model, precision, X, y, iterations=config.REFRESH_NEWTON_ITERATIONS):
+    """
+    Minimiza ½(θ-θ₀)ᵀH(θ-θ₀) + C·Σ log-loss(lote nuevo) partiendo de θ₀.
+    H (precision) resume el histórico; retorna la precisión actualizada.
+    """
+    Xa = np.column_stack([X, np.ones(len(X))])
+    theta0 = _theta(model)
+    theta = theta0.copy()
+    for _ in range(iterations):
+        p = expit(Xa @ theta)
+        gradient = precision @ (theta - theta0) + model.C * Xa.T @ (p - y)
+        hessian = precision + model.C * (Xa.T * (p * (1 - p))) @ Xa
+        step = np.linalg.solve(hessian, gradient)
+        theta -= step
+        if np.abs(step).max() < 1e-10:
+            break
+    _set_theta(model, theta)
+    return precision + _logistic_curvature(model, X)
+
+
+# --- CAMBIO DE ESCALA ---
+# Con la escala vieja z = (x - m)/s y la nueva z' = (x - m')/s':
+#     z = a·z' + c,   a = s'/s,   c = (m' - m)/s
+
+def _rescale_logistic(model, precision, a, c):
+    """w·z + b = (a·w)·z' + (b + w·c): mismo modelo, y la precisión transformada (H' = T⁻ᵀ H T⁻¹)."""
+    d = a.size
+    T = np.zeros((d + 1, d + 1))
+    T[np.arange(d), np.arange(d)] = a
+    T[d, :d] = c
+    T[d, d] = 1.0
+    _set_theta(model, T @ _theta(model))
+    T_inv = np.linalg.inv(T)
+    return T_inv.T @ precision @ T_inv
+
+
+def _rescale_tree(tree, a, c):
+    """z <= t  <=>  z' <= (t - c)/a  (a > 0): mismos caminos para los mismos pacientes."""
+    state = tree.tree_.__getstate__()
+    nodes = state["nodes"]
+    split = nodes["feature"] >= 0
+    features = nodes["feature"][split]
+    nodes["threshold"][split] = (nodes["threshold"][split] - c[features]) / a[features]
+    tree.tree_.__setstate__(state)
+
+
+def _rescale_svc(model, a, c):
+    """Vectores soporte en la escala nueva (la distancia del kernel cambia en proporción a a)."""
+    model.support_vectors_ = np.ascontiguousarray((model.support_vectors_ - c) / a)
+
+
+def _rescale_models(models, state, a, c):
+    for model in models.values():
+        if isinstance(model, LogisticRegression):
+            state["precision"] = _rescale_logistic(model, state["precision"], a, c)
+        elif isinstance(model, DecisionTreeClassifier):
+            _rescale_tree(model, a, c)
+        elif isinstance(model, RandomForestClassifier):
+            for tree in model.estimators_:
+                _rescale_tree(tree, a, c)
+        elif isinstance(model, SVC):
+            _rescale_svc(model, a, c)
+
+
+def _append_trees(model, X, y, rows_seen, seed):
+    """Árboles nuevos para el lote, en proporción a su peso sobre las filas vistas."""
+    n_trees = max(1, math.ceil(len(model.estimators_) * len(y) / rows_seen))
+    params = {**model.get_params(), "n_estimators": n_trees, "random_state": seed, "n_jobs": None}
+    new_forest = RandomForestClassifier(**params).fit(X, y)
+    model.estimators_ = (model.estimators_ + new_forest.estimators_)[-config.REFRESH_RF_MAX_TREES:]
+    model.n_estimators = len(model.estimators_)
+    return n_trees
+
+
+# --- ESTADO ACUMULADO ---
+
+def bootstrap_state(artifacts, data_path=config.INTERIM_DATA_PATH):
+    """
+    Estado inicial a partir del split de entrenamiento de data/02_interim (una
+    sola vez, si el bundle base no trae refresh_state). Lanza ValueError si los
+    artefactos no salieron de esos datos.
+    """
+    X_train, _, _, _ = train.split_interim(data_path)
+    features_names = list(artifacts["features_names"])
+    if list(X_train.columns) != features_names:
+        raise ValueError("Las columnas de data/02_interim no coinciden con features_names")
+
+    X_raw = X_train.to_numpy(dtype=np.float64)
+    value_counts = []
+    for column in X_raw.T:
+        values, counts = np.unique(column[~np.isnan(column)], return_counts=True)
+        value_counts.append(dict(zip(values.tolist(), counts.tolist())))
+
+    medians = np.array([_median_from_counts(counts) for counts in value_counts])
+    scaler = artifacts["scaler"]
+    if not np.allclose(medians, artifacts["imputer"].statistics_) or scaler.n_samples_seen_ != len(X_raw):
+        raise ValueError("El imputer/scaler actuales no se ajustaron con el split de entrenamiento de data/02_interim")
+
+    state = {"value_counts": value_counts, "rows_seen": len(X_raw), "batches": 0, "precision": None}
+    for model in artifacts["models"].values():
+        if isinstance(model, LogisticRegression):
+            X = scaler.transform(artifacts["imputer"].transform(X_train))
+            state["precision"] = _logistic_curvature(model, X) + _logistic_regularization(model)
+    return state
+
+
+def _holdout_metrics(models, imputer, scaler, data_path):
+    """Métricas en el test set original (formato de metrics.json)."""
+    _, X_test, _, y_test = train.split_interim(data_path)
+    X = scaler.transform(imputer.transform(X_test))
+    metrics = {_METRIC_KEYS.get(name, name): train.evaluate(model, X, y_test.to_numpy())
+               for name, model in models.items()}
+    # Mismo orden que metrics.json
+    return {key: metrics[key] for key in sorted(metrics, key=list(train.SEARCHES).index)}
+
+
+def _load_base(bundles_dir):
+    """Artefactos del bundle vigente (o los .pkl sueltos), como copias modificables."""
+    bundle_dir = bundle.current_bundle(bundles_dir)
+    artifacts = bundle.load_bundle(bundle_dir) if bundle_dir is not None else bundle.load_sources()
+    # Los arrays de un bundle apuntan a un mmap de solo lectura
+    return copy.deepcopy({key: artifacts.get(key) for key in
+                          ("models", "scaler", "imputer", "features_names", "refresh_state", "version")})
+
+
+# --- REFRESCO ---
+
+def refresh(batches, data_path=config.INTERIM_DATA_PATH, bundles_dir=config.BUNDLES_DIR,
+            make_current=True, seed=config.TRAIN_SEED, version=None):
+    """
+    Absorbe los lotes (iterable de DataFrames con las 11 columnas + HeartDisease)
+    y publica un bundle nuevo (`version`: por defecto, la fecha y hora). Retorna
+    (ruta del bundle, lineage).
+    """
+    base = _load_base(bundles_dir)
+    models, imputer, scaler = base["models"], base["imputer"], base["scaler"]
+    features_names = list(base["features_names"])
+    state = base["refresh_state"] or bootstrap_state(base, data_path)
+
+    y_true, y_pred = [], {name: [] for name in models}
+    new_rows, new_trees = 0, 0
+    began = time.perf_counter()
+
+    for frame in batches:
+        y = frame["HeartDisease"].to_numpy(dtype=np.int64)
+        X_raw = _encode(frame, features_names)
+
+        # Prequential: el lote se puntúa con los modelos de antes de absorberlo
+        X_before = scaler.transform(np.where(np.isnan(X_raw), imputer.statistics_, X_raw))
+        y_true.append(y)
+        for name, model in models.items():
+            y_pred[name].append(model.predict(X_before))
+
+        # Imputer: conteos -> medianas exactas
+        for j, column in enumerate(X_raw.T):
+            counts = state["value_counts"][j]
+            values, batch_counts = np.unique(column[~np.isnan(column)], return_counts=True)
+            for value, count in zip(values.tolist(), batch_counts.tolist()):
+                counts[value] = counts.get(value, 0) + count
+        imputer.statistics_ = np.array([_median_from_counts(counts) for counts in state["value_counts"]])
+        X_imputed = np.where(np.isnan(X_raw), imputer.statistics_, X_raw)
+
+        # Scaler: estadísticos acumulados y modelos re-expresados en la escala nueva
+        old_mean, old_scale = scaler.mean_.copy(), scaler.scale_.copy()
+        scaler.partial_fit(X_imputed)
+        _rescale_models(models, state, scaler.scale_ / old_scale, (scaler.mean_ - old_mean) / old_scale)
+        X = scaler.transform(X_imputed)
+
+        for model in models.values():
+            if isinstance(model, LogisticRegression):
+                state["precision"] = _newton_update(model, state["precision"], X, y)
+            elif isinstance(model, RandomForestClassifier) and np.unique(y).size == model.n_classes_:
+                new_trees += _append_trees(model, X, y, state["rows_seen"], seed + state["batches"])
+
+        state["rows_seen"] += len(y)
+        state["batches"] += 1
+        new_rows += len(y)
+
+    if new_rows == 0:
+        raise ValueError("No hay filas nuevas que absorber")
+
+    y_true = np.concatenate(y_true)
+    prequential = {}
+    for name, predictions in y_pred.items():
+        predictions = np.concatenate(predictions)
+        prequential[_METRIC_KEYS.get(name, name)] = {
+            "accuracy": round(accuracy_score(y_true, predictions), 4),
+            "recall": round(recall_score(y_true, predictions, zero_division=0), 4),
+            "f1_score": round(f1_score(y_true, predictions, zero_division=0), 4),
+        }
+
+    lineage = {
+        "parent": base["version"],
+        "new_rows": new_rows,
+        "rows_seen": state["rows_seen"],
+        "batches": state["batches"],
+        "new_trees": new_trees,
+        "seconds": round(time.perf_counter() - began, 3),
+        "prequential_metrics": prequential,
+    }
+    path = bundle.export_bundle({
+        "models": models, "scaler": scaler, "imputer": imputer, "features_names": features_names,
+        "metrics": _holdout_metrics(models, imputer, scaler, data_path),
+        "refresh_state": state, "lineage": lineage,
+    }, bundles_dir, version=version, make_current=make_current)
+    return path, lineage
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-entrenamiento incremental con casos etiquetados nuevos")
+    parser.add_argument("path", help="CSV con las 11 columnas + HeartDisease (formato de data/02_interim)")
+    parser.add_argument("--batch-rows", type=int, default=config.REFRESH_BATCH_ROWS)
+    parser.add_argument("--no-current", action="store_true", help="Publica la versión sin activarla (CURRENT)")
+    args = parser.parse_args()
+
+    path, lineage = refresh(pd.read_csv(args.path, chunksize=args.batch_rows), make_current=not args.no_current)
+    print(f"{lineage['new_rows']:,} filas nuevas en {lineage['batches']} lotes acumulados "
+          f"({lineage['seconds']:.2f} s, {lineage['new_trees']} árboles nuevos)")
+    metrics = bundle.read_manifest(path)["metrics"]
+    print(f"\n{'Modelo':<24} {'Recall':>8} {'F1':>8} {'Accuracy':>9}   (test set)   prequential F1")
+    for key, m in metrics.items():
+        print(f"{key:<24} {m['recall']:>8.2%} {m['f1_score']:>8.2%} {m['accuracy']:>9.2%}"
+              f"   {lineage['prequential_metrics'][key]['f1_score']:>27.2%}")
+    print(f"\nVersión publicada: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,612 @@
+import argparse
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+from src import bundle, config
+from src.engine import InferenceEngine
+from src.ensemble import EnsembleScorer
+from src.instrumentation import Telemetry, telemetry
+from src.preprocessing_plan import as_columns
+
+# --- REGISTRO DE VERSIONES CON RECARGA EN CALIENTE ---
+# Los bundles de src/bundle.py ya son versiones inmutables publicadas de forma
+# atómica (artefacts/bundles/<versión>/). Este módulo añade el ciclo de vida:
+#
+#   CURRENT        -> versión en producción (promote / rollback la cambian con os.replace)
+#   SHADOW         -> versión candidata que se puntúa en sombra (opcional)
+#   HISTORY.jsonl  -> promociones y rollbacks (pila de versiones y auditoría)
+#
+# ServingEngine envuelve al InferenceEngine vigente: un hilo revisa cada
+# REGISTRY_POLL_SECONDS el mtime de CURRENT/SHADOW (sin bundle, de los .pkl
+# sueltos, confirmando con la huella de contenido) y, si cambiaron, carga la
+# versión nueva completa en segundo plano y cambia la referencia. Las
+# predicciones en curso terminan con el motor que ya tenían; no hay reinicio.
+#
+# Modo sombra: la candidata repite una muestra del tráfico real en un hilo
+# aparte (cola acotada: si se llena se descarta) y se registran las tasas de
+# desacuerdo con producción por modelo y en el consenso.
+#
+# Uso: python -m src.registry list | promote <versión> | rollback | shadow <versión>|--off | status
+
+_CURRENT = "CURRENT"
+_SHADOW = "SHADOW"
+_HISTORY = "HISTORY.jsonl"
+
+logger = logging.getLogger("heart_disease.registry")
+
+
+def _read_pointer(bundles_dir, name):
+    path = Path(bundles_dir) / name
+    return path.read_text().strip() if path.exists() else None
+
+
+def _bundle_path(version, bundles_dir):
+    """Ruta de una versión publicada y verificada (ValueError si no existe o está dañada)."""
+    path = Path(bundles_dir) / version
+    if version.startswith(".") or not path.is_dir():
+        raise ValueError(f"No existe la versión {version} en {bundles_dir}")
+    bundle.verify_bundle(path)
+    return path
+
+
+def list_versions(bundles_dir=config.BUNDLES_DIR):
+    """Versiones publicadas (la más reciente primero) y cuál es la vigente y la sombra."""
+    bundles_dir = Path(bundles_dir)
+    if not bundles_dir.is_dir():
+        return []
+    current, shadow = _read_pointer(bundles_dir, _CURRENT), _read_pointer(bundles_dir, _SHADOW)
+    versions = []
+    for path in bundles_dir.iterdir():
+        # Los directorios ".<versión>.tmp" son exportaciones a medio escribir
+        if path.name.startswith(".") or not (path / "manifest.json").is_file():
+            continue
+        manifest = bundle.read_manifest(path)
+        versions.append({
+            "version": manifest["version"],
+            "created_at": manifest.get("created_at"),
+            "models": manifest["models"],
+            "current": manifest["version"] == current,
+            "shadow": manifest["version"] == shadow,
+        })
+    return sorted(versions, key=lambda v: v["created_at"] or "", reverse=True)
+
+
+def history(bundles_dir=config.BUNDLES_DIR):
+    """Promociones registradas, de la más antigua a la más reciente."""
+    path = Path(bundles_dir) / _HISTORY
+    if not path.exists():
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def production_stack(bundles_dir=config.BUNDLES_DIR):
+    """
+    Versiones que pasaron por producción, de la más antigua a la vigente, según
+    HISTORY.jsonl: cada promoción apila su versión y cada rollback desapila
+    hasta la versión restaurada.
+    """
+    stack = []
+    for entry in history(bundles_dir):
+        if entry.get("action") == "rollback":
+            while stack and stack[-1] != entry["version"]:
+                stack.pop()
+            if not stack:
+                stack.append(entry["version"])
+            continue
+        # Versión vigente que no llegó por promote (ej. export con CURRENT, .pkl -> primer bundle)
+        if entry["previous"] is not None and (not stack or stack[-1] != entry["previous"]):
+            stack.append(entry["previous"])
+        stack.append(entry["version"])
+    return stack
+
+
+def _set_production(version, bundles_dir, action):
+    _bundle_path(version, bundles_dir)
+    previous = _read_pointer(bundles_dir, _CURRENT)
+    bundle.set_current(version, bundles_dir)
+    if _read_pointer(bundles_dir, _SHADOW) == version:
+        set_shadow(None, bundles_dir)
+
+    entry = {"at": datetime.now().isoformat(timespec="seconds"), "action": action,
+             "version": version, "previous": previous}
+    with open(Path(bundles_dir) / _HISTORY, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+    return entry
+
+
+def promote(version, bundles_dir=config.BUNDLES_DIR):
+    """
+    Pone una versión en producción. Se verifican sus checksums antes de tocar
+    CURRENT, que se reemplaza de forma atómica: los vigilantes ven la versión
+    anterior o la nueva, nunca un estado intermedio. Si era la sombra, deja de serlo.
+    """
+    return _set_production(version, bundles_dir, "promote")
+
+
+def rollback(bundles_dir=config.BUNDLES_DIR):
+    """
+    Restaura la versión que estaba en producción antes de la vigente. Rollbacks
+    seguidos retroceden por la pila de promociones (C -> B -> A), no alternan
+    entre las dos últimas versiones.
+    """
+    stack = production_stack(bundles_dir)
+    if stack and stack[-1] == _read_pointer(bundles_dir, _CURRENT):
+        stack.pop()
+    if not stack:
+        raise ValueError("No hay una versión anterior registrada")
+    return _set_production(stack[-1], bundles_dir, "rollback")
+
+
+def set_shadow(version, bundles_dir=config.BUNDLES_DIR):
+    """Elige la versión candidata para el modo sombra (None lo desactiva). Escritura atómica."""
+    pointer = Path(bundles_dir) / _SHADOW
+    if version is None:
+        pointer.unlink(missing_ok=True)
+        return
+    _bundle_path(version, bundles_dir)
+    tmp = pointer.with_suffix(".tmp")
+    tmp.write_text(version)
+    os.replace(tmp, pointer)
+
+
+def shadow_bundle(bundles_dir=config.BUNDLES_DIR):
+    """Ruta de la versión en sombra (según SHADOW) o None."""
+    version = _read_pointer(bundles_dir, _SHADOW)
+    if version is None:
+        return None
+    path = Path(bundles_dir) / version
+    return path if path.is_dir() else None
+
+
+# --- MODO SOMBRA ---
+
+def _from_descriptions(descriptions):
+    """Resultados de predict_one -> (clases por modelo, consenso, probabilidad) como arrays."""
+    predictions = {name: np.array([d["models"][name]["prediction"] for d in descriptions])
+                   for name in descriptions[0]["models"]}
+    return (predictions, np.array([d["high_risk"] for d in descriptions]),
+            np.array([d["probability"] for d in descriptions]))
+
+
+def _from_result(result, model_names):
+    """Array estructurado de src/ensemble.py -> (clases por modelo, consenso, probabilidad)."""
+    predictions = {name: result["predictions"][:, k] for k, name in enumerate(model_names)}
+    return predictions, result["high_risk"], result["probability"]
+
+
+class ShadowScorer:
+    """
+    Puntúa una versión candidata sobre una muestra del tráfico de producción
+    en un hilo propio y acumula las tasas de desacuerdo.
+
+    El costo en la ruta de la petición es encolar una referencia: la muestra
+    del lote, el preprocesamiento y la puntuación corren en el hilo de sombra.
+    Los pacientes individuales se acumulan y se repiten como UN lote cada
+    REGISTRY_SHADOW_BATCH_SECONDS (la candidata cuesta una llamada vectorizada,
+    no una por paciente).
+    La candidata usa su propio scorer sin telemetría de latencia (no se mezcla
+    con la de producción), sin caché y sin monitor de deriva.
+    """
+
+    def __init__(self, candidate, report_path=config.REGISTRY_SHADOW_REPORT_PATH,
+                 sample_rate=config.REGISTRY_SHADOW_SAMPLE_RATE, max_rows=config.REGISTRY_SHADOW_MAX_ROWS,
+                 queue_size=config.REGISTRY_SHADOW_QUEUE, flush_seconds=config.REGISTRY_SHADOW_FLUSH_SECONDS,
+                 batch_seconds=config.REGISTRY_SHADOW_BATCH_SECONDS):
+        self.candidate = candidate
+        self.version = candidate.version
+        self.bundle_dir = candidate.bundle_dir
+        self.report_path = report_path
+        self.sample_rate = sample_rate
+        self.max_rows = max_rows
+        self.flush_seconds = flush_seconds
+        self.batch_seconds = batch_seconds
+        self._singles = []       # (paciente, descripción de producción) pendientes
+        self._scorer = EnsembleScorer(candidate.models, config.CONSENSUS_MIN_VOTES, metrics=Telemetry(enabled=False))
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+        self.stats = {"rows": 0, "consensus_disagreements": 0, "probability_rows": 0, "abs_probability_diff": 0.0,
+                      "models": {}, "dropped": 0, "errors": 0, "started_at": datetime.now().isoformat(timespec="seconds")}
+        self._thread = threading.Thread(target=self._run, name="shadow-scorer", daemon=True)
+        self._thread.start()
+
+    # --- ENCOLADO (ruta de la petición) ---
+
+    def submit_one(self, patient, description):
+        """Repite un paciente (según REGISTRY_SHADOW_SAMPLE_RATE) con la descripción de producción."""
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return
+        with self._lock:
+            if len(self._singles) < self.max_rows:
+                self._singles.append((dict(patient), description))
+                return
+            self.stats["dropped"] += 1
+        telemetry.count("shadow_dropped", version=self.version)
+
+    def submit_many(self, data, result, model_names):
+        """Repite un lote: como mucho max_rows filas repartidas a lo largo del lote."""
+        n_rows = result.shape[0]
+        rows = None
+        if n_rows > self.max_rows:
+            rows = np.arange(0, n_rows, -(-n_rows // self.max_rows))
+            result = result[rows]
+        self._put(data, rows, (result, list(model_names)))
+
+    def _put(self, data, rows, production):
+        try:
+            self._queue.put_nowait((data, rows, production))
+        except queue.Full:
+            with self._lock:
+                self.stats["dropped"] += 1
+            telemetry.count("shadow_dropped", version=self.version)
+
+    # --- HILO DE SOMBRA ---
+
+    def _run(self):
+        while True:
+            try:
+                job = self._queue.get(timeout=self.batch_seconds)
+            except queue.Empty:
+                job = False
+
+            # Pacientes individuales acumulados -> un solo lote
+            with self._lock:
+                singles, self._singles = self._singles, []
+            if singles:
+                patients, descriptions = zip(*singles)
+                self._timed_compare(list(patients), None, list(descriptions))
+
+            if job is None:
+                break
+            if job:
+                self._timed_compare(*job)
+            if time.monotonic() - self._last_flush >= self.flush_seconds:
+                self.flush()
+        self.flush()
+
+    def _timed_compare(self, data, rows, production):
+        began = time.perf_counter()
+        try:
+            self._compare(data, rows, production)
+        except Exception:
+            logger.exception("Fallo al puntuar en sombra la versión %s", self.version)
+            with self._lock:
+                self.stats["errors"] += 1
+        telemetry.observe("shadow", time.perf_counter() - began, version=self.version)
+
+    def _compare(self, data, rows, production):
+        if isinstance(production, list):
+            production = _from_descriptions(production)
+        else:
+            production = _from_result(*production)
+        if rows is not None:
+            columns, _ = as_columns(data)
+            data = {name: values[rows] for name, values in columns.items()}
+
+        # La candidata aplica SU plan de preprocesamiento a las entradas crudas
+        result = self._scorer.score(self.candidate.plan.transform(data))
+        predictions, high_risk, probability = _from_result(result, self._scorer.model_names)
+        prod_predictions, prod_high_risk, prod_probability = production
+
+        n_rows = len(high_risk)
+        consensus = int(np.count_nonzero(high_risk != prod_high_risk))
+        # En cascada la probabilidad promedio de producción puede ser NaN
+        both = np.isfinite(prod_probability)
+        diff = float(np.abs(probability[both] - prod_probability[both]).sum())
+
+        with self._lock:
+            stats = self.stats
+            stats["rows"] += n_rows
+            stats["consensus_disagreements"] += consensus
+            stats["probability_rows"] += int(np.count_nonzero(both))
+            stats["abs_probability_diff"] += diff
+            for name, labels in prod_predictions.items():
+                if name not in predictions:
+                    continue
+                # Clase -1: el modelo no se evaluó en producción (consenso en cascada)
+                evaluated = labels >= 0
+                model = stats["models"].setdefault(name, {"rows": 0, "disagreements": 0})
+                model["rows"] += int(np.count_nonzero(evaluated))
+                model["disagreements"] += int(np.count_nonzero(labels[evaluated] != predictions[name][evaluated]))
+        telemetry.count("shadow_rows", n_rows, version=self.version)
+        telemetry.count("shadow_disagreements", consensus, version=self.version)
+
+    # --- REPORTE ---
+
+    def report(self):
+        """Tasas de desacuerdo acumuladas (consenso y por modelo) y diferencia media de probabilidad."""
+        with self._lock:
+            stats = json.loads(json.dumps(self.stats))
+        rows = stats["rows"]
+        return {
+            "version": self.version,
+            "started_at": stats["started_at"],
+            "rows": rows,
+            "consensus_disagreement_rate": stats["consensus_disagreements"] / rows if rows else None,
+            "mean_abs_probability_diff": (stats["abs_probability_diff"] / stats["probability_rows"]
+                                          if stats["probability_rows"] else None),
+            "models": {
+                name: {"rows": m["rows"], "disagreement_rate": m["disagreements"] / m["rows"] if m["rows"] else None}
+                for name, m in stats["models"].items()
+            },
+            "dropped": stats["dropped"],
+            "errors": stats["errors"],
+        }
+
+    def flush(self):
+        """Escribe el reporte en REGISTRY_SHADOW_REPORT_PATH (escritura atómica)."""
+        self._last_flush = time.monotonic()
+        if self.report_path is None:
+            return
+        path = Path(self.report_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({**self.report(), "updated_at": datetime.now().isoformat(timespec="seconds")},
+                                  ensure_ascii=False, indent=1), encoding="utf-8")
+        tmp.replace(path)
+
+    def close(self, timeout=5.0):
+        """Procesa lo encolado, escribe el reporte final y detiene el hilo."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+
+# --- MOTOR SERVIDO (RECARGA EN CALIENTE) ---
+
+class PinnedEngine:
+    """
+    Una versión fija del motor servido (ej. un archivo completo se puntúa con la
+    misma versión aunque se promueva otra a mitad), con el mismo modo sombra.
+    """
+
+    def __init__(self, serving, engine):
+        self._serving = serving
+        self._engine = engine
+
+    def __getattr__(self, name):
+        return getattr(self._engine, name)
+
+    @property
+    def current(self):
+        return self._engine
+
+    def predict_many(self, data, **kwargs):
+        result = self._engine.predict_many(data, **kwargs)
+        self.mirror(data, result, self._engine.model_names)
+        return result
+
+    def mirror(self, data, result, model_names):
+        self._serving.mirror(data, result, model_names)
+
+    def pinned(self):
+        return self
+
+
+class ServingEngine:
+    """
+    Envuelve al InferenceEngine vigente y lo reemplaza en segundo plano cuando
+    cambia el registro. Expone la misma interfaz (los atributos se delegan a la
+    versión vigente), así que la app, el servicio HTTP y el ejecutor paralelo no cambian.
+    """
+
+    def __init__(self, engine, bundles_dir=config.BUNDLES_DIR, poll_seconds=config.REGISTRY_POLL_SECONDS):
+        self._engine = engine
+        self.bundles_dir = Path(bundles_dir)
+        self.poll_seconds = poll_seconds
+        self.shadow = None
+        self.swaps = []          # Cambios de versión en este proceso
+        self.last_error = None
+        self._reload_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._signature = self._watch_signature()
+        self._sync_shadow()
+
+    @classmethod
+    def load_default(cls):
+        """Motor vigente (InferenceEngine.load_default) con recarga en caliente."""
+        return cls(InferenceEngine.load_default())
+
+    def __getattr__(self, name):
+        # Solo se llama para atributos que ServingEngine no define
+        if name == "_engine":
+            raise AttributeError(name)
+        return getattr(self._engine, name)
+
+    @property
+    def current(self):
+        """InferenceEngine vigente (una referencia: sigue válida tras un cambio de versión)."""
+        return self._engine
+
+    def pinned(self):
+        """Vista fijada en la versión vigente, con modo sombra (ver PinnedEngine)."""
+        return PinnedEngine(self, self._engine)
+
+    # --- INFERENCIA (+ SOMBRA) ---
+
+    def predict_one(self, patient):
+        engine = self._engine
+        description = engine.predict_one(patient)
+        shadow = self.shadow
+        if shadow is not None:
+            shadow.submit_one(patient, description)
+        return description
+
+    def predict_many(self, data, **kwargs):
+        engine = self._engine
+        result = engine.predict_many(data, **kwargs)
+        self.mirror(data, result, engine.model_names)
+        return result
+
+    def mirror(self, data, result, model_names):
+        """Envía un lote ya puntuado en producción al modo sombra (si hay candidata)."""
+        shadow = self.shadow
+        if shadow is not None:
+            shadow.submit_many(data, result, model_names)
+
+    # --- VIGILANTE ---
+
+    def _watched_paths(self):
+        paths = [self.bundles_dir / _CURRENT, self.bundles_dir / _SHADOW]
+        if self._engine.bundle_dir is None:
+            # Sin bundle: los mismos .pkl que entran en la huella del motor
+            paths += [*self._engine.model_files.values(), config.SCALER_PATH, config.IMPUTER_PATH,
+                      config.FEATURES_PATH]
+        return paths
+
+    def _watch_signature(self):
+        """(mtime, tamaño) de cada archivo vigilado: un stat por archivo, sin leer contenido."""
+        signature = []
+        for path in self._watched_paths():
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    def check(self):
+        """
+        Una revisión del vigilante. Si cambió algún archivo vigilado, carga la
+        versión vigente y/o la sombra nuevas. Retorna True si hubo algún cambio.
+        """
+        signature = self._watch_signature()
+        if signature == self._signature:
+            return False
+        with self._reload_lock:
+            self._signature = signature
+            changed = self._sync_current()
+            return self._sync_shadow() or changed
+
+    def _sync_current(self):
+        engine = self._engine
+        target = bundle.current_bundle(self.bundles_dir)
+        try:
+            if target is not None:
+                if engine.bundle_dir is not None and Path(engine.bundle_dir) == target:
+                    return False
+                candidate = InferenceEngine(bundle_dir=target)
+            else:
+                # mtime distinto no implica contenido distinto: se confirma con la huella
+                candidate = InferenceEngine()
+                if engine.bundle_dir is None and candidate.fingerprint == engine.fingerprint:
+                    return False
+            # Todo se carga ANTES del cambio: la primera predicción no paga la deserialización
+            candidate.preload()
+        except Exception as e:
+            self.last_error = f"{datetime.now().isoformat(timespec='seconds')}: {e}"
+            logger.exception("No se pudo cargar la versión %s; se mantiene la vigente", target)
+            return False
+
+        candidate.monitor = engine.monitor
+        self._engine = candidate
+        self.swaps.append({"at": datetime.now().isoformat(timespec="seconds"),
+                           "from": engine.version, "to": candidate.version})
+        telemetry.count("model_swaps")
+        logger.info("Versión de modelos cambiada: %s -> %s", engine.version, candidate.version)
+        return True
+
+    def _sync_shadow(self):
+        target = shadow_bundle(self.bundles_dir)
+        shadow = self.shadow
+        if shadow is not None and target is not None and Path(shadow.bundle_dir) == target:
+            return False
+        if shadow is None and target is None:
+            return False
+
+        replacement = None
+        if target is not None:
+            try:
+                candidate = InferenceEngine(bundle_dir=target)
+                candidate.preload()
+                replacement = ShadowScorer(candidate)
+            except Exception as e:
+                self.last_error = f"{datetime.now().isoformat(timespec='seconds')}: {e}"
+                logger.exception("No se pudo cargar la versión en sombra %s", target)
+        self.shadow = replacement
+        if shadow is not None:
+            shadow.close()
+        return True
+
+    def start(self):
+        """Arranca (una sola vez) el hilo vigilante. Retorna self."""
+        with self._reload_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._watch, name="registry-watcher", daemon=True)
+                self._thread.start()
+        return self
+
+    def _watch(self):
+        while not self._stopped.wait(self.poll_seconds):
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Fallo del vigilante del registro")
+
+    def stop(self):
+        self._stopped.set()
+        if self.shadow is not None:
+            self.shadow.close()
+
+    def status(self):
+        """Versión vigente, cambios en este proceso, último error y reporte de sombra."""
+        engine = self._engine
+        return {
+            "version": engine.version,
+            "fingerprint": engine.fingerprint[:12],
+            "swaps": list(self.swaps),
+            "last_error": self.last_error,
+            "shadow": self.shadow.report() if self.shadow is not None else None,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Registro de versiones de modelos")
+    parser.add_argument("--bundles-dir", default=config.BUNDLES_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="Versiones publicadas")
+    promote_parser = sub.add_parser("promote", help="Pone una versión en producción (atómico)")
+    promote_parser.add_argument("version")
+    sub.add_parser("rollback", help="Vuelve a la versión anterior (repetido, sigue retrocediendo)")
+    shadow_parser = sub.add_parser("shadow", help="Puntúa una versión candidata en sombra")
+    shadow_parser.add_argument("version", nargs="?", default=None)
+    shadow_parser.add_argument("--off", action="store_true", help="Desactiva el modo sombra")
+    sub.add_parser("status", help="Versión vigente, sombra y último reporte de desacuerdo")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "list":
+            for v in list_versions(args.bundles_dir):
+                flags = " ".join(flag for flag, on in (("[CURRENT]", v["current"]), ("[SHADOW]", v["shadow"])) if on)
+                print(f"{v['version']:<20} {v['created_at'] or '':<20} {flags}")
+        elif args.command == "promote":
+            entry = promote(args.version, args.bundles_dir)
+            print(f"Versión {entry['version']} en producción (anterior: {entry['previous']})")
+        elif args.command == "rollback":
+            entry = rollback(args.bundles_dir)
+            print(f"Versión {entry['version']} restaurada")
+        elif args.command == "shadow":
+            if args.off == (args.version is not None):
+                parser.error("Indica una versión o --off")
+            set_shadow(None if args.off else args.version, args.bundles_dir)
+            print("Modo sombra desactivado" if args.off else f"Versión {args.version} en sombra")
+        else:
+            print(f"CURRENT: {_read_pointer(args.bundles_dir, _CURRENT) or '(.pkl sueltos)'}")
+            print(f"SHADOW:  {_read_pointer(args.bundles_dir, _SHADOW) or '-'}")
+            report_path = Path(config.REGISTRY_SHADOW_REPORT_PATH)
+            if report_path.exists():
+                print(report_path.read_text(encoding="utf-8"))
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,497 @@
+import argparse
+import bisect
+import io
+import shutil
+import tempfile
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc
+import pyarrow.parquet as pq
+from src import config, validation
+from src.ensemble import invocation_counts
+from src.instrumentation import telemetry
+
+# --- PUNTUACIÓN MASIVA EN STREAMING ---
+# El archivo (CSV, Parquet o Arrow IPC) se lee en bloques de tamaño fijo y solo
+# con las 11 columnas requeridas: las demás columnas de un extracto hospitalario
+# no se decodifican (en Parquet/Arrow ni se leen). Cada bloque se valida contra
+# el esquema (src/validation.py): las filas inválidas van al reporte de rechazos
+# y solo las válidas se preprocesan, se puntúan y se escriben como RecordBatch tipado (votos int8, probabilidades
+# float32, consenso categórico) en un Arrow IPC temporal. La memoria depende del
+# tamaño del bloque, no del archivo; las descargas en CSV, Parquet o Arrow se
+# generan desde ahí, bloque a bloque.
+
+_CONSENSUS_LABELS = pa.array(["Bajo Riesgo", "ALTO RIESGO"])
+
+# Tipo de cada columna de entrada en la salida: fijo, porque el esquema del IPC
+# no puede cambiar entre bloques (un bloque con nulos no pasa de int a float)
+_INPUT_TYPES = {
+    col: pa.string() if col in config.CATEGORICAL_COLUMNS else pa.float64()
+    for col in config.REQUIRED_COLUMNS
+}
+
+
+# --- FORMATOS Y LECTURA POR BLOQUES ---
+
+def detect_format(name):
+    """Formato del lote ('csv', 'parquet' o 'arrow') según la extensión del archivo."""
+    suffix = Path(str(name)).suffix.lower()
+    for fmt, extensions in config.BATCH_FORMATS.items():
+        if suffix in extensions:
+            return fmt
+    raise ValueError(f"Formato no soportado: '{suffix}'. Usa uno de: {sorted(config.BATCH_FORMATS)}")
+
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def _open_arrow(source):
+    """Lector Arrow IPC, en formato archivo (acceso aleatorio) o stream."""
+    if isinstance(source, (str, Path)):
+        # Mapeado en memoria: solo se tocan las páginas de las columnas usadas
+        source = pa.memory_map(str(source))
+    try:
+        return pa.ipc.open_file(source)
+    except pa.ArrowInvalid:
+        source.seek(0)
+        return pa.ipc.open_stream(source)
+
+
+def read_column_names(source, fmt):
+    """Columnas del archivo sin leer los datos (encabezado CSV o esquema Parquet/Arrow)."""
+    try:
+        if fmt == "csv":
+            return list(pd.read_csv(source, nrows=0).columns)
+        if fmt == "parquet":
+            return pq.ParquetFile(source).schema_arrow.names
+        return _open_arrow(source).schema.names
+    finally:
+        _rewind(source)
+
+
+def iter_chunks(source, fmt, chunk_rows=config.BATCH_CHUNK_ROWS, columns=config.REQUIRED_COLUMNS):
+    """
+    Recorre el archivo en bloques de hasta `chunk_rows` filas leyendo solo las
+    `columns` presentes. Produce (bloque, fracción leída): DataFrame para CSV,
+    RecordBatch de Arrow para Parquet y Arrow IPC.
+    """
+    wanted = set(columns)
+    if fmt == "csv":
+        total_bytes = _source_size(source)
+        # El lector se cierra siempre (aunque se abandone el generador): así Pandas
+        # libera su envoltorio de texto sin cerrar el archivo subido
+        with pd.read_csv(source, chunksize=chunk_rows, usecols=lambda col: col in wanted) as reader:
+            for chunk in reader:
+                yield chunk, (source.tell() / total_bytes if total_bytes else 0.0)
+
+    elif fmt == "parquet":
+        parquet = pq.ParquetFile(source)
+        present = [col for col in columns if col in parquet.schema_arrow.names]
+        total_rows, seen = parquet.metadata.num_rows, 0
+        for batch in parquet.iter_batches(batch_size=chunk_rows, columns=present):
+            seen += batch.num_rows
+            yield batch, seen / total_rows
+
+    elif fmt == "arrow":
+        reader = _open_arrow(source)
+        present = [col for col in columns if col in reader.schema.names]
+        if isinstance(reader, pa.ipc.RecordBatchFileReader):
+            n_batches = reader.num_record_batches
+            batches = (reader.get_batch(i) for i in range(n_batches))
+        else:
+            n_batches, batches = None, reader
+        for i, batch in enumerate(batches):
+            batch = batch.select(present)
+            # Los lotes del archivo pueden ser más grandes que el bloque (slice sin copia)
+            for start in range(0, batch.num_rows, chunk_rows):
+                yield batch.slice(start, chunk_rows), ((i + 1) / n_batches if n_batches else 0.0)
+
+    else:
+        raise ValueError(f"Formato no soportado: '{fmt}'")
+
+
+def read_preview(source, fmt, n_rows=5):
+    """Primeras filas de las columnas requeridas presentes (DataFrame)."""
+    try:
+        chunk, _ = next(iter_chunks(source, fmt, n_rows), (None, None))
+    finally:
+        _rewind(source)
+    if chunk is None:
+        return pd.DataFrame()
+    return chunk if isinstance(chunk, pd.DataFrame) else chunk.to_pandas()
+
+
+# --- RESULTADOS TIPADOS ---
+
+def results_batch(chunk, batch_result, model_names, explanation=None):
+    """
+    RecordBatch de salida: columnas de entrada + Pred_<modelo> (int8),
+    Prob_<modelo> (float32), Votos_Positivos (int8), Probabilidad_Promedio
+    (float32) y Consenso_Final (categórica).
+    Con `explanation` (src/explain.py) agrega Factor_1..k (categóricas): los
+    factores con más peso en cada fila, ej. "ST_Slope (+)" (+ = hacia Enfermo).
+    `chunk` es un dict de columnas (ej. las validadas), DataFrame o RecordBatch.
+    """
+    if isinstance(chunk, dict):
+        chunk = pa.RecordBatch.from_arrays(
+            [pa.array(values, from_pandas=True) for values in chunk.values()], names=list(chunk)
+        )
+    elif isinstance(chunk, pd.DataFrame):
+        chunk = pa.RecordBatch.from_pandas(chunk, preserve_index=False)
+
+    arrays = {}
+    for name in chunk.column_names:
+        column = chunk.column(name)
+        arrays[name] = column.cast(_INPUT_TYPES.get(name, column.type))
+
+    for k, model_name in enumerate(model_names):
+        arrays[f"Pred_{model_name}"] = pa.array(np.ascontiguousarray(batch_result["predictions"][:, k]))
+    for k, model_name in enumerate(model_names):
+        arrays[f"Prob_{model_name}"] = pa.array(batch_result["probabilities"][:, k].astype(np.float32))
+
+    arrays["Votos_Positivos"] = pa.array(batch_result["votes"])
+    arrays["Probabilidad_Promedio"] = pa.array(batch_result["probability"].astype(np.float32))
+    arrays["Consenso_Final"] = pa.DictionaryArray.from_arrays(
+        pa.array(batch_result["high_risk"].view(np.int8)), _CONSENSUS_LABELS
+    )
+    if explanation is not None:
+        arrays.update(factor_columns(explanation))
+    return pa.RecordBatch.from_pydict(arrays)
+
+
+def _empty_batch(engine, compact=False, explain=False):
+    """
+    Bloque de 0 filas con el esquema completo de results_batch: si ninguna fila
+    se puntuó (todas rechazadas o archivo vacío) los resultados siguen siendo
+    un Arrow IPC válido, con las mismas columnas.
+    """
+    columns = {col: np.array([], dtype=object if col in config.CATEGORICAL_COLUMNS else np.float64)
+               for col in config.REQUIRED_COLUMNS}
+    explanation = engine.explain_many(columns) if explain else None
+    return results_batch(columns, engine.scorer.empty(0, compact=compact), engine.model_names, explanation)
+
+
+def factor_columns(explanation, k=config.EXPLAIN_TOP_FACTORS):
+    """Factor_1..k como columnas categóricas; el diccionario es fijo para que el esquema no cambie entre bloques."""
+    labels = pa.array([f"{factor} ({sign})" for factor in explanation.factors for sign in "+-"])
+    order, signs = explanation.top_indices(k)
+    codes = (order * 2 + (signs < 0)).astype(np.int8)
+    return {f"Factor_{i + 1}": pa.DictionaryArray.from_arrays(pa.array(np.ascontiguousarray(codes[:, i])), labels)
+            for i in range(codes.shape[1])}
+
+
+def _to_frame(data):
+    """Bloque/tabla como DataFrame; las columnas numéricas enteras se muestran y escriben sin '.0'."""
+    df = data.to_pandas()
+    for col in df.columns:
+        if _INPUT_TYPES.get(col) == pa.float64():
+            values = df[col].to_numpy()
+            present = values[~np.isnan(values)]
+            if np.array_equal(present, np.trunc(present)):
+                df[col] = df[col].astype("Int64")
+    return df
+
+
+class StreamedResults:
+    """
+    Resultados escritos de forma incremental como Arrow IPC (formato archivo)
+    en un SpooledTemporaryFile (en RAM hasta BATCH_SPOOL_MAX_BYTES, luego en
+    disco). Cada bloque es un RecordBatch: las páginas se leen por acceso
+    aleatorio sin cargar el resto.
+    """
+
+    def __init__(self, page_rows=config.BATCH_PAGE_ROWS, spool_max_bytes=config.BATCH_SPOOL_MAX_BYTES,
+                 cascade=False, compact=False):
+        self.file = tempfile.SpooledTemporaryFile(max_size=spool_max_bytes, mode="w+b")
+        self.page_rows = page_rows
+        self.cascade = cascade
+        self.compact = compact          # Probabilidades en float32 (modo compacto)
+        self.schema = None
+        self.batch_starts = []
+        self.n_rows = 0
+        self.n_high_risk = 0
+        self.n_rejected = 0
+        self.invocations = {}           # Filas evaluadas por modelo (< n_rows en cascada)
+        self.rejections = []            # Reporte fila a fila (hasta VALIDATION_MAX_REPORT_ROWS)
+        self.rejection_counts = {}      # (columna, motivo) -> filas rechazadas
+        self.parallel_reports = []
+        self._writer = None
+        self._reader = None
+
+    @classmethod
+    def open(cls, path, summary, page_rows=config.BATCH_PAGE_ROWS):
+        """
+        Resultados ya escritos en un Arrow IPC (ej. un trabajo de src/jobs.py),
+        mapeados en memoria, con el resumen de summary(). Solo lectura.
+        """
+        results = cls.__new__(cls)
+        results.file = pa.memory_map(str(path))
+        results._reader = pa.ipc.open_file(results.file)
+        results._writer = None
+        results.page_rows = page_rows
+        results.schema = results._reader.schema
+        results.batch_starts, results.n_rows = [], 0
+        for i in range(results._reader.num_record_batches):
+            results.batch_starts.append(results.n_rows)
+            results.n_rows += results._reader.get_batch(i).num_rows
+        results.cascade = summary["cascade"]
+        results.compact = summary.get("compact", False)     # Resúmenes escritos antes de registrarlo
+        results.n_high_risk = summary["high_risk"]
+        results.n_rejected = summary["rejected"]
+        results.invocations = summary["invocations"]
+        results.rejections = summary["rejections"]
+        results.rejection_counts = {tuple(key): n for key, n in summary["rejection_counts"]}
+        results.parallel_reports = summary["parallel_reports"]
+        return results
+
+    def summary(self):
+        """Resumen serializable en JSON (conteos, rechazos, invocaciones) para reabrir con open()."""
+        return {
+            "rows": self.n_rows,
+            "high_risk": self.n_high_risk,
+            "rejected": self.n_rejected,
+            "cascade": self.cascade,
+            "compact": self.compact,
+            "invocations": self.invocations,
+            "rejections": self.rejections,
+            "rejection_counts": [[list(key), n] for key, n in self.rejection_counts.items()],
+            "parallel_reports": self.parallel_reports,
+        }
+
+    @property
+    def columns(self):
+        return self.schema.names if self.schema is not None else None
+
+    def append(self, batch):
+        """Escribe un bloque ya puntuado (RecordBatch de results_batch) al final del archivo."""
+        if self._writer is None:
+            self.schema = batch.schema
+            self._writer = pa.ipc.new_file(self.file, self.schema)
+
+        self.batch_starts.append(self.n_rows)
+        self._writer.write_batch(batch)
+        self.n_rows += batch.num_rows
+        self.n_high_risk += int(np.count_nonzero(batch.column("Consenso_Final").indices.to_numpy()))
+
+    def reject(self, check, offset):
+        """Registra los rechazos de un bloque (ValidationResult); `offset` = filas leídas antes del bloque."""
+        self.n_rejected += check.n_rejected
+        for key, n in check.counts().items():
+            self.rejection_counts[key] = self.rejection_counts.get(key, 0) + n
+        room = config.VALIDATION_MAX_REPORT_ROWS - len(self.rejections)
+        if room > 0:
+            self.rejections.extend(check.records(offset, room))
+
+    def rejection_report(self):
+        """Rechazos como DataFrame: fila (posición en el archivo, base 0), columna, valor y motivo."""
+        report = pd.DataFrame(self.rejections, columns=["fila", "columna", "valor", "motivo"])
+        # Los valores rechazados mezclan tipos (texto, números, vacíos): se muestran como texto
+        report["valor"] = report["valor"].map(lambda value: "" if value is None else str(value))
+        return report
+
+    def finish(self):
+        """Cierra la escritura (pie del IPC con el índice de bloques); a partir de aquí se lee."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            self._reader = pa.ipc.open_file(self.file)
+
+    @property
+    def speedup(self):
+        """
+        Speedup agregado del ejecutor paralelo: tiempo en serie de la puntuación
+        (CPU de las tareas) / tiempo real. None si se puntuó en serie.
+        """
+        if not self.parallel_reports:
+            return None
+        busy = sum(r["busy_seconds"] for r in self.parallel_reports)
+        wall = sum(r["wall_seconds"] for r in self.parallel_reports)
+        return busy / wall if wall > 0 else 1.0
+
+    @property
+    def utilization(self):
+        """
+        Utilización agregada del pool paralelo: CPU de las tareas / (tiempo real x workers).
+        None si se puntuó en serie.
+        """
+        if not self.parallel_reports:
+            return None
+        busy = sum(r["busy_seconds"] for r in self.parallel_reports)
+        capacity = sum(r["wall_seconds"] * r["workers"] for r in self.parallel_reports)
+        return busy / capacity if capacity > 0 else 0.0
+
+    @property
+    def n_pages(self):
+        return max(1, -(-self.n_rows // self.page_rows))
+
+    def iter_batches(self):
+        """Recorre los bloques escritos (RecordBatch)."""
+        if self._reader is None:
+            return
+        for i in range(self._reader.num_record_batches):
+            yield self._reader.get_batch(i)
+
+    def read_page(self, page):
+        """Lee solo los bloques que cubren la página indicada (base 0)."""
+        if self._reader is None or self.n_rows == 0:
+            return pd.DataFrame(columns=self.columns)
+
+        start = page * self.page_rows
+        first = bisect.bisect_right(self.batch_starts, start) - 1
+        batches, i = [], first
+        while i < len(self.batch_starts) and self.batch_starts[i] < start + self.page_rows:
+            batches.append(self._reader.get_batch(i))
+            i += 1
+        table = pa.Table.from_batches(batches).slice(start - self.batch_starts[first], self.page_rows)
+        page_df = _to_frame(table)
+        page_df.index = pd.RangeIndex(start, start + len(page_df))
+        return page_df
+
+    def write(self, sink, fmt="csv"):
+        """Escribe los resultados completos en `sink` (ruta o archivo binario): 'csv', 'parquet' o 'arrow'."""
+        if isinstance(sink, (str, Path)):
+            with open(sink, "wb") as handle:
+                return self.write(handle, fmt)
+        if self.schema is None:
+            return
+
+        if fmt == "arrow":
+            # Ya está en Arrow IPC: se copia tal cual
+            self.file.seek(0)
+            shutil.copyfileobj(self.file, sink)
+        elif fmt == "parquet":
+            # Un row group por bloque
+            with pq.ParquetWriter(sink, self.schema) as writer:
+                for batch in self.iter_batches():
+                    writer.write_batch(batch)
+        elif fmt == "csv":
+            for i, batch in enumerate(self.iter_batches()):
+                _to_frame(batch).to_csv(sink, header=(i == 0), index=False)
+        else:
+            raise ValueError(f"Formato no soportado: '{fmt}'")
+
+    def close(self):
+        self._reader = None
+        self.file.close()
+
+
+def _source_size(source):
+    """Tamaño total en bytes de la fuente (para la barra de progreso), o None."""
+    try:
+        position = source.tell()
+        source.seek(0, io.SEEK_END)
+        size = source.tell()
+        source.seek(position)
+        return size
+    except (AttributeError, OSError):
+        return None
+
+
+def score_stream(engine, source, fmt="csv", chunk_rows=config.BATCH_CHUNK_ROWS,
+                 page_rows=config.BATCH_PAGE_ROWS, progress=None, cascade=False, compact=False, explain=False):
+    """
+    Valida y puntúa un archivo (ruta o archivo abierto) bloque a bloque con
+    `engine` (InferenceEngine o ParallelBatchExecutor). Las filas inválidas
+    no detienen el lote: quedan en results.rejection_report().
+    cascade=True puntúa con el consenso en cascada (mismo consenso; los modelos
+    caros solo ven las filas indecisas y results.invocations lo refleja).
+    compact=True puntúa cada bloque en float32 (engine.predict_many, modo compacto).
+    explain=True agrega los factores principales de cada fila (engine.explain_many).
+    `progress(fracción, filas_procesadas)` se llama tras cada bloque.
+    Retorna un StreamedResults ya cerrado para escritura.
+    """
+    # Motor de recarga en caliente (src/registry.py): todo el archivo con la misma versión
+    if hasattr(engine, "pinned"):
+        engine = engine.pinned()
+    results = StreamedResults(page_rows, cascade=cascade, compact=compact)
+    n_read = 0
+
+    try:
+        for chunk, fraction in iter_chunks(source, fmt, chunk_rows):
+            # Validación por columnas: solo las filas válidas se puntúan
+            check = validation.validate(chunk)
+            if check.n_rejected:
+                results.reject(check, n_read)
+            n_read += check.n_rows
+            if check.n_valid == 0:
+                continue
+
+            columns = check.valid_columns()
+            # Bloque completo (serie o paralelo): alimenta las filas/s de la carga masiva
+            with telemetry.timer("predict", path="file"):
+                batch_result = engine.predict_many(columns, cascade=cascade, compact=compact)
+            telemetry.count("rows", check.n_valid, path="file")
+            for name, n in invocation_counts(batch_result, engine.model_names).items():
+                results.invocations[name] = results.invocations.get(name, 0) + n
+            explanation = engine.explain_many(columns) if explain else None
+            results.append(results_batch(columns, batch_result, engine.model_names, explanation))
+
+            # Si se usa ParallelBatchExecutor, guardamos su reporte de tiempos por bloque
+            if getattr(engine, "last_report", None) is not None:
+                results.parallel_reports.append(engine.last_report)
+
+            if progress is not None:
+                progress(min(fraction, 1.0), results.n_rows)
+        if results.schema is None:
+            results.append(_empty_batch(engine, compact, explain))
+        results.finish()
+    except Exception:
+        results.close()
+        raise
+
+    if progress is not None:
+        progress(1.0, results.n_rows)
+    return results
+
+
+def score_file(engine, input_path, output_path, chunk_rows=config.BATCH_CHUNK_ROWS, rejections_path=None,
+               cascade=False, compact=False, explain=False):
+    """
+    Puntúa un archivo completo y escribe los resultados (formatos según la
+    extensión de cada ruta). Si hay filas rechazadas, `rejections_path` recibe
+    su reporte en CSV. Retorna {"rows", "high_risk", "rejected"}.
+    """
+    results = score_stream(engine, input_path, detect_format(input_path), chunk_rows, cascade=cascade,
+                           compact=compact, explain=explain)
+    try:
+        results.write(output_path, detect_format(output_path))
+        if rejections_path is not None and results.n_rejected:
+            results.rejection_report().to_csv(rejections_path, index=False)
+        return {"rows": results.n_rows, "high_risk": results.n_high_risk, "rejected": results.n_rejected,
+                "invocations": results.invocations}
+    finally:
+        results.close()
+
+
+def main():
+    from src.engine import InferenceEngine
+
+    parser = argparse.ArgumentParser(description="Puntúa un lote CSV / Parquet / Arrow IPC por bloques")
+    parser.add_argument("input", help="Archivo de entrada (.csv, .parquet, .arrow)")
+    parser.add_argument("output", help="Archivo de resultados (el formato sale de la extensión)")
+    parser.add_argument("--chunk-rows", type=int, default=config.BATCH_CHUNK_ROWS)
+    parser.add_argument("--rejections", default=None, help="CSV con el reporte de filas rechazadas")
+    parser.add_argument("--cascade", action="store_true",
+                        help="Consenso en cascada: mismo resultado, sin las probabilidades que no hacen falta")
+    parser.add_argument("--compact", action="store_true",
+                        help="Modo compacto: features y probabilidades en float32 (mitad de memoria por bloque)")
+    parser.add_argument("--explain", action="store_true",
+                        help=f"Agrega los {config.EXPLAIN_TOP_FACTORS} factores principales de cada paciente")
+    args = parser.parse_args()
+
+    summary = score_file(InferenceEngine.load_default(), args.input, args.output, args.chunk_rows, args.rejections,
+                         args.cascade, args.compact, args.explain)
+    print(f"{summary['rows']:,} pacientes puntuados ({summary['high_risk']:,} de alto riesgo) -> {args.output}")
+    if summary["rejected"]:
+        print(f"{summary['rejected']:,} filas rechazadas por validación"
+              + (f" -> {args.rejections}" if args.rejections else " (usa --rejections para el reporte)"))
+    if args.cascade:
+        print("Filas evaluadas por modelo: " + ", ".join(f"{name} {n:,}" for name, n in summary["invocations"].items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import argparse
+import time
+from pathlib import Path
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+from src import config
+
+# --- GENERADOR MASIVO DE PACIENTES SINTÉTICOS ---
+# Cópula gaussiana ajustada a data/01_raw:
+#
+#   - Marginales: cuantiles empíricos de cada columna (mismos valores y
+#     frecuencias que el dataset real, incluidos los Cholesterol = 0).
+#   - Dependencias: matriz de correlación de los scores normales de cada columna
+#     (Edad vs MaxHR, ST_Slope vs HeartDisease, etc.).
+#
+# Al muestrear, Z ~ N(0, Σ) y cada columna se decodifica con searchsorted sobre
+# los cortes normales de su marginal: todo vectorizado por bloques y con un
+# np.random.Generator sembrado (misma semilla y tamaño de bloque -> mismos pacientes).
+#
+# Uso: python -m src.synthetic --rows 10000000 --seed 0 --output pacientes.parquet
+
+_NORMAL = NormalDist()
+
+# Filas por bloque al muestrear (acota la matriz Z de n_filas x n_columnas)
+_SAMPLE_BLOCK_ROWS = 1_000_000
+
+# Tabla de decodificación: rejilla fina sobre [-8, 8] en la escala normal
+_GRID_LOW = -8.0
+_GRID_BINS = 1 << 15
+
+
+def _rank_correlation(codes, rng):
+    """Correlación de Spearman con empates desempatados al azar (columnas de códigos)."""
+    n_rows = codes.shape[0]
+    ranks = np.empty(codes.shape)
+    for j in range(codes.shape[1]):
+        ranks[np.lexsort((rng.random(n_rows), codes[:, j])), j] = np.arange(n_rows)
+    return np.corrcoef(ranks, rowvar=False)
+
+
+def _decode_table(cuts):
+    """
+    Tabla para decodificar sin búsqueda binaria: por cada casilla de la rejilla,
+    cuántos cortes quedan por debajo y el corte que cae dentro (+inf si ninguno).
+    None si alguna casilla contiene más de un corte (se usa searchsorted).
+    """
+    edges = (_GRID_LOW + np.arange(_GRID_BINS + 1) * (-2 * _GRID_LOW / _GRID_BINS)).astype(np.float32)
+    below = np.searchsorted(cuts, edges[:-1], side="right")
+    if (np.searchsorted(cuts, edges[1:], side="right") - below).max(initial=0) > 1:
+        return None
+    inner = np.append(cuts, np.float32(np.inf)).take(below)
+    return below.astype(np.int16), inner
+
+
+def _nearest_correlation(matrix):
+    """Proyecta a una matriz de correlación definida positiva (autovalores >= 1e-6)."""
+    eigenvalues, eigenvectors = np.linalg.eigh((matrix + matrix.T) / 2)
+    matrix = (eigenvectors * np.maximum(eigenvalues, 1e-6)) @ eigenvectors.T
+    d = np.sqrt(np.diag(matrix))
+    return matrix / np.outer(d, d)
+
+
+class SyntheticPatientGenerator:
+    """
+    Cópula gaussiana con marginales empíricas. Cada columna guarda sus valores
+    distintos y los cortes en la escala normal que separan sus frecuencias.
+    """
+
+    def __init__(self, columns, values, cuts, correlation):
+        self.columns = list(columns)
+        self.values = [np.asarray(v) for v in values]   # Valores distintos (ordenados) por columna
+        self.cuts = [np.asarray(c) for c in cuts]       # Cortes normales entre valores consecutivos
+        self.correlation = np.asarray(correlation, dtype=np.float64)
+        self.cholesky = np.linalg.cholesky(self.correlation)
+        # Muestreo en float32 (el doble de rápido; la precisión sobra para decodificar)
+        self._cholesky32 = self.cholesky.astype(np.float32)
+        self._cuts32 = [c.astype(np.float32) for c in self.cuts]
+        self._tables = [_decode_table(c) for c in self._cuts32]
+
+    @classmethod
+    def fit(cls, data=None, target="HeartDisease", seed=0, calibration_rows=100_000, iterations=6):
+        """
+        Ajusta la cópula a un DataFrame (por defecto, el CSV crudo de src.config).
+
+        Las categorías de texto se ordenan por la tasa de `target` para que su
+        relación con el diagnóstico sea monótona (ej. ST_Slope: Up < Down < Flat).
+        Como las columnas discretas atenúan la correlación, la matriz latente se
+        calibra iterativamente hasta que la correlación de rangos de una muestra
+        coincide con la de los datos reales.
+        """
+        if data is None:
+            data = pd.read_csv(config.RAW_DATA_PATH)
+        rng = np.random.default_rng(seed)
+        n_rows = len(data)
+        outcome = data[target].to_numpy(dtype=np.float64) if target in data.columns else None
+
+        values, cuts, codes = [], [], []
+        for column in data.columns:
+            distinct, column_codes, counts = np.unique(data[column].to_numpy(), return_inverse=True,
+                                                       return_counts=True)
+            column_codes = column_codes.reshape(-1)
+            if distinct.dtype.kind in "OUS" and outcome is not None:
+                rates = np.bincount(column_codes, weights=outcome, minlength=distinct.size) / counts
+                order = np.argsort(rates, kind="stable")
+                distinct, counts = distinct[order], counts[order]
+                column_codes = np.argsort(order)[column_codes]
+            values.append(distinct)
+            codes.append(column_codes)
+
+            # Cortes en la escala normal: Φ⁻¹ de las frecuencias acumuladas
+            cumulative = np.cumsum(counts)[:-1] / n_rows
+            cuts.append(np.array([_NORMAL.inv_cdf(p) for p in cumulative]))
+
+        observed = _rank_correlation(np.column_stack(codes), rng)
+        latent = observed.copy()
+        for _ in range(iterations):
+            generator = cls(data.columns, values, cuts, latent)
+            simulated = _rank_correlation(generator.sample_codes(calibration_rows, rng).T, rng)
+            latent = _nearest_correlation(latent + observed - simulated)
+        return cls(data.columns, values, cuts, latent)
+
+    def sample_codes(self, n_rows, rng):
+        """Índice del valor de cada columna: array (n_columnas, n_filas) de int16."""
+        codes = np.empty((len(self.columns), n_rows), dtype=np.int16)
+        for start in range(0, n_rows, _SAMPLE_BLOCK_ROWS):
+            stop = min(start + _SAMPLE_BLOCK_ROWS, n_rows)
+            # Por columnas (n_columnas, bloque): cada decodificación lee memoria contigua
+            z = self._cholesky32 @ rng.standard_normal((len(self.columns), stop - start), dtype=np.float32)
+            for j, cuts in enumerate(self._cuts32):
+                out = codes[j, start:stop]
+                if cuts.size <= 4:
+                    # Pocas categorías: contar cortes superados es más rápido que buscar
+                    out[:] = 0
+                    for cut in cuts:
+                        out += z[j] > cut
+                elif self._tables[j] is not None:
+                    # Casilla de la rejilla -> cortes por debajo + el (único) corte dentro
+                    base, inner = self._tables[j]
+                    bins = ((z[j] - np.float32(_GRID_LOW)) * np.float32(_GRID_BINS / (-2 * _GRID_LOW))).astype(np.intp)
+                    np.clip(bins, 0, _GRID_BINS - 1, out=bins)
+                    np.add(base.take(bins), z[j] > inner.take(bins), out=out, casting="unsafe")
+                else:
+                    out[:] = np.searchsorted(cuts, z[j])
+        return codes
+
+    def sample(self, n_rows, seed=None):
+        """
+        Genera n_rows pacientes como dict {columna: array NumPy}.
+        `seed` puede ser un entero o un np.random.Generator.
+        """
+        rng = np.random.default_rng(seed)
+        codes = self.sample_codes(n_rows, rng)
+        return {column: self.values[j].take(codes[j]) for j, column in enumerate(self.columns)}
+
+    def sample_frame(self, n_rows, seed=None):
+        """Igual que sample, pero como DataFrame (las columnas de texto como Categorical)."""
+        rng = np.random.default_rng(seed)
+        codes = self.sample_codes(n_rows, rng)
+        frame = {}
+        for j, column in enumerate(self.columns):
+            values = self.values[j]
+            if values.dtype.kind in "OUS":
+                frame[column] = pd.Categorical.from_codes(codes[j], categories=values)
+            else:
+                frame[column] = values.take(codes[j])
+        return pd.DataFrame(frame)
+
+    def write(self, path, n_rows, seed=None, chunk_rows=_SAMPLE_BLOCK_ROWS):
+        """
+        Escribe n_rows pacientes por bloques en CSV o Parquet (según la extensión).
+        La memoria depende de chunk_rows, no de n_rows. Parquet requiere pyarrow.
+        """
+        path = Path(path)
+        rng = np.random.default_rng(seed)
+        writer = None
+
+        if path.suffix == ".parquet":
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError as e:
+                raise ImportError("Para escribir Parquet instala pyarrow") from e
+
+        try:
+            for start in range(0, n_rows, chunk_rows):
+                chunk = self.sample_frame(min(chunk_rows, n_rows - start), rng)
+                if path.suffix == ".parquet":
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(path, table.schema)
+                    writer.write_table(table)
+                else:
+                    chunk.to_csv(path, mode="w" if start == 0 else "a", header=start == 0, index=False)
+        finally:
+            if writer is not None:
+                writer.close()
+        return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generador masivo de pacientes sintéticos")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Archivo .csv o .parquet (si no, solo mide)")
+    parser.add_argument("--chunk-rows", type=int, default=_SAMPLE_BLOCK_ROWS)
+    args = parser.parse_args()
+
+    generator = SyntheticPatientGenerator.fit()
+    began = time.perf_counter()
+    if args.output:
+        generator.write(args.output, args.rows, args.seed, args.chunk_rows)
+        print(f"{args.rows:,} pacientes escritos en {args.output} ({time.perf_counter() - began:.1f} s)")
+    else:
+        generator.sample(args.rows, args.seed)
+        print(f"{args.rows:,} pacientes generados en {time.perf_counter() - began:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,99 +1,287 @@
+import hashlib
+import secrets
 import streamlit as st
 import pandas as pd
-from src import preprocessing
+from src import config, jobs, preprocessing, streaming
+from src.instrumentation import telemetry
 
-def render(artifacts):
+
+def _file_digest(uploaded_file):
+    """SHA-256 del archivo subido; se calcula una sola vez por archivo (file_id)."""
+    memo = st.session_state.get("batch_digest")
+    if memo is None or memo[0] != uploaded_file.file_id:
+        digest = hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+        memo = st.session_state["batch_digest"] = (uploaded_file.file_id, digest)
+    return memo[1]
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _read_preview(digest, fmt, _uploaded_file):
+    """Columnas del archivo y primeras filas de las requeridas, memoizadas por su contenido (digest)."""
+    column_names = streaming.read_column_names(_uploaded_file, fmt)
+    preview_df = streaming.read_preview(_uploaded_file, fmt)
+    return column_names, preview_df
+
+
+def _render_rejections(results):
+    """Filas que no pasaron la validación del esquema (config.INPUT_SCHEMA)."""
+    st.warning(
+        f"⚠️ {results.n_rejected:,} filas no pasaron la validación y no se puntuaron. "
+        "El resto del lote se procesó normalmente."
+    )
+    with st.expander("Ver reporte de filas rechazadas"):
+        summary = pd.DataFrame(
+            [(column, reason, n) for (column, reason), n in results.rejection_counts.items()],
+            columns=["Columna", "Motivo", "Filas"],
+        )
+        st.dataframe(summary, hide_index=True, use_container_width=True)
+
+        report = results.rejection_report()
+        if len(report) < results.n_rejected:
+            st.caption(f"Detalle de los primeros {len(report):,} rechazos (fila = posición en el archivo, base 0).")
+        st.dataframe(report, hide_index=True, use_container_width=True)
+        st.download_button(
+            label="📥 Descargar Reporte de Rechazos (CSV)",
+            data=report.to_csv(index=False).encode("utf-8"),
+            file_name="heart_disease_rechazos.csv",
+            mime="text/csv"
+        )
+
+
+# Fragmento: subir archivos o paginar resultados solo re-ejecuta esta pestaña
+@st.fragment
+@telemetry.timed("render", tab="batch")
+def render(engine):
     st.header("🏭 Procesamiento Masivo de Datos")
-    
+    # Cola de trabajos compartida entre sesiones (pool acotado de workers en segundo plano)
+    manager = preprocessing.load_job_manager(engine)
+
     # --- GENERADOR DE PLANTILLA ---
     st.markdown("### 1. Descarga la Plantilla")
     st.caption("Usa este archivo CSV como base para cargar tus datos. No cambies los nombres de las columnas.")
-    
+
     # Creamos un dataframe vacío con las columnas correctas para que sirva de ejemplo
-    # Usamos las claves del diccionario 'features_names' o un ejemplo manual
-    # Para asegurar compatibilidad, definimos las columnas estándar requeridas
-    required_columns = ['Age', 'Sex', 'ChestPainType', 'RestingBP', 'Cholesterol', 'FastingBS', 'RestingECG', 'MaxHR', 'ExerciseAngina', 'Oldpeak', 'ST_Slope']
+    # Para asegurar compatibilidad, usamos las columnas estándar requeridas (src/config.py)
+    required_columns = config.REQUIRED_COLUMNS
     template_df = pd.DataFrame(columns=required_columns)
-    
+
     # Convertimos a CSV
     template_csv = template_df.to_csv(index=False).encode('utf-8')
-    
+
     st.download_button(
         label="📥 Descargar Plantilla CSV Vacía",
         data=template_csv,
         file_name="plantilla_heart_disease.csv",
         mime="text/csv"
     )
-    
+
     st.markdown("---")
-    
+
     # --- ZONA DE CARGA ---
     st.markdown("### 2. Sube tu Archivo")
-    uploaded_file = st.file_uploader("Arrastra tu archivo CSV aquí", type=["csv"])
-    
+    extensions = [ext.lstrip(".") for exts in config.BATCH_FORMATS.values() for ext in exts]
+    uploaded_file = st.file_uploader("Arrastra tu archivo CSV, Parquet o Arrow aquí", type=extensions)
+
     if uploaded_file is not None:
-        # Leemos el archivo
-        batch_df = pd.read_csv(uploaded_file)
-        
+        # Leemos solo el esquema y las primeras filas (el archivo completo se procesa por bloques)
+        fmt = streaming.detect_format(uploaded_file.name)
+        digest = _file_digest(uploaded_file)
+        column_names, preview_df = _read_preview(digest, fmt, uploaded_file)
+
         # --- VALIDACIÓN DE ESQUEMA ---
-        # Verificamos si faltan columnas
-        missing_cols = [col for col in required_columns if col not in batch_df.columns]
-        
+        # Verificamos si faltan columnas (las columnas extra se ignoran al leer)
+        missing_cols = [col for col in required_columns if col not in column_names]
+
         if len(missing_cols) > 0:
             st.error(f"❌ Error de Formato: Faltan las siguientes columnas obligatorias: {missing_cols}")
         else:
-            st.success(f"✅ Archivo válido: {len(batch_df)} pacientes detectados.")
-            st.dataframe(batch_df.head()) # Vista previa
-            
+            st.success(f"✅ Archivo válido: {uploaded_file.size / 1024 / 1024:.1f} MB listos para procesar.")
+            st.dataframe(preview_df) # Vista previa
+
             # --- PROCESAMIENTO ---
+            # Por defecto el consenso va en cascada: los modelos caros solo ven las filas indecisas
+            full_probabilities = st.checkbox(
+                "Calcular las probabilidades de los 4 modelos en todas las filas",
+                value=False,
+                help="Sin marcar, el lote usa el consenso en cascada (mismo diagnóstico, más rápido): "
+                     "los modelos que no hacen falta quedan como -1 y sus probabilidades vacías."
+            )
+            compact = st.checkbox(
+                "Modo compacto (float32)",
+                value=False,
+                help="Features y probabilidades en float32: cerca de la mitad de memoria por bloque. "
+                     "Las probabilidades pueden diferir en el 7º decimal."
+            )
+            explain = st.checkbox(
+                "Incluir explicaciones (principales factores)",
+                value=False,
+                help=f"Agrega Factor_1..{config.EXPLAIN_TOP_FACTORS}: los factores clínicos que más pesaron "
+                     "en cada paciente, con (+) si empujan hacia Enfermo y (-) si lo alejan."
+            )
+
             if st.button("⚙️ PROCESAR LOTE AHORA", type="primary"):
-                with st.spinner("Ejecutando predicciones en paralelo..."):
-                    
-                    try:
-                        # Preprocesamiento Masivo (Reutilizamos la función del backend)
-                        X_batch = preprocessing.preprocess_input(batch_df, artifacts)
-                        
-                        # Inferencia con todos los modelos
-                        results_df = batch_df.copy() # Copiamos datos originales
-                        
-                        # Creamos columnas para cada modelo
-                        vote_cols = []
-                        for model_name, model in artifacts["models"].items():
-                            
-                            # Predecimos todo el array de golpe (Vectorizado = Rápido)
-                            preds = model.predict(X_batch)
-                            col_name = f"Pred_{model_name}"
-                            results_df[col_name] = preds
-                            vote_cols.append(col_name)
-                        
-                        # Cálculo de Consenso
-                        # Sumamos las predicciones (1=Enfermo, 0=Sano)
-                        results_df["Votos_Positivos"] = results_df[vote_cols].sum(axis=1)
-                        results_df["Consenso_Final"] = results_df["Votos_Positivos"].apply(
-                            lambda x: "ALTO RIESGO" if x >= 2 else "Bajo Riesgo"
-                        )
-                        
-                        # Mostrar Resultados
-                        st.markdown("### 🏁 Resultados del Análisis")
-                        
-                        # Función de color para la tabla
-                        def color_risk(val):
-                            color = "#BD0A0A5C" if val == 'ALTO RIESGO' else "#1AE87D5D"
-                            return f'background-color: {color}'
-
-                        st.dataframe(
-                            results_df.style.map(color_risk, subset=['Consenso_Final']),
-                            use_container_width=True
-                        )
-                        
-                        # Descarga Final
-                        final_csv = results_df.to_csv(index=False).encode('utf-8')
-                        st.download_button(
-                            label="📥 Descargar Resultados Completos (CSV)",
-                            data=final_csv,
-                            file_name="heart_disease_results_batch.csv",
-                            mime="text/csv"
-                        )
-                        
-                    except Exception as e:
-                        st.error(f"Ocurrió un error durante el procesamiento: {e}")
\ No newline at end of file
+                # El lote se encola (src/jobs.py): se puntúa fuera de este script y sobrevive a los reruns
+                try:
+                    job_id = manager.submit(uploaded_file, uploaded_file.name, _job_owner(),
+                                            cascade=not full_probabilities, compact=compact, explain=explain)
+                    _open_job(job_id)
+                except Exception as e:
+                    st.error(f"No se pudo encolar el lote: {e}")
+
+    # --- TRABAJOS --- (siguen visibles al quitar el archivo o recargar la página: ?job=<id>)
+    st.markdown("---")
+    job_id = st.session_state.get("batch_job") or st.query_params.get("job")
+    job = manager.get(job_id) if job_id else None
+
+    if job is None:
+        st.caption("Los lotes se procesan en segundo plano: puedes seguir usando la app mientras tanto.")
+    elif job["status"] in (jobs.QUEUED, jobs.RUNNING):
+        _render_progress(manager, job["id"])
+    elif job["status"] == jobs.DONE:
+        _render_results(manager, job)
+    elif job["status"] == jobs.FAILED:
+        st.error(f"Ocurrió un error durante el procesamiento de {job['filename']}: {job['error']}")
+    else:
+        st.info(f"El lote {job['filename']} se canceló ({job['rows']:,} pacientes puntuados antes de cancelar).")
+
+    _render_job_list(manager)
+
+
+def _job_owner():
+    """Dueño de los trabajos de esta sesión: la cola reparte los workers entre dueños."""
+    if "batch_owner" not in st.session_state:
+        st.session_state["batch_owner"] = secrets.token_hex(8)
+    return st.session_state["batch_owner"]
+
+
+def _open_job(job_id):
+    """Trabajo que muestra la pestaña (también en la URL, para retomarlo tras recargar)."""
+    st.session_state["batch_job"] = job_id
+    st.query_params["job"] = job_id
+
+
+@st.fragment(run_every=config.JOBS_POLL_SECONDS)
+def _render_progress(manager, job_id):
+    """Consulta el trabajo cada JOBS_POLL_SECONDS; al terminar re-ejecuta la pestaña para mostrar los resultados."""
+    job = manager.get(job_id)
+    if job is None or job["status"] in jobs.FINISHED:
+        st.rerun()
+
+    st.markdown(f"### ⏳ Procesando {job['filename']}")
+    if job["status"] == jobs.QUEUED:
+        ahead = manager.queue_position(job_id)
+        st.progress(0.0, text=f"En cola ({ahead} trabajos por delante)..." if ahead else "En cola...")
+    else:
+        st.progress(min(job["progress"], 1.0), text=f"Procesando por bloques... {job['rows']:,} pacientes")
+
+    if job["cancel_requested"]:
+        st.caption("Cancelando al terminar el bloque actual...")
+    elif st.button("✖️ Cancelar lote", key=f"cancel_{job_id}"):
+        manager.cancel(job_id)
+        st.rerun()
+
+
+def _render_job_list(manager):
+    """Lotes enviados en esta sesión; se puede volver a abrir cualquiera."""
+    own = manager.list(owner=_job_owner())
+    if len(own) < 2:
+        return
+    with st.expander(f"Mis lotes ({len(own)})"):
+        st.dataframe(
+            pd.DataFrame({
+                "Lote": [job["id"] for job in own],
+                "Archivo": [job["filename"] for job in own],
+                "Estado": [job["status"] for job in own],
+                "Progreso": [f"{job['progress']:.0%}" for job in own],
+                "Pacientes": [job["rows"] for job in own],
+            }),
+            hide_index=True, use_container_width=True
+        )
+        choice = st.selectbox("Ver lote", [job["id"] for job in own],
+                              format_func=lambda job_id: f"{job_id} · {next(j['filename'] for j in own if j['id'] == job_id)}")
+        if st.button("Abrir lote") and choice != st.session_state.get("batch_job"):
+            _open_job(choice)
+            st.rerun()
+
+
+def _render_results(manager, job):
+    """KPIs, rechazos, vista paginada y descarga de un lote terminado."""
+    # Los resultados del trabajo se abren una vez por sesión (Arrow IPC mapeado en memoria)
+    stored = st.session_state.get("batch_results")
+    if stored is None or stored[0] != job["id"]:
+        if stored is not None:
+            stored[1].close()
+        stored = st.session_state["batch_results"] = (job["id"], manager.results(job["id"]))
+    results = stored[1]
+
+    # Mostrar Resultados
+    st.markdown("### 🏁 Resultados del Análisis")
+
+    kpi1, kpi2, kpi3, kpi4 = st.columns(4)
+    kpi1.metric("Pacientes Procesados", f"{results.n_rows:,}")
+    kpi2.metric("Casos de Alto Riesgo", f"{results.n_high_risk:,}")
+    kpi3.metric("Filas Rechazadas", f"{results.n_rejected:,}")
+    if results.speedup is None:
+        kpi4.metric("Speedup Paralelo", "Serie")
+    else:
+        kpi4.metric("Speedup Paralelo", f"{results.speedup:.1f}x", f"{results.utilization:.0%} de utilización",
+                    delta_color="off",
+                    help="Tiempo en serie de la puntuación (CPU de cada tarea) / tiempo real del pool")
+    modes = [label for enabled, label in ((results.cascade, "consenso en cascada"),
+                                          (results.compact, "modo compacto (float32)")) if enabled]
+    st.caption("Modo: " + (", ".join(modes) if modes else "todos los modelos en float64"))
+
+    if results.cascade and results.n_rows:
+        # Filas que necesitó cada modelo (los votos cuentan solo los modelos evaluados)
+        st.caption("Consenso en cascada: filas evaluadas por modelo")
+        cols = st.columns(len(results.invocations))
+        for col, (name, n) in zip(cols, results.invocations.items()):
+            col.metric(name, f"{n / results.n_rows:.0%}", f"{n:,} filas", delta_color="off")
+
+    # --- REPORTE DE RECHAZOS --- (las filas inválidas no detienen el lote)
+    if results.n_rejected:
+        _render_rejections(results)
+
+    # Vista paginada: solo se lee y se colorea la página actual
+    page = st.number_input(
+        f"Página (de {results.n_pages})", min_value=1, max_value=results.n_pages, value=1
+    )
+    page_df = results.read_page(page - 1)
+
+    # Función de color para la tabla
+    def color_risk(val):
+        color = "#BD0A0A5C" if val == 'ALTO RIESGO' else "#1AE87D5D"
+        return f'background-color: {color}'
+
+    st.dataframe(
+        page_df.style.map(color_risk, subset=['Consenso_Final']),
+        use_container_width=True
+    )
+
+    # Descarga Final (el archivo se genera desde los resultados del trabajo solo al pulsar)
+    # Parquet/Arrow conservan los tipos: votos int8, probabilidades float32, consenso categórico
+    out_fmt = st.radio(
+        "Formato de descarga", list(config.BATCH_FORMATS), horizontal=True,
+        format_func={"csv": "CSV", "parquet": "Parquet", "arrow": "Arrow IPC"}.get
+    )
+    # El archivo se escribe por bloques en el directorio del trabajo (src/jobs.py)
+    if st.button(f"Preparar descarga ({out_fmt.upper()})"):
+        with st.spinner("Escribiendo el archivo de resultados..."):
+            st.session_state["batch_export"] = (job["id"], out_fmt, manager.export(job["id"], out_fmt))
+    export = st.session_state.get("batch_export")
+    if export is None or export[:2] != (job["id"], out_fmt):
+        return
+
+    path = export[2]
+    size = path.stat().st_size
+    if size > config.BATCH_DOWNLOAD_MAX_BYTES:
+        # Streamlit guarda en memoria todo lo que sirve con download_button: no se ofrece por encima del límite
+        st.info(f"El archivo pesa {size / 2**20:,.0f} MB, más que el límite de descarga desde la app "
+                f"({config.BATCH_DOWNLOAD_MAX_BYTES / 2**20:,.0f} MB). Está disponible en `{path}`.")
+        return
+    st.download_button(
+        label=f"📥 Descargar Resultados Completos ({out_fmt.upper()}, {size / 2**20:,.1f} MB)",
+        data=path.read_bytes,
+        file_name=f"heart_disease_results_batch{config.BATCH_FORMATS[out_fmt][0]}",
+        mime=config.BATCH_MIME_TYPES[out_fmt]
+    )
@@ -0,0 +1,75 @@
+import streamlit as st
+import pandas as pd
+from src import config
+from src.instrumentation import telemetry
+
+_STAGE_NAMES = {
+    "load": "Carga", "preprocess": "Preprocesamiento", "model": "Modelo",
+    "consensus": "Consenso", "predict": "Predicción", "render": "Render",
+}
+
+
+# Se refresca solo (sin re-ejecutar el resto de la app) mientras el panel está abierto
+@st.fragment(run_every=config.TELEMETRY_PANEL_REFRESH_SECONDS)
+def render(engine=None):
+    if hasattr(engine, "status"):
+        _render_registry(engine.status())
+
+    snapshot = telemetry.snapshot()
+    if not snapshot:
+        st.caption("Aún no hay mediciones.")
+        return
+
+    stages_df = pd.DataFrame([
+        {
+            "Etapa": _STAGE_NAMES.get(entry["stage"], entry["stage"]),
+            "Detalle": ", ".join(f"{k}={v}" for k, v in entry["labels"].items()),
+            "Llamadas": entry["count"],
+            "p50 (ms)": entry["p50_ms"],
+            "p95 (ms)": entry["p95_ms"],
+            "p99 (ms)": entry["p99_ms"],
+            "Media (ms)": entry["mean_ms"],
+        }
+        for entry in snapshot
+    ])
+    st.dataframe(
+        stages_df.style.format({c: "{:.3f}" for c in ("p50 (ms)", "p95 (ms)", "p99 (ms)", "Media (ms)")}),
+        use_container_width=True, hide_index=True
+    )
+
+    throughput = telemetry.throughput()
+    if throughput:
+        columns = st.columns(len(throughput))
+        for column, (path, rate) in zip(columns, sorted(throughput.items())):
+            column.metric(f"Filas/s ({path})", f"{rate:,.0f}")
+
+    st.download_button(
+        label="📥 Métricas Prometheus",
+        data=telemetry.prometheus_text(),
+        file_name="telemetry.prom",
+        mime="text/plain",
+    )
+    st.caption("Percentiles estimados a partir de histogramas de buckets fijos (acumulados desde el arranque).")
+
+
+def _render_registry(status):
+    """Versión de modelos servida (src/registry.py) y desacuerdo de la versión en sombra."""
+    version = status["version"] or ".pkl sueltos"
+    st.caption(f"Versión de modelos: **{version}** ({status['fingerprint']}) · "
+               f"{len(status['swaps'])} cambio(s) en caliente desde el arranque")
+    if status["last_error"]:
+        st.warning(f"Última recarga fallida: {status['last_error']}")
+
+    shadow = status["shadow"]
+    if shadow is None:
+        return
+    rate = shadow["consensus_disagreement_rate"]
+    c1, c2, c3 = st.columns(3)
+    c1.metric(f"Sombra: {shadow['version']}", f"{shadow['rows']:,} filas")
+    c2.metric("Desacuerdo en consenso", f"{rate:.2%}" if rate is not None else "—")
+    c3.metric("Descartadas (cola llena)", f"{shadow['dropped']:,}")
+    if shadow["models"]:
+        st.dataframe(pd.DataFrame([
+            {"Modelo": name, "Filas": m["rows"], "Desacuerdo": m["disagreement_rate"]}
+            for name, m in shadow["models"].items()
+        ]).style.format({"Desacuerdo": "{:.2%}"}, na_rep="—"), use_container_width=True, hide_index=True)
@@ -1,10 +1,8 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-from datetime import datetime
-from src import preprocessing
+from src.instrumentation import telemetry
 
-def render(user_input, artifacts, is_analyzing):
+@telemetry.timed("render", tab="diagnosis")
+def render(user_input, engine, is_analyzing, history_store):
     # Si el usuario aún no presionó el botón
     if not is_analyzing:
         st.markdown(
@@ -19,68 +17,34 @@ def render(user_input, artifacts, is_analyzing):
     
     # Si el usuario presionó ANALIZAR RIESGO 
     else:
-        # Preprocesamiento (Convertir Inputs -> Números Matemáticos)
+        # Inferencia (Preguntar a los 4 Modelos)
+        # El motor (src/engine.py) preprocesa y ejecuta los modelos en una sola llamada
         with st.spinner("🧠 Procesando datos con los 4 modelos de IA..."):
-            # Convertimos el dict del usuario a DataFrame (1 fila)
-            user_df = pd.DataFrame([user_input])
-            
-            # Llamamos a al motor en src/preprocessing.py
             try:
-                X_processed = preprocessing.preprocess_input(user_df, artifacts)
+                result = engine.predict_one(user_input)
             except Exception as e:
                 st.error(f"Error en el preprocesamiento: {e}")
                 st.stop()
 
-        # Inferencia (Preguntar a los 4 Modelos)
-        # Guardaremos los resultados en una lista para calcular el resultado
-        model_results = []
-        
-        for model_name, model in artifacts["models"].items():
-            # Predicción dura (0 o 1)
-            pred_class = model.predict(X_processed)[0]
-            
-            # Probabilidad (Confianza del modelo)
-            # Nota: Algunos modelos como SVM necesitan probability=True al entrenar. 
-            # Si falla, usamos try/except y asumimos 100% o 0%.
-            try:
-                proba = model.predict_proba(X_processed)[0][1] # Probabilidad de clase 1 (Enfermo)
-            except:
-                proba = 1.0 if pred_class == 1 else 0.0
-            
-            model_results.append({
-                "Modelo": model_name,
-                "Predicción": pred_class,
-                "Probabilidad": proba
-            })
+        # Guardaremos los resultados en una lista para las tarjetas por modelo
+        model_results = [
+            {"Modelo": name, "Predicción": r["prediction"], "Probabilidad": r["probability"]}
+            for name, r in result["models"].items()
+        ]
 
-        # Cálculo del Consenso (Lógica de Negocio)
-        # Contamos cuántos modelos dijeron "1" (Enfermo)
-        votes_positive = sum(r["Predicción"] for r in model_results)
-        total_models = len(model_results)
-        avg_probability = np.mean([r["Probabilidad"] for r in model_results])
-        
+        # Cálculo del Consenso (Lógica de Negocio en el motor)
         # Regla de decisión: Si 2 o más modelos dicen enfermo -> ALERTA
-        is_high_risk = votes_positive >= 2 
+        votes_positive = result["votes"]
+        total_models = len(model_results)
+        avg_probability = result["probability"]
+        is_high_risk = result["high_risk"]
 
 
         # NOTA: PARTE IMPORTANTE PARA QUE FUNCIONE EL TAB 3
         # INICIO TAB 3
-        
-        # Creamos un registro estructurado
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        new_record = {
-            "Fecha": timestamp,
-            "Edad": user_input["Age"],
-            "Sexo": "M" if user_input["Sex"] == "M" else "F",
-            "Colesterol": user_input["Cholesterol"],
-            "Diagnóstico": "ALTO RIESGO" if is_high_risk else "Bajo Riesgo",
-            "Probabilidad": f"{avg_probability:.1%}",
-            "Modelos_Positivos": f"{votes_positive}/4"
-        }
-        
-        # Lo agregamos a la memoria (al principio de la lista para que salga arriba)
-        st.session_state["history"].insert(0, new_record)
+
+        # Guardamos el diagnóstico en el historial persistente (inserción O(1) + KPIs incrementales)
+        history_store.append(user_input, result)
 
         # FIN TAB 3
 
@@ -142,4 +106,31 @@ def render(user_input, artifacts, is_analyzing):
                     value=status_text,
                     delta=f"{res['Probabilidad']:.1%} Confianza",
                     delta_color=delta_color
-                )
\ No newline at end of file
+                )
+        # --- PRINCIPALES FACTORES --- (contribución de cada factor clínico, src/explain.py)
+        st.markdown("---")
+        st.subheader("🧭 Principales Factores")
+        try:
+            explanation = engine.explain_many(user_input)
+        except Exception as e:
+            st.warning(f"No se pudo calcular la explicación: {e}")
+            return
+
+        cols = st.columns(len(explanation.top(0)))
+        for col, (factor, weight) in zip(cols, explanation.top(0)):
+            # Peso combinado: fracción media del efecto total de cada modelo
+            col.metric(
+                label=factor,
+                value=str(user_input.get(factor, "")),
+                delta=f"{'↑' if weight > 0 else '↓'} riesgo ({abs(weight):.0%} del peso)",
+                delta_color="inverse" if weight > 0 else "normal"
+            )
+
+        with st.expander("Contribuciones por modelo"):
+            st.caption("Positivo = empuja hacia Enfermo. Unidades de cada modelo: probabilidad (árboles), "
+                       "log-odds (Regresión Logística) y función de decisión (SVM, frente a una muestra de fondo).")
+            table = explanation.model_table(0)
+            st.dataframe(
+                {"Factor": list(table), **{name: [table[f][name] for f in table] for name in explanation.base}},
+                use_container_width=True, hide_index=True
+            )
@@ -1,45 +1,98 @@
 import streamlit as st
 import pandas as pd
+from src import config
+from src.instrumentation import telemetry
 
-def render():
-    st.header("🕰️ Historial de Sesión")
-    
-    # Verificamos si hay datos en la memoria
-    if len(st.session_state["history"]) == 0:
-        st.info("No hay registros en esta sesión. Realiza un diagnóstico en la pestaña 1 para ver datos aquí.")
+# Filtros de la vista -> argumentos de HistoryStore
+_RISK_FILTERS = {"Todos": None, "ALTO RIESGO": True, "Bajo Riesgo": False}
+_SEX_FILTERS = {"Todos": None, "Masculino": "M", "Femenino": "F"}
+
+
+def _to_display(record):
+    """Registro del almacén -> fila de la tabla (mismo formato que antes)."""
+    return {
+        "Fecha": record["timestamp"],
+        "Edad": record["age"],
+        "Sexo": record["sex"],
+        "Colesterol": record["cholesterol"],
+        "Diagnóstico": "ALTO RIESGO" if record["high_risk"] else "Bajo Riesgo",
+        "Probabilidad": f"{record['probability']:.1%}",
+        "Modelos_Positivos": f"{record['votes']}/{record['n_models']}",
+    }
+
+
+def highlight_risk(val):
+    color = "#BD0A0A5C" if val == 'ALTO RIESGO' else "#1AE87D5D" # Rojo suave vs Verde suave
+    return f'background-color: {color}'
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _page_frame(records):
+    """Página ya formateada para la tabla, memoizada por el contenido de sus registros."""
+    return pd.DataFrame(
+        [_to_display(r) for r in records],
+        columns=["Fecha", "Edad", "Sexo", "Colesterol", "Diagnóstico", "Probabilidad", "Modelos_Positivos"],
+    )
+
+
+# Fragmento: filtros y paginación solo re-ejecutan esta pestaña
+@st.fragment
+@telemetry.timed("render", tab="history")
+def render(history_store):
+    st.header("🕰️ Historial de Predicciones")
+
+    # KPIs incrementales: no se recorre el historial
+    kpis = history_store.kpis()
+
+    # Verificamos si hay datos guardados
+    if kpis["total"] == 0:
+        st.info("No hay registros todavía. Realiza un diagnóstico en la pestaña 1 para ver datos aquí.")
     else:
-        # Convertir lista a DataFrame
-        history_df = pd.DataFrame(st.session_state["history"])
-        
         # Métricas Rápidas (KPIs)
         kpi1, kpi2, kpi3 = st.columns(3)
-        kpi1.metric("Pacientes Analizados", len(history_df))
-        kpi2.metric("Casos de Alto Riesgo", len(history_df[history_df["Diagnóstico"] == "ALTO RIESGO"]))
-        
-        # Filtramos último registro
-        last_time = history_df.iloc[0]["Fecha"].split(" ")[1]
-        kpi3.metric("Último Análisis", last_time)
-        
+        kpi1.metric("Pacientes Analizados", f"{kpis['total']:,}")
+        kpi2.metric("Casos de Alto Riesgo", f"{kpis['high_risk']:,}")
+        kpi3.metric("Último Análisis", kpis["last_timestamp"].split(" ")[1])
+
         st.markdown("---")
-        
-        # Mostrar Tabla con Colores
-        def highlight_risk(val):
-            color = "#BD0A0A5C" if val == 'ALTO RIESGO' else "#1AE87D5D" # Rojo suave vs Verde suave
-            return f'background-color: {color}'
 
+        # Filtros y paginación: solo se consulta la página visible
+        col_risk, col_sex, col_page = st.columns(3)
+        high_risk = _RISK_FILTERS[col_risk.selectbox("Diagnóstico", list(_RISK_FILTERS), key="history_risk")]
+        sex = _SEX_FILTERS[col_sex.selectbox("Sexo", list(_SEX_FILTERS), key="history_sex")]
+
+        # Paginación por clave: pila con el id de inicio de cada página visitada (None = la más reciente).
+        # Cambiar de filtros vuelve a la primera página.
+        if st.session_state.get("history_filters") != (high_risk, sex):
+            st.session_state.history_filters = (high_risk, sex)
+            st.session_state.history_cursors = [None]
+        cursors = st.session_state.history_cursors
+
+        n_rows = history_store.count(high_risk, sex)
+        n_pages = max(1, -(-n_rows // config.HISTORY_PAGE_ROWS))
+        records = history_store.page(cursors[-1], high_risk=high_risk, sex=sex)
+
+        col_page.caption(f"Página {len(cursors)} de {n_pages}")
+        col_prev, col_next = col_page.columns(2)
+        col_prev.button("◀ Anterior", key="history_prev", disabled=len(cursors) == 1,
+                        on_click=cursors.pop, use_container_width=True)
+        col_next.button("Siguiente ▶", key="history_next", disabled=len(cursors) >= n_pages or not records,
+                        on_click=cursors.append, args=(records[-1]["id"] if records else None,),
+                        use_container_width=True)
+        st.caption(f"{n_rows:,} registros con los filtros actuales")
+
+        # Mostrar Tabla con Colores
         st.dataframe(
-            history_df.style.map(highlight_risk, subset=['Diagnóstico']),
+            _page_frame(records).style.map(highlight_risk, subset=['Diagnóstico']),
             use_container_width=True,
             hide_index=True
         )
-        
-        # Botón de Exportación (Descargar CSV)
-        csv = history_df.to_csv(index=False).encode('utf-8')
-        
+
+        # Botón de Exportación (Descargar CSV): se genera solo al pulsar
         st.download_button(
             label="📥 Descargar Reporte CSV",
-            data=csv,
+            data=lambda: history_store.export_csv(high_risk, sex),
             file_name="heart_disease_history.csv",
             mime="text/csv",
             type="primary"
-        )
\ No newline at end of file
+        )
@@ -1,21 +1,86 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 from src import config
+from src.instrumentation import telemetry
 
-def render(artifacts):
-    st.header("🛡️ Auditoría de Rendimiento de los Modelos")
-    
-    # --- Preparación de Datos ---
-    
+
+@st.cache_data(show_spinner=False)
+def _metrics_figure(metrics, metric_choice):
+    """Gráfico comparativo de una métrica (memoizado por hash de metrics + métrica)."""
     # Convertimos el diccionario metrics.json a un DataFrame de Pandas para poder graficarlo
     # Estructura actual: {'Random Forest': {'accuracy': 0.9, ...}, ...}
-    metrics_df = pd.DataFrame(artifacts["metrics"]).T.reset_index()
+    metrics_df = pd.DataFrame(metrics).T.reset_index()
     metrics_df = metrics_df.rename(columns={"index": "Modelo"})
     
     # Damos formato amigable a los nombres (ej: random_forest -> Random Forest)
     metrics_df["Modelo"] = metrics_df["Modelo"].apply(lambda x: x.replace("_", " ").title())
 
+    # Import diferido: Plotly solo se carga cuando se dibuja el gráfico
+    import plotly.express as px
+
+    # Identificamos al mejor modelo para cambiar de color
+    best_val = metrics_df[metric_choice].max()
+    metrics_df["Color"] = metrics_df[metric_choice].apply(lambda x: "Ganador" if x == best_val else "Otros")
+    
+    fig = px.bar(
+        metrics_df, 
+        x="Modelo", 
+        y=metric_choice,
+        color="Color",
+        text_auto='.2%', # Formato porcentaje
+        title=f"Comparativa de {metric_choice.upper()} entre Modelos",
+        color_discrete_map={"Ganador": "#DC2626", "Otros": "#9CA3AF"}, # Rojo para el mejor, gris para resto
+        template="plotly_white"
+    )
+    
+    # Ajustes finos del gráfico
+    fig.update_layout(
+        yaxis_title="Puntuación (0-1)",
+        xaxis_title=None,
+        showlegend=False,
+        height=400
+    )
+    return fig
+
+
+def _render_drift(report):
+    st.markdown("---")
+    st.markdown("### 📡 Deriva de los Datos de Entrada")
+    if report["rows"] == 0:
+        st.caption("Aún no se han recibido pacientes en esta sesión del servidor.")
+        return
+
+    for column, entry in report["missing_values"].items():
+        if entry["alert"]:
+            st.warning(f"⚠️ {entry['rate']:.1%} de los pacientes llegan sin {column} (en el entrenamiento: "
+                       f"{entry['reference_rate']:.1%}). Los faltantes (y los 0 registrados) se imputan "
+                       f"con la mediana, así que el modelo predice sin ese dato.")
+
+    drift_df = pd.DataFrame([
+        {
+            "Variable": column,
+            "PSI": entry.get("psi"),
+            "KS": entry.get("ks"),
+            "Faltantes": entry.get("missing_rate"),
+            "Faltantes (ref.)": entry.get("reference_missing_rate"),
+            "Estado": entry.get("status", "—"),
+        }
+        for column, entry in report["columns"].items()
+    ])
+    st.dataframe(
+        drift_df.style.format({"PSI": "{:.3f}", "KS": "{:.3f}", "Faltantes": "{:.1%}", "Faltantes (ref.)": "{:.1%}"}, na_rep="—"),
+        use_container_width=True, hide_index=True
+    )
+    st.caption(f"{report['rows']:,} pacientes observados. PSI ≥ {config.DRIFT_PSI_WARNING} = aviso, "
+               f"≥ {config.DRIFT_PSI_ALERT} = alerta.")
+
+
+@st.fragment
+@telemetry.timed("render", tab="performance")
+def render(engine):
+    # Fragmento: cambiar la métrica solo re-ejecuta esta pestaña
+    st.header("🛡️ Auditoría de Rendimiento de los Modelos")
+    
     # --- Controles de Usuario ---
     col_controls, col_graph = st.columns([1, 3])
     
@@ -68,32 +133,15 @@ def render(artifacts):
     with col_graph:
         
         # --- Visualización con Plotly ---
+        # La figura se memoiza por contenido de las métricas y métrica elegida
+        fig = _metrics_figure(engine.metrics, metric_choice)
 
-        # Identificamos al mejor modelo para cambiar de color
-        best_val = metrics_df[metric_choice].max()
-        metrics_df["Color"] = metrics_df[metric_choice].apply(lambda x: "Ganador" if x == best_val else "Otros")
-        
-        fig = px.bar(
-            metrics_df, 
-            x="Modelo", 
-            y=metric_choice,
-            color="Color",
-            text_auto='.2%', # Formato porcentaje
-            title=f"Comparativa de {metric_choice.upper()} entre Modelos",
-            color_discrete_map={"Ganador": "#DC2626", "Otros": "#9CA3AF"}, # Rojo para el mejor, gris para resto
-            template="plotly_white"
-        )
-        
-        # Ajustes finos del gráfico
-        fig.update_layout(
-            yaxis_title="Puntuación (0-1)",
-            xaxis_title=None,
-            showlegend=False,
-            height=400
-        )
-        
         st.plotly_chart(fig, use_container_width=True)
 
+    # --- Monitor de Deriva (entradas recibidas vs data/02_interim) ---
+    if engine.monitor is not None:
+        _render_drift(engine.monitor.report())
+
     # --- Ficha Técnica (Footer) ---
     st.markdown("---")
     st.caption(f"📅 Datos basados en el entrenamiento del modelo (Test Set). Fuente: {config.METRICS_PATH}")
\ No newline at end of file
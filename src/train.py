@@ -0,0 +1,262 @@
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, f1_score, recall_score
+from sklearn.model_selection import GridSearchCV, train_test_split
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC
+from sklearn.tree import DecisionTreeClassifier
+from src import config
+
+# --- PIPELINE DE ENTRENAMIENTO (LÍNEA DE COMANDOS) ---
+# Mismo procedimiento que notebooks/02_Training_Pipeline.ipynb, sin Google Drive:
+#
+#   1. Lee data/02_interim, One-Hot (drop_first), split estratificado 80/20,
+#      imputación por mediana y escalado estándar.
+#   2. Las matrices resultantes (y el imputer/scaler ajustados) se cachean en
+#      artefacts/cache con la huella del CSV y de los parámetros del split:
+#      re-entrenar con los mismos datos no repite el preprocesamiento.
+#   3. Las 4 búsquedas de hiperparámetros corren a la vez; cada una reparte
+#      sus (candidato, fold) entre TRAIN_WORKERS núcleos (joblib).
+#      Con --halving se usa HalvingGridSearchCV (successive halving).
+#   4. Escribe los artefactos de src.config (.pkl de modelos, imputer, scaler,
+#      features) y metrics.json con las métricas en el test set.
+#
+# Uso: python -m src.train [--halving] [--jobs 8] [--output-dir /tmp/modelos]
+
+# Clave de métricas -> (nombre en la app, estimador base, rejilla de hiperparámetros)
+SEARCHES = {
+    "logistic_regression": (
+        "Logistic Regression",
+        LogisticRegression(random_state=config.TRAIN_SEED, max_iter=1000),
+        {"solver": ["liblinear", "lbfgs"], "C": [0.01, 0.1, 1, 10, 100]},
+    ),
+    "support_vector_machine": (
+        "Support Vector Machine",
+        # 'probability=True' es vital para que la App muestre la confianza de la predicción
+        SVC(probability=True, random_state=config.TRAIN_SEED),
+        {"kernel": ["linear", "rbf"], "C": [0.1, 1, 10], "gamma": ["scale", "auto"]},
+    ),
+    "decision_tree": (
+        "Decision Tree",
+        DecisionTreeClassifier(random_state=config.TRAIN_SEED),
+        {"max_depth": [3, 5, 7, 10, None], "class_weight": ["balanced", None], "min_samples_split": [2, 5, 10]},
+    ),
+    "random_forest": (
+        "Random Forest",
+        RandomForestClassifier(random_state=config.TRAIN_SEED),
+        {"n_estimators": [50, 100, 200], "max_depth": [5, 10, None], "class_weight": ["balanced", None]},
+    ),
+}
+
+
+# --- DATOS Y PREPROCESAMIENTO (CACHEADO) ---
+
+def data_fingerprint(data_path, test_size=config.TRAIN_TEST_SIZE, seed=config.TRAIN_SEED):
+    """Huella del CSV y de los parámetros del split (clave de la caché de matrices)."""
+    hasher = hashlib.sha256()
+    with open(data_path, "rb") as f:
+        hasher.update(f.read())
+    hasher.update(json.dumps({"test_size": test_size, "seed": seed}).encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def split_interim(data_path=config.INTERIM_DATA_PATH, test_size=config.TRAIN_TEST_SIZE, seed=config.TRAIN_SEED):
+    """One-Hot (drop_first) + split estratificado: (X_train, X_test, y_train, y_test) sin imputar ni escalar."""
+    df = pd.read_csv(data_path)
+
+    # One-Hot Encoding (Transformación de Texto a Números)
+    df_encoded = pd.get_dummies(df, drop_first=True)
+    X = df_encoded.drop(columns=["HeartDisease"])
+    y = df_encoded["HeartDisease"]
+
+    # División Train/Test (Estratificada)
+    return train_test_split(X, y, test_size=test_size, random_state=seed, stratify=y)
+
+
+def _prepare(data_path, test_size, seed):
+    X_train, X_test, y_train, y_test = split_interim(data_path, test_size, seed)
+
+    # Imputación (mediana) y Escalado (estandarización), ajustados solo en train
+    imputer = SimpleImputer(strategy="median")
+    X_train_imputed = imputer.fit_transform(X_train)
+    X_test_imputed = imputer.transform(X_test)
+
+    scaler = StandardScaler()
+    return {
+        "features_names": list(X_train.columns),
+        "imputer": imputer,
+        "scaler": scaler,
+        "X_train": scaler.fit_transform(X_train_imputed),
+        "X_test": scaler.transform(X_test_imputed),
+        "y_train": y_train.to_numpy(),
+        "y_test": y_test.to_numpy(),
+    }
+
+
+def load_matrices(data_path=config.INTERIM_DATA_PATH, cache_dir=config.TRAIN_CACHE_DIR,
+                  test_size=config.TRAIN_TEST_SIZE, seed=config.TRAIN_SEED):
+    """
+    Matrices de train/test escaladas + imputer/scaler/features ajustados.
+    Se leen de la caché si los datos no cambiaron (cache_dir=None la desactiva).
+    Retorna (matrices, fingerprint, from_cache).
+    """
+    fingerprint = data_fingerprint(data_path, test_size, seed)
+    cache_path = Path(cache_dir) / f"{fingerprint}.pkl" if cache_dir else None
+
+    if cache_path is not None and cache_path.exists():
+        with open(cache_path, "rb") as f:
+            return pickle.load(f), fingerprint, True
+
+    matrices = _prepare(data_path, test_size, seed)
+    if cache_path is not None:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        # Escritura atómica: otro entrenamiento en paralelo nunca lee un archivo a medias
+        tmp_path = cache_path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(matrices, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_path.replace(cache_path)
+    return matrices, fingerprint, False
+
+
+# --- BÚSQUEDA DE HIPERPARÁMETROS ---
+
+def _make_search(estimator, grid, n_jobs, halving):
+    common = {"cv": config.TRAIN_CV_FOLDS, "scoring": config.TRAIN_SCORING, "n_jobs": n_jobs}
+    if halving:
+        from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+        from sklearn.model_selection import HalvingGridSearchCV
+        return HalvingGridSearchCV(estimator, grid, factor=3, random_state=config.TRAIN_SEED, **common)
+    return GridSearchCV(estimator, grid, **common)
+
+
+def _fit_search(key, X, y, n_jobs, halving):
+    _, estimator, grid = SEARCHES[key]
+    began = time.perf_counter()
+    search = _make_search(estimator, grid, n_jobs, halving).fit(X, y)
+    return search, time.perf_counter() - began
+
+
+def run_searches(X_train, y_train, n_jobs=config.TRAIN_WORKERS, halving=False, keys=None):
+    """
+    Lanza las búsquedas a la vez (un hilo por búsqueda); el trabajo pesado de
+    cada una (candidato x fold) va al pool de procesos compartido de joblib, así
+    que los núcleos no quedan ociosos mientras la búsqueda más lenta termina.
+    Retorna {clave: (búsqueda ajustada, segundos)} en el orden de SEARCHES.
+    """
+    keys = list(keys or SEARCHES)
+    with ThreadPoolExecutor(max_workers=len(keys)) as pool:
+        futures = {key: pool.submit(_fit_search, key, X_train, y_train, n_jobs, halving) for key in keys}
+        return {key: futures[key].result() for key in keys}
+
+
+def evaluate(model, X_test, y_test):
+    """Métricas en el test set (mismo formato que metrics.json)."""
+    y_pred = model.predict(X_test)
+    return {
+        "accuracy": round(accuracy_score(y_test, y_pred), 4),
+        "recall": round(recall_score(y_test, y_pred), 4),
+        "f1_score": round(f1_score(y_test, y_pred), 4),
+    }
+
+
+# --- ARTEFACTOS ---
+
+def write_artifacts(models, matrices, metrics, output_dir=None):
+    """
+    Escribe los .pkl y metrics.json en las rutas de src.config, o todos juntos
+    en `output_dir` (mismos nombres de archivo) para revisarlos antes de publicarlos.
+    `models` es {nombre en la app: estimador}. Retorna la lista de rutas escritas.
+    Cada archivo se escribe completo en un temporal y luego todos se publican
+    seguidos con os.replace: el vigilante de src/registry.py (que sondea estas
+    mismas rutas) nunca lee un .pkl a medio escribir, y si ve la mezcla de un
+    instante, la huella vuelve a cambiar y recarga el conjunto nuevo.
+    """
+    def target(path):
+        path = Path(path)
+        if output_dir is None:
+            return path
+        return Path(output_dir) / path.name
+
+    outputs = {target(config.MODEL_FILES[name]): model for name, model in models.items()}
+    outputs[target(config.FEATURES_PATH)] = matrices["features_names"]
+    outputs[target(config.IMPUTER_PATH)] = matrices["imputer"]
+    outputs[target(config.SCALER_PATH)] = matrices["scaler"]
+
+    staged = {}
+    try:
+        for path, obj in outputs.items():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = staged[path] = path.with_name(f".{path.name}.tmp")
+            with open(tmp, "wb") as f:
+                pickle.dump(obj, f)
+
+        metrics_path = target(config.METRICS_PATH)
+        metrics_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = staged[metrics_path] = metrics_path.with_name(f".{metrics_path.name}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(metrics, f, indent=4)
+    except BaseException:
+        for tmp in staged.values():
+            tmp.unlink(missing_ok=True)
+        raise
+
+    # Publicación: todos los archivos ya están completos
+    for path, tmp in staged.items():
+        os.replace(tmp, path)
+    return list(staged)
+
+
+def train(data_path=config.INTERIM_DATA_PATH, n_jobs=config.TRAIN_WORKERS, halving=False,
+          cache_dir=config.TRAIN_CACHE_DIR, output_dir=None):
+    """Pipeline completo: matrices (cacheadas) -> 4 búsquedas concurrentes -> métricas -> artefactos."""
+    began = time.perf_counter()
+    matrices, fingerprint, from_cache = load_matrices(data_path, cache_dir)
+    prepared = time.perf_counter()
+    print(f"Matrices {'leídas de caché' if from_cache else 'calculadas'} ({fingerprint[:12]}): "
+          f"{matrices['X_train'].shape[0]} train / {matrices['X_test'].shape[0]} test, "
+          f"{len(matrices['features_names'])} variables ({prepared - began:.2f} s)")
+
+    searches = run_searches(matrices["X_train"], matrices["y_train"], n_jobs, halving)
+
+    models, metrics = {}, {}
+    print(f"\n{'Modelo':<24} {'Recall':>8} {'F1':>8} {'Accuracy':>9} {'Búsqueda s':>11}  Mejores parámetros")
+    for key, (search, seconds) in searches.items():
+        name = SEARCHES[key][0]
+        models[name] = search.best_estimator_
+        metrics[key] = evaluate(search.best_estimator_, matrices["X_test"], matrices["y_test"])
+        m = metrics[key]
+        print(f"{name:<24} {m['recall']:>8.2%} {m['f1_score']:>8.2%} {m['accuracy']:>9.2%} "
+              f"{seconds:>11.2f}  {search.best_params_}")
+
+    written = write_artifacts(models, matrices, metrics, output_dir)
+    print(f"\n{len(written)} artefactos escritos en {output_dir or config.PROJECT_DIR} "
+          f"({time.perf_counter() - began:.1f} s en total)")
+    if output_dir is None:
+        print("Recompila los evaluadores nativos con: python -m src.compiled build")
+    return models, metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entrena los 4 modelos y escribe los artefactos de src.config")
+    parser.add_argument("--data", default=str(config.INTERIM_DATA_PATH), help="CSV limpio (data/02_interim)")
+    parser.add_argument("--jobs", type=int, default=config.TRAIN_WORKERS, help="Núcleos (-1 = todos)")
+    parser.add_argument("--halving", action="store_true", help="Successive halving en lugar de GridSearchCV")
+    parser.add_argument("--no-cache", action="store_true", help="No leer ni escribir matrices cacheadas")
+    parser.add_argument("--output-dir", default=None, help="Escribe los artefactos aquí en vez de en src.config")
+    args = parser.parse_args()
+
+    train(args.data, args.jobs, args.halving, None if args.no_cache else config.TRAIN_CACHE_DIR, args.output_dir)
+
+
+if __name__ == "__main__":
+    main()
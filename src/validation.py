@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+from src import config
+from src.preprocessing_plan import as_columns
+
+# --- VALIDACIÓN DE ENTRADAS POR COLUMNAS ---
+# Valida lotes completos contra el esquema declarativo de src/config.py
+# (INPUT_SCHEMA): cada regla se evalúa sobre la columna entera con NumPy, no
+# fila a fila. Antes, una etiqueta no vista quedaba codificada en ceros por el
+# One-Hot y un texto en una columna numérica hacía fallar el lote entero.
+#
+#   - integer / number: conversión numérica, enteros sin decimales, [min, max].
+#     Los `missing_codes` se convierten en NaN y, si la columna es `nullable`,
+#     los NaN se imputan con la mediana (igual que en el entrenamiento).
+#   - category: el valor debe estar en `values`.
+#
+# Retorna las columnas limpias (numéricas ya en float64), la máscara de filas
+# válidas y los rechazos por (columna, motivo) para el reporte fila a fila.
+
+
+class ValidationResult:
+    """Resultado de validar un lote: columnas limpias, filas válidas y rechazos."""
+
+    def __init__(self, columns, n_rows, valid, issues):
+        self.columns = columns      # {columna: array} con las numéricas convertidas a float64
+        self.n_rows = n_rows
+        self.valid = valid          # Máscara booleana (n_rows,)
+        self.issues = issues        # [(columna, motivo, filas, valores)]
+
+    @property
+    def n_valid(self):
+        return int(np.count_nonzero(self.valid))
+
+    @property
+    def n_rejected(self):
+        return self.n_rows - self.n_valid
+
+    def valid_columns(self):
+        """Columnas solo con las filas válidas (sin copiar si no hay rechazos)."""
+        if self.n_valid == self.n_rows:
+            return self.columns
+        return {name: values[self.valid] for name, values in self.columns.items()}
+
+    def patient(self, i=0):
+        """Fila `i` de las columnas limpias como dict de escalares de Python (un paciente validado)."""
+        return {name: _json_value(values[i]) if values.dtype.kind == "O" else values[i].item()
+                for name, values in self.columns.items()}
+
+    def counts(self):
+        """Rechazos por (columna, motivo)."""
+        return {(column, reason): len(rows) for column, reason, rows, _ in self.issues}
+
+    def records(self, offset=0, limit=None):
+        """
+        Reporte fila a fila: una entrada por (fila, columna) con el valor y el motivo,
+        ordenado por fila. `offset` desplaza el número de fila (bloques de un archivo).
+        """
+        # Las filas de cada rechazo ya vienen ordenadas: bastan las primeras `limit` de cada uno
+        records = [
+            {"fila": int(row) + offset, "columna": column, "valor": _json_value(value), "motivo": reason}
+            for column, reason, rows, values in self.issues
+            for row, value in zip(rows[:limit], values[:limit])
+        ]
+        records.sort(key=lambda record: record["fila"])
+        return records if limit is None else records[:limit]
+
+
+def _json_value(value):
+    """Valor rechazado serializable (NaN/None -> None, escalares NumPy -> Python)."""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _to_numeric(values):
+    """Columna -> (float64, máscara de valores no numéricos)."""
+    if values.dtype.kind in "biuf":
+        return values.astype(np.float64, copy=False), np.zeros(len(values), dtype=bool)
+    try:
+        # Texto con números ("1.5"): NumPy convierte la columna entera
+        return values.astype(np.float64), np.zeros(len(values), dtype=bool)
+    except (TypeError, ValueError):
+        numeric = pd.to_numeric(pd.Series(values, copy=False), errors="coerce").to_numpy(dtype=np.float64)
+        return numeric, np.isnan(numeric) & ~pd.isna(values)
+
+
+def _check_numeric(values, rule):
+    """Reglas numéricas sobre una columna. Retorna (columna float64, [(motivo, máscara)])."""
+    numeric, not_numeric = _to_numeric(values)
+    problems = [("no numérico", not_numeric)]
+
+    missing_codes = rule.get("missing_codes")
+    if missing_codes:
+        numeric = np.where(np.isin(numeric, missing_codes), np.nan, numeric)
+
+    nan = np.isnan(numeric)
+    if not rule.get("nullable", False):
+        problems.append(("valor vacío", nan & ~not_numeric))
+
+    with np.errstate(invalid="ignore"):
+        if rule["kind"] == "integer":
+            problems.append(("no es entero", ~nan & (numeric != np.trunc(numeric))))
+        low, high = rule.get("min", -np.inf), rule.get("max", np.inf)
+        problems.append((f"fuera de rango [{low}, {high}]", (numeric < low) | (numeric > high)))
+    return numeric, problems
+
+
+def _check_category(values, rule):
+    """Categoría permitida. Retorna [(motivo, máscara)]."""
+    allowed = np.zeros(len(values), dtype=bool)
+    for value in rule["values"]:
+        allowed |= values == value
+    # Vacíos solo entre las filas no permitidas (pd.isna sobre object es lo más caro)
+    empty = np.zeros(len(values), dtype=bool)
+    rejected = ~allowed
+    if rejected.any():
+        empty[rejected] = pd.isna(values[rejected])
+    return [("valor vacío", empty), (f"categoría desconocida (válidas: {', '.join(rule['values'])})", ~allowed & ~empty)]
+
+
+def validate(data, schema=config.INPUT_SCHEMA):
+    """
+    Valida un lote (cualquier entrada de as_columns) contra el esquema.
+    Las columnas que no están en el esquema pasan sin cambios.
+    Retorna un ValidationResult.
+    """
+    columns, n_rows = as_columns(data)
+    columns = dict(columns)
+    valid = np.ones(n_rows, dtype=bool)
+    issues = []
+
+    for name, rule in schema.items():
+        values = columns.get(name)
+        if values is None:
+            issues.append((name, "columna ausente", np.arange(n_rows), [None] * n_rows))
+            valid[:] = False
+            continue
+
+        if rule["kind"] == "category":
+            problems = _check_category(values, rule)
+        else:
+            columns[name], problems = _check_numeric(values, rule)
+
+        for reason, mask in problems:
+            if mask.any():
+                rows = np.flatnonzero(mask)
+                issues.append((name, reason, rows, values[rows]))
+                valid &= ~mask
+
+    return ValidationResult(columns, n_rows, valid, issues)
@@ -1,6 +1,5 @@
 from src import config
-from src import preprocessing
-import pandas as pd
+from src.engine import InferenceEngine
 
 print("--- INICIANDO DEBUG ---")
 
@@ -8,27 +7,31 @@ print("--- INICIANDO DEBUG ---")
 print(f"Raíz del Proyecto: {config.PROJECT_DIR}")
 print(f"Ruta de Modelos: {config.MODELS_DIR}")
 
-# Probar Carga de Artefactos
+# Probar Carga de Artefactos (sin Streamlit)
 print("\n Intentando cargar artefactos...")
-artifacts = preprocessing.load_all_artifacts()
+try:
+    engine = InferenceEngine()
+except FileNotFoundError as e:
+    engine = None
+    print(f"Error: {e}")
 
-if artifacts:
+if engine:
     print("¡ÉXITO! Se cargaron los siguientes modelos:")
-    print(artifacts["models"].keys())
-    
+    print(engine.models.keys())
+
     # Probar Preprocesamiento con un dato falso
     print("\n Probando transformación de datos...")
 
-    # Creamos un DataFrame falso con columnas que sabemos que existen
-    # (Solo ponemos Age y Sex para ver si el reindex rellena el resto con 0)
-    fake_input = pd.DataFrame({
+    # Creamos una entrada falsa con columnas que sabemos que existen
+    # (Solo ponemos Age y Sex para ver si la alineación rellena el resto con 0)
+    fake_input = {
         'Age': [50],
         'Sex_M': [1],
         'Cholesterol': [200]
-    })
-    
+    }
+
     try:
-        resultado = preprocessing.preprocess_input(fake_input, artifacts)
+        resultado = engine.preprocess(fake_input)
         print(f"Transformación exitosa. Shape del array: {resultado.shape}")
         print("Valores (primeros 5):", resultado[0][:5])
     except Exception as e:
@@ -37,4 +40,4 @@ if artifacts:
 else:
     print("Falló la carga de artefactos.")
 
-print("\n--- FIN DEBUG ---")
\ No newline at end of file
+print("\n--- FIN DEBUG ---")
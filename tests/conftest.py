@@ -0,0 +1,16 @@
+import pandas as pd
+import pytest
+from src import config
+from src.engine import InferenceEngine
+
+
+@pytest.fixture(scope="session")
+def engine():
+    """Motor con los artefactos del repositorio (data/05_models y artefacts/)."""
+    return InferenceEngine.load_default()
+
+
+@pytest.fixture(scope="session")
+def patients():
+    """Pacientes crudos de data/02_interim (las 11 columnas requeridas)."""
+    return pd.read_csv(config.INTERIM_DATA_PATH)[config.REQUIRED_COLUMNS]
@@ -0,0 +1,57 @@
+import json
+import pytest
+from src import benchmark, config
+
+
+def _report(p50=100.0, p99=300.0, rows_per_sec=50_000.0):
+    return {
+        "latency": {"Consenso": {"p50_us": p50, "p99_us": p99, "mean_us": p50, "n": 10}},
+        "throughput": {"1000": {"seconds": 1000 / rows_per_sec, "rows_per_sec": rows_per_sec, "peak_mb": 1.0}},
+    }
+
+
+def test_compare_flags_regressions_past_the_threshold():
+    baseline = _report()
+    assert benchmark.compare(_report(p50=105, p99=310, rows_per_sec=48_000), baseline, threshold=0.10) == []
+
+    regressions = benchmark.compare(_report(p50=120, p99=400, rows_per_sec=40_000), baseline, threshold=0.10)
+    assert len(regressions) == 3
+    assert regressions[0].startswith("Latencia Consenso p50_us")
+    assert regressions[2].startswith("Throughput 1000 filas")
+
+    # Entradas que solo están en uno de los reportes no se comparan
+    assert benchmark.compare({"latency": {}, "throughput": {}}, baseline) == []
+
+
+def test_check_exits_with_an_error_on_regression(tmp_path, capsys):
+    baseline = tmp_path / "base.json"
+    baseline.write_text(json.dumps(_report()))
+    benchmark._check(_report(), baseline, config.BENCHMARK_THRESHOLD)
+    with pytest.raises(SystemExit) as exit_info:
+        benchmark._check(_report(rows_per_sec=1_000), baseline, config.BENCHMARK_THRESHOLD)
+    assert exit_info.value.code == 1
+    assert "REGRESIÓN: Throughput" in capsys.readouterr().out
+
+
+def test_synthetic_load_is_reproducible():
+    first, second = benchmark.synthetic_patients(500), benchmark.synthetic_patients(500)
+    assert list(first.columns) == config.REQUIRED_COLUMNS
+    assert first.equals(second)
+    assert not first.equals(benchmark.synthetic_patients(500, seed=config.BENCHMARK_SEED + 1))
+
+
+def test_measurements_have_the_report_shape(engine):
+    latency = benchmark.measure_latency(engine, 5)
+    assert set(latency) == set(engine.model_names) | {"Preprocesamiento", "Consenso"}
+    assert all(stats["n"] == 5 and 0 < stats["p50_us"] <= stats["p99_us"] for stats in latency.values())
+
+    throughput = benchmark.measure_throughput(engine, [2_000], repeats=1)
+    assert throughput["2000"]["rows_per_sec"] > 0 and throughput["2000"]["peak_mb"] > 0
+
+    scaling = benchmark.measure_scaling(engine, 2_000, workers=[1, 2], backend="thread", repeats=1)
+    assert set(scaling["workers"]) == {"1", "2"}
+    assert all(stats["speedup"] > 0 for stats in scaling["workers"].values())
+
+    # El reporte completo se serializa y se compara consigo mismo sin regresiones
+    report = {"latency": latency, "throughput": throughput}
+    assert benchmark.compare(json.loads(json.dumps(report)), report) == []
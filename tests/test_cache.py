@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src import cache
+from src.cache import PredictionCache, canonical_key
+from src.engine import InferenceEngine
+
+
+class _Clock:
+    """Reloj manual para cache.time.monotonic."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(cache, "time", clock)
+    return clock
+
+
+def test_canonical_key_normalizes_the_patient():
+    patient = {"Age": 54, "Sex": "M", "Cholesterol": np.nan, "Oldpeak": np.float32(1.5)}
+    same = {"Oldpeak": 1.5, "Cholesterol": None, "Sex": "M", "Age": 54.0}
+    assert canonical_key(patient, "v1") == canonical_key(same, "v1")
+    assert canonical_key(patient, "v1") != canonical_key(patient, "v2")
+    assert canonical_key(patient, "v1") != canonical_key(dict(patient, Age=55), "v1")
+
+
+def test_lru_evicts_the_least_recently_used(clock):
+    lru = PredictionCache(max_entries=2, ttl_seconds=60)
+    lru.put("a", 1)
+    lru.put("b", 2)
+    assert lru.get("a") == 1            # "a" pasa a ser el más reciente
+    lru.put("c", 3)
+    assert lru.get("b") is None
+    assert lru.get("a") == 1 and lru.get("c") == 3
+    stats = lru.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"], stats["evictions"]) == (2, 3, 1, 1)
+
+
+def test_entries_expire_after_the_ttl(clock):
+    ttl = PredictionCache(max_entries=10, ttl_seconds=60)
+    ttl.put("a", 1)
+    clock.now += 59
+    assert ttl.get("a") == 1
+    clock.now += 2
+    assert ttl.get("a") is None
+    stats = ttl.stats()
+    assert stats["expirations"] == 1 and stats["entries"] == 0 and stats["hit_rate"] == 0.5
+
+
+def test_repeated_patient_is_served_from_the_cache(engine, patients):
+    patient = patients.iloc[7].to_dict()
+    before = engine.cache.stats()
+    first = engine.predict_one(patient)
+    second = engine.predict_one(dict(patient))
+    after = engine.cache.stats()
+    assert after["hits"] - before["hits"] >= 1
+    assert first == second
+
+
+def test_batch_scores_duplicates_once(engine, patients):
+    head = patients.head(40)
+    batch = pd.concat([head, head.iloc[::-1], head], ignore_index=True)
+    before = engine.cache.stats()
+    result = engine.predict_many(batch)
+    after = engine.cache.stats()
+    assert after["batch_rows"] - before["batch_rows"] == 120
+    assert after["batch_duplicates"] - before["batch_duplicates"] >= 80
+    single = engine.predict_many(head)
+    np.testing.assert_array_equal(result["probability"][:40], single["probability"])
+    np.testing.assert_array_equal(result["probability"][40:80], single["probability"][::-1])
+
+
+def test_fingerprint_follows_artifact_content(tmp_path):
+    paths = [tmp_path / "a.pkl", tmp_path / "b.pkl"]
+    for path, content in zip(paths, (b"modelo", b"escalador")):
+        path.write_bytes(content)
+    before = InferenceEngine._fingerprint(paths)
+    assert InferenceEngine._fingerprint(paths) == before
+    paths[1].write_bytes(b"escalador reentrenado")
+    assert InferenceEngine._fingerprint(paths) != before
@@ -0,0 +1,129 @@
+import json
+import pickle
+import numpy as np
+import pandas as pd
+import pytest
+from src import compiled, config
+
+
+@pytest.fixture(scope="module")
+def sklearn_models():
+    """Estimadores originales de data/05_models."""
+    models = {}
+    for name, path in config.MODEL_FILES.items():
+        with open(path, "rb") as f:
+            models[name] = pickle.load(f)
+    return models
+
+
+@pytest.fixture(scope="module")
+def matrices(engine, patients):
+    rng = np.random.default_rng(0)
+    X = engine.plan.transform(patients)
+    return {"interim": X, "synthetic": rng.standard_normal((5_000, X.shape[1]))}
+
+
+@pytest.mark.parametrize("name", list(config.MODEL_FILES))
+@pytest.mark.parametrize("data", ["interim", "synthetic"])
+def test_compiled_matches_sklearn(sklearn_models, matrices, name, data):
+    model, X = sklearn_models[name], matrices[data]
+    labels, proba = compiled.compile_model(model).predict_scores(X)
+    np.testing.assert_array_equal(labels, model.predict(X))
+    np.testing.assert_allclose(proba, model.predict_proba(X)[:, 1], rtol=0, atol=1e-9)
+
+
+def test_saved_compiled_models_roundtrip(engine, sklearn_models, matrices, tmp_path):
+    models = {name: compiled.compile_model(model) for name, model in sklearn_models.items()}
+    compiled.save_compiled(models, engine.plan, "huella", tmp_path)
+    manifest = compiled.read_manifest(tmp_path, "huella")
+    X = matrices["interim"]
+    for name, filename in manifest["models"].items():
+        loaded = compiled.load_model(tmp_path / filename)
+        np.testing.assert_array_equal(loaded.predict_scores(X)[1], models[name].predict_scores(X)[1])
+        # Todos los arrays (también los derivados) apuntan al mmap de solo lectura
+        assert not any(value.flags.writeable for value in vars(loaded).values() if isinstance(value, np.ndarray))
+
+
+def test_bundle_stores_compiled_models(sklearn_models, matrices, tmp_path):
+    from src import bundle
+    from src.engine import InferenceEngine
+
+    bundle_engine = InferenceEngine(bundle_dir=bundle.export_bundle(bundles_dir=tmp_path, make_current=False))
+    X = matrices["interim"]
+    for name, model in sklearn_models.items():
+        evaluator = bundle_engine.models[name]
+        assert not any(value.flags.writeable for value in vars(evaluator).values() if isinstance(value, np.ndarray))
+        np.testing.assert_allclose(evaluator.predict_scores(X)[1], model.predict_proba(X)[:, 1], rtol=0, atol=1e-9)
+
+
+def test_engine_matches_sklearn(engine, sklearn_models, patients, matrices):
+    result = engine.predict_many(patients)
+    X = matrices["interim"]
+    for k, name in enumerate(engine.model_names):
+        np.testing.assert_array_equal(result["predictions"][:, k], sklearn_models[name].predict(X))
+        np.testing.assert_allclose(result["probabilities"][:, k], sklearn_models[name].predict_proba(X)[:, 1],
+                                   rtol=0, atol=1e-9)
+    votes = np.stack([m.predict(X) for m in sklearn_models.values()], axis=1).sum(axis=1)
+    np.testing.assert_array_equal(result["high_risk"], votes >= config.CONSENSUS_MIN_VOTES)
+
+
+def test_linear_svc_compiles(engine, matrices, tmp_path):
+    # La búsqueda de src/train.py puede elegir kernel lineal para el SVM
+    from sklearn.svm import SVC
+
+    data = pd.read_csv(config.INTERIM_DATA_PATH)
+    model = SVC(kernel="linear", probability=True, random_state=0).fit(matrices["interim"], data["HeartDisease"])
+    evaluator = compiled.compile_model(model)
+    assert isinstance(evaluator, compiled.CompiledLinearSVC)
+    for X in matrices.values():
+        labels, proba = evaluator.predict_scores(X)
+        np.testing.assert_array_equal(labels, model.predict(X))
+        np.testing.assert_allclose(proba, model.predict_proba(X)[:, 1], rtol=0, atol=1e-9)
+
+    compiled.save_compiled({"SVM": evaluator}, engine.plan, "huella", tmp_path)
+    loaded = compiled.load_model(tmp_path / compiled.read_manifest(tmp_path)["models"]["SVM"])
+    np.testing.assert_array_equal(loaded.predict_scores(X)[1], evaluator.predict_scores(X)[1])
+
+    # Explicación exacta en unidades de la función de decisión
+    from src.explain import Explainer
+
+    explainer = Explainer({"SVM": evaluator}, engine.features_names, background=None)
+    base, contributions = explainer.model_contributions("SVM", matrices["interim"])
+    np.testing.assert_allclose(base + contributions.sum(axis=1), evaluator.decision_function(matrices["interim"]),
+                               rtol=0, atol=1e-9)
+
+
+def test_stale_compiled_files_are_ignored(engine, sklearn_models, patients, tmp_path):
+    from src.engine import InferenceEngine
+
+    models = {name: compiled.compile_model(model) for name, model in sklearn_models.items()}
+    compiled.save_compiled(models, engine.plan, "otra-huella", tmp_path)
+    assert compiled.read_manifest(tmp_path, "otra-huella") is not None
+    assert compiled.read_manifest(tmp_path / "vacio") is None
+
+    # Los .pkl cambiaron desde el build: el motor vuelve a compilarlos desde los pickles
+    fresh = InferenceEngine(compiled_dir=tmp_path)
+    assert compiled.read_manifest(tmp_path, fresh.fingerprint) is None
+    assert fresh.compiled_files == {}
+    np.testing.assert_array_equal(fresh.predict_many(patients)["predictions"],
+                                  engine.predict_many(patients)["predictions"])
+
+    # Manifest de un formato anterior
+    manifest = json.loads((tmp_path / compiled._MANIFEST).read_text())
+    (tmp_path / compiled._MANIFEST).write_text(json.dumps(dict(manifest, format=1)))
+    assert compiled.read_manifest(tmp_path) is None
+
+    # Con la huella correcta se usan los compilados guardados
+    compiled.save_compiled(models, engine.plan, fresh.fingerprint, tmp_path)
+    assert set(InferenceEngine(compiled_dir=tmp_path).compiled_files) == set(sklearn_models)
+
+
+@pytest.mark.parametrize("name", list(config.MODEL_FILES))
+def test_single_row_matches_batch(sklearn_models, matrices, name):
+    evaluator = compiled.compile_model(sklearn_models[name])
+    X = matrices["interim"]
+    labels, proba = evaluator.predict_scores(X)
+    for i in (0, 17, len(X) - 1):
+        row_labels, row_proba = evaluator.predict_scores(X[i:i + 1])
+        assert row_labels[0] == labels[i]
+        assert row_proba[0] == pytest.approx(proba[i], abs=1e-12)
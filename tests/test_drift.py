@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src import config
+from src.drift import DriftMonitor
+from src.validation import validate
+
+
+@pytest.fixture
+def monitor():
+    return DriftMonitor.load_default()
+
+
+@pytest.fixture(scope="module")
+def raw():
+    return pd.read_csv(config.RAW_DATA_PATH)[config.REQUIRED_COLUMNS]
+
+
+def _observe_validated(monitor, frame):
+    # Mismo camino que el motor: el monitor ve las entradas ya validadas
+    check = validate(frame)
+    monitor.observe_columns(check.valid_columns(), check.n_valid)
+
+
+def test_recorded_zeros_are_reported_as_missing(monitor, raw):
+    _observe_validated(monitor, raw)
+    report = monitor.report()
+    cholesterol = report["missing_values"]["Cholesterol"]
+    assert cholesterol["rate"] == pytest.approx((raw["Cholesterol"] == 0).mean())
+    assert cholesterol["rate"] == pytest.approx(cholesterol["reference_rate"])
+    assert not cholesterol["alert"]
+
+
+def test_missing_rate_alert(monitor, raw):
+    shifted = raw.copy()
+    shifted.loc[: len(raw) // 2, "Cholesterol"] = 0
+    _observe_validated(monitor, shifted)
+    assert monitor.report()["missing_values"]["Cholesterol"]["alert"]
+
+
+def test_engine_feeds_the_monitor_after_validation(engine, raw, monitor):
+    engine.monitor = monitor
+    try:
+        check = validate(raw.head(300))
+        engine.predict_many(check.valid_columns())
+    finally:
+        engine.monitor = None
+    assert monitor.report()["missing_values"]["Cholesterol"]["rate"] == pytest.approx(
+        (raw["Cholesterol"].head(300) == 0).mean())
+
+
+def test_single_patient_path_matches_batch(raw):
+    one, many = DriftMonitor.load_default(), DriftMonitor.load_default()
+    check = validate(raw.head(200))
+    for i in range(check.n_rows):
+        one.observe_one(check.patient(i))
+    many.observe_columns(check.columns, check.n_rows)
+
+    single, batch = one.report(), many.report()
+    assert single["rows"] == batch["rows"] == 200
+    for column, entry in batch["columns"].items():
+        for key, value in entry.items():
+            if isinstance(value, float):
+                assert single["columns"][column][key] == pytest.approx(value, abs=1e-9), (column, key)
+            else:
+                assert single["columns"][column][key] == value
@@ -0,0 +1,152 @@
+import numpy as np
+import pytest
+from src import bundle, config
+from src.compiled import check_compact
+from src.ensemble import EnsembleScorer, invocation_counts, result_dtype, score_model
+from src.parallel import ParallelBatchExecutor
+from src.preprocessing_plan import as_columns
+
+
+@pytest.fixture(scope="module")
+def full(engine, patients):
+    return engine.predict_many(patients)
+
+
+def _assert_cascade_matches(result, full):
+    # Mismo consenso; los modelos evaluados dan la misma clase y probabilidad
+    # (el kernel del SVM sobre un subconjunto de filas puede variar en el último bit)
+    np.testing.assert_array_equal(result["high_risk"], full["high_risk"])
+    evaluated = result["predictions"] >= 0
+    np.testing.assert_array_equal(result["predictions"][evaluated], full["predictions"][evaluated])
+    np.testing.assert_allclose(result["probabilities"][evaluated], full["probabilities"][evaluated], rtol=0, atol=1e-12)
+    assert np.isnan(result["probabilities"][~evaluated]).all()
+
+
+def test_cascade_equals_full_consensus(engine, patients, full):
+    result = engine.predict_many(patients, cascade=True)
+    _assert_cascade_matches(result, full)
+
+    counts = invocation_counts(result, engine.model_names)
+    assert counts[config.ENSEMBLE_CASCADE_ORDER[0]] == len(patients)
+    assert counts[config.ENSEMBLE_CASCADE_ORDER[-1]] < len(patients)
+
+
+def test_cascade_on_synthetic_rows(engine):
+    rng = np.random.default_rng(1)
+    X = rng.standard_normal((20_000, len(engine.features_names)))
+    _assert_cascade_matches(engine.scorer.score_cascade(X), engine.scorer.score(X))
+
+
+def test_compact_mode_has_no_label_flips(engine, patients, full):
+    result = engine.predict_many(patients, compact=True)
+    assert result["probabilities"].dtype == np.float32
+    np.testing.assert_array_equal(result["predictions"], full["predictions"])
+    np.testing.assert_array_equal(result["high_risk"], full["high_risk"])
+    np.testing.assert_allclose(result["probabilities"], full["probabilities"], rtol=0, atol=1e-5)
+
+
+@pytest.fixture(scope="module", params=["thread", "process"])
+def executor(engine, request):
+    # "process" es el backend por defecto (BATCH_PARALLEL_BACKEND): workers con spawn y memoria compartida
+    executor = ParallelBatchExecutor(engine, max_workers=2, backend=request.param, task_rows=200)
+    yield executor
+    executor.close()
+
+
+@pytest.mark.parametrize("cascade", [False, True])
+@pytest.mark.parametrize("compact", [False, True])
+def test_parallel_executor_matches_serial(engine, patients, executor, cascade, compact):
+    result = executor.predict_many(patients, cascade=cascade, compact=compact)
+    report = executor.last_report
+    assert report["backend"] == executor.backend and report["cascade"] == cascade
+    assert report["speedup"] > 0.0 and 0.0 < report["utilization"] <= 1.0
+    assert report["speedup"] == pytest.approx(report["utilization"] * report["workers"])
+    serial = engine.predict_many(patients, cascade=cascade, compact=compact)
+    np.testing.assert_array_equal(result["predictions"], serial["predictions"])
+    np.testing.assert_array_equal(result["high_risk"], serial["high_risk"])
+    np.testing.assert_allclose(result["probabilities"], serial["probabilities"], rtol=0, atol=1e-6 if compact else 1e-12)
+
+
+class _Counting:
+    """Modelo sklearn envuelto que cuenta cuántas veces se evalúa."""
+
+    def __init__(self, model):
+        self.model, self.calls, self.rows = model, 0, 0
+
+    def __getattr__(self, name):
+        attribute = getattr(self.model, name)
+        if callable(attribute) and name in ("predict", "predict_proba", "decision_function"):
+            def counted(X, *args, **kwargs):
+                self.calls += 1
+                self.rows += X.shape[0]
+                return attribute(X, *args, **kwargs)
+            return counted
+        return attribute
+
+
+@pytest.fixture(scope="module")
+def sklearn_models():
+    return bundle.load_sources()["models"]
+
+
+def test_score_model_matches_sklearn(engine, patients, sklearn_models):
+    X = engine.plan.transform(patients)
+    for name, model in sklearn_models.items():
+        labels, proba = score_model(model, X)
+        np.testing.assert_array_equal(labels, model.predict(X), err_msg=name)
+        np.testing.assert_allclose(proba, model.predict_proba(X)[:, 1], rtol=0, atol=1e-12, err_msg=name)
+
+
+def test_single_pass_scorer_evaluates_each_model_once(engine, patients, sklearn_models):
+    X = engine.plan.transform(patients)
+    models = {name: _Counting(model) for name, model in sklearn_models.items()}
+    result = EnsembleScorer(models, engine.scorer.min_votes).score(X)
+    assert all(model.calls == 1 for model in models.values())
+
+    # Mismo consenso que el cálculo original: predict de cada modelo y conteo de votos
+    votes = sum(model.predict(X) for model in sklearn_models.values())
+    np.testing.assert_array_equal(result["votes"], votes)
+    np.testing.assert_array_equal(result["high_risk"], votes >= engine.scorer.min_votes)
+    probability = np.mean([model.predict_proba(X)[:, 1] for model in sklearn_models.values()], axis=0)
+    np.testing.assert_allclose(result["probability"], probability, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize("min_votes", [1, 2, 3, 4])
+def test_cascade_only_evaluates_open_rows(engine, patients, sklearn_models, min_votes):
+    X = engine.plan.transform(patients)
+    models = {name: _Counting(model) for name, model in sklearn_models.items()}
+    scorer = EnsembleScorer(models, min_votes)
+    result = scorer.score_cascade(X)
+    full = EnsembleScorer(sklearn_models, min_votes).score(X)
+    np.testing.assert_array_equal(result["high_risk"], full["high_risk"])
+
+    # Cada modelo corre a lo sumo una vez y solo sobre las filas que siguen abiertas
+    counts = invocation_counts(result, scorer.model_names)
+    assert all(model.calls <= 1 and model.rows == counts[name] for name, model in models.items())
+    rows = [counts[name] for name in scorer.cascade_order]
+    assert rows[0] == len(X) and rows == sorted(rows, reverse=True)
+    # Una fila sale cuando su consenso ya no puede cambiar
+    complete = (result["predictions"] >= 0).all(axis=1)
+    assert np.isnan(result["probability"][~complete]).all()
+    np.testing.assert_allclose(result["probability"][complete], full["probability"][complete], atol=1e-12)
+
+
+def test_compact_result_layout(engine):
+    full, compact = result_dtype(4), result_dtype(4, compact=True)
+    assert compact["probabilities"].base == np.float32 and compact["probability"] == np.float32
+    assert (full.itemsize, compact.itemsize) == (46, 26)
+    assert engine.scorer.empty(3, compact=True).dtype == compact
+
+
+def test_check_compact_reports_no_consensus_flips(engine):
+    report = check_compact(engine, rows=20_000)
+    assert report["processed"]["flips"]["Consenso"] == 0
+    assert report["synthetic"]["flips"]["Consenso"] == 0
+    assert report["synthetic"]["max_proba_diff"] < 1e-5
+    assert report["peak_mb"]["compact"] < report["peak_mb"]["float64"]
+
+
+def test_text_columns_share_one_object_per_category(patients):
+    columns, _ = as_columns(patients)
+    st_slope = columns["ST_Slope"]
+    assert len({id(value) for value in st_slope}) == patients["ST_Slope"].nunique()
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from src.compiled import CompiledLogistic, CompiledTrees
+
+
+def _assert_same(explanation, expected):
+    for name, values in expected.contributions.items():
+        np.testing.assert_allclose(explanation.contributions[name], values, rtol=0, atol=1e-9)
+    np.testing.assert_allclose(explanation.combined, expected.combined, rtol=0, atol=1e-9)
+
+
+@pytest.fixture(scope="module")
+def per_row(engine, patients):
+    """Explicación de cada paciente por separado (ruta de un paciente)."""
+    rows = [engine.explain_many(patients.iloc[[i]]) for i in range(200)]
+    return {name: np.concatenate([row.contributions[name] for row in rows]) for name in engine.model_names}
+
+
+def test_batch_without_duplicates_keeps_row_order(engine, patients, per_row):
+    batch = patients.head(200)
+    assert not batch.duplicated().any()
+    explanation = engine.explain_many(batch)
+    for name, values in per_row.items():
+        np.testing.assert_allclose(explanation.contributions[name], values, rtol=0, atol=1e-9)
+
+
+def test_batch_with_duplicates_expands_to_original_rows(engine, patients, per_row):
+    order = np.r_[np.arange(200), np.arange(199, -1, -1)]
+    explanation = engine.explain_many(patients.iloc[order])
+    for name, values in per_row.items():
+        np.testing.assert_allclose(explanation.contributions[name], values[order], rtol=0, atol=1e-9)
+
+
+def test_contributions_add_up_to_the_model_output(engine, patients):
+    X = engine.plan.transform(patients)
+    explanation = engine.explain_many(patients)
+    for name in engine.model_names:
+        model, total = engine.models[name], explanation.base[name] + explanation.contributions[name].sum(axis=1)
+        if isinstance(model, CompiledTrees):
+            np.testing.assert_allclose(total, model.predict_proba(X)[:, 1], rtol=0, atol=1e-9)
+        elif isinstance(model, CompiledLogistic):
+            np.testing.assert_allclose(total, X @ model.coef + model.intercept, rtol=0, atol=1e-9)
+
+
+def test_top_factors_follow_the_combined_weights(engine, patients):
+    explanation = engine.explain_many(patients.head(50))
+    order, signs = explanation.top_indices(3)
+    for i in range(50):
+        top = explanation.top(i, 3)
+        assert [factor for factor, _ in top] == [explanation.factors[j] for j in order[i]]
+        assert [1 if weight >= 0 else -1 for _, weight in top] == signs[i].tolist()
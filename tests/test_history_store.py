@@ -0,0 +1,42 @@
+import pytest
+from src.history_store import HistoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(tmp_path / "history.sqlite3")
+    for i in range(23):
+        patient = {"Age": 40 + i, "Sex": "M" if i % 2 else "F", "Cholesterol": 200.0}
+        store.append(patient, {"high_risk": i % 3 == 0, "probability": 0.5, "votes": 2, "models": {"a": {}, "b": {}}},
+                     timestamp=f"2024-01-01 00:00:{i:02d}")
+    yield store
+    store.close()
+
+
+def _pages(store, page_rows, **filters):
+    """Recorre todas las páginas encadenando el id del último registro de cada una."""
+    pages, before_id = [], None
+    while True:
+        records = store.page(before_id, page_rows=page_rows, **filters)
+        if not records:
+            return pages
+        pages.append([record["id"] for record in records])
+        before_id = records[-1]["id"]
+
+
+@pytest.mark.parametrize("filters", [{}, {"high_risk": True}, {"sex": "F"}, {"high_risk": False, "sex": "M"}])
+def test_pages_cover_the_filtered_history(store, filters):
+    pages = _pages(store, 5, **filters)
+    ids = [i for page in pages for i in page]
+    assert ids == sorted(ids, reverse=True)
+    assert len(ids) == len(set(ids)) == store.count(**filters)
+    assert all(len(page) == 5 for page in pages[:-1])
+    assert [row[0] for row in store.iter_rows(batch_rows=7, **filters)] == ids
+
+
+def test_new_records_do_not_shift_later_pages(store):
+    first = store.page(page_rows=5)
+    second = store.page(first[-1]["id"], page_rows=5)
+    store.append({"Age": 50, "Sex": "M"}, {"high_risk": True, "probability": 0.9, "votes": 2, "models": {"a": {}}})
+    assert store.page(first[-1]["id"], page_rows=5) == second
+    assert store.kpis()["total"] == 24
@@ -0,0 +1,101 @@
+import json
+import logging
+import time
+import pytest
+from src import instrumentation
+from src.instrumentation import LatencyHistogram, Telemetry, configure_json_logs, telemetry
+
+
+def test_histogram_quantiles_interpolate_within_buckets():
+    histogram = LatencyHistogram()
+    assert histogram.quantile(0.5) is None
+    for _ in range(100):
+        histogram.observe(0.003)         # Bucket (2.5 ms, 5 ms]
+    assert 0.0025 < histogram.quantile(0.5) <= 0.005
+    assert histogram.quantile(0.99) <= 0.005
+    histogram.observe(500)               # Fuera del último borde
+    assert histogram.counts[-1] == 1 and histogram.count == 101
+
+
+def test_snapshot_counters_and_throughput():
+    local = Telemetry()
+    for seconds in (0.001, 0.002, 0.004):
+        local.observe("predict", seconds, path="batch")
+    local.count("rows", 7_000, path="batch")
+    with local.timer("render", tab="history"):
+        pass
+
+    stages = {(s["stage"], tuple(s["labels"].items())): s for s in local.snapshot()}
+    predict = stages[("predict", (("path", "batch"),))]
+    assert predict["count"] == 3 and predict["mean_ms"] == pytest.approx(7 / 3)
+    assert predict["p50_ms"] <= predict["p95_ms"] <= predict["p99_ms"]
+    assert ("render", (("tab", "history"),)) in stages
+    assert local.counters() == [{"name": "rows", "labels": {"path": "batch"}, "value": 7_000}]
+    assert local.throughput()["batch"] == pytest.approx(1_000_000)
+
+    local.reset()
+    assert local.snapshot() == [] and local.counters() == []
+
+
+def test_disabled_telemetry_records_nothing():
+    local = Telemetry(enabled=False)
+    local.observe("predict", 0.1, path="batch")
+    local.count("rows", 10)
+    assert local.snapshot() == [] and local.counters() == []
+    assert local.start_export(interval=1) is None
+
+
+def test_prometheus_text_format():
+    local = Telemetry()
+    for seconds in (0.001, 0.003, 2.0):
+        local.observe("model", seconds, model='Random "Forest"', path="single")
+    local.observe("predict", 0.5, path="batch")
+    local.count("rows", 100, path="batch")
+    text = local.prometheus_text()
+
+    buckets = [line for line in text.splitlines()
+               if line.startswith("heart_disease_stage_seconds_bucket") and 'stage="model"' in line]
+    values = [int(line.rsplit(" ", 1)[1]) for line in buckets]
+    assert values == sorted(values) and values[-1] == 3
+    assert 'le="+Inf"' in buckets[-1]
+    assert 'model="Random \\"Forest\\""' in buckets[0]
+    assert 'heart_disease_stage_seconds_count{stage="model",model="Random \\"Forest\\"",path="single"} 3' in text
+    assert 'heart_disease_rows_total{path="batch"} 100' in text
+    assert 'heart_disease_rows_per_second{path="batch"} 200.0' in text
+
+
+def test_periodic_export_rewrites_the_file(tmp_path):
+    local = Telemetry()
+    path = tmp_path / "telemetry.prom"
+    assert local.start_export(path, interval=0.05) is local.start_export(path, interval=0.05)
+    local.count("rows", 5, path="file")
+    deadline = time.monotonic() + 10
+    while 'heart_disease_rows_total{path="file"} 5' not in (path.read_text() if path.exists() else ""):
+        assert time.monotonic() < deadline
+        time.sleep(0.02)
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_json_logs_one_line_per_stage(tmp_path):
+    path = tmp_path / "telemetry.jsonl"
+    handler = configure_json_logs(path)
+    level = instrumentation.logger.level
+    try:
+        Telemetry().observe("preprocess", 0.25, path="single")
+    finally:
+        instrumentation.logger.removeHandler(handler)
+        instrumentation.logger.setLevel(level)
+        handler.close()
+    event = json.loads(path.read_text().splitlines()[-1])
+    assert event["event"] == "stage" and event["stage"] == "preprocess"
+    assert event["seconds"] == 0.25 and event["path"] == "single" and event["level"] == "DEBUG"
+    assert not logging.getLogger("heart_disease.telemetry").handlers
+
+
+def test_engine_stages_are_timed(engine, patients):
+    engine.predict_many(patients.head(50))
+    engine.predict_one(patients.iloc[3].to_dict())
+    series = {(s["stage"], s["labels"].get("path")) for s in telemetry.snapshot()}
+    assert {("preprocess", "batch"), ("consensus", "batch"), ("predict", "batch"), ("predict", "single")} <= series
+    models = {s["labels"].get("model") for s in telemetry.snapshot() if s["stage"] == "model"}
+    assert set(engine.model_names) <= models
@@ -0,0 +1,147 @@
+import time
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+from src import config, jobs
+
+
+def _wait(manager, job_id, timeout=60):
+    """Espera a que el trabajo termine y retorna su estado final."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if job["status"] in jobs.FINISHED:
+            return job
+        time.sleep(0.05)
+    raise TimeoutError(job_id)
+
+
+@pytest.fixture
+def manager(engine, tmp_path):
+    manager = jobs.JobManager(engine, path=tmp_path / "jobs.sqlite3", jobs_dir=tmp_path, workers=1)
+    yield manager
+    manager.stop(timeout=10)
+
+
+@pytest.fixture
+def csv_file(tmp_path, patients):
+    path = tmp_path / "lote.csv"
+    patients.to_csv(path, index=False)
+    return path
+
+
+def test_job_lifecycle(manager, csv_file, patients):
+    job_id = manager.submit(csv_file, csv_file.name, owner="a", cascade=True, compact=True, explain=True)
+    assert manager.get(job_id)["status"] == jobs.QUEUED
+    manager.start()
+
+    job = _wait(manager, job_id)
+    assert job["status"] == jobs.DONE
+    assert job["progress"] == 1.0
+    results = manager.results(job_id)
+    try:
+        assert results.n_rows == len(patients)
+        assert results.cascade and results.compact
+        assert "Factor_1" in results.columns
+        assert len(results.read_page(0)) == config.BATCH_PAGE_ROWS
+    finally:
+        results.close()
+
+    # Descargas escritas por bloques en el directorio del trabajo, con el mismo contenido
+    exported = pd.read_csv(manager.export(job_id, "csv"))
+    assert len(exported) == len(patients) and "Factor_1" in exported.columns
+    assert pq.read_table(manager.export(job_id, "parquet")).num_rows == len(patients)
+    assert manager.export(job_id, "arrow").name == "results.arrow"
+    assert manager.export(job_id, "csv") == manager.export(job_id, "csv")
+
+
+def test_fair_scheduling(manager, csv_file):
+    # El dueño "a" encola tres lotes antes que "b": el de "b" corre segundo
+    first = [manager.submit(csv_file, csv_file.name, owner="a") for _ in range(3)]
+    other = manager.submit(csv_file, csv_file.name, owner="b")
+    manager.start()
+    for job_id in first + [other]:
+        _wait(manager, job_id)
+
+    order = [job["id"] for job in sorted(manager.list(), key=lambda job: job["started_at"])]
+    assert order.index(other) == 1
+
+
+def test_cancel_queued_and_running(manager, tmp_path, patients):
+    big = tmp_path / "grande.csv"
+    patients.sample(200_000, replace=True, random_state=0).to_csv(big, index=False)
+
+    running = manager.submit(big, big.name, owner="a")
+    queued = manager.submit(big, big.name, owner="a")
+    manager.cancel(queued)
+    assert manager.get(queued)["status"] == jobs.CANCELLED
+
+    manager.start()
+    while manager.get(running)["status"] == jobs.QUEUED:
+        time.sleep(0.01)
+    manager.cancel(running)
+    job = _wait(manager, running)
+    assert job["status"] == jobs.CANCELLED
+    assert job["rows"] < 200_000
+
+
+def test_interrupted_job_is_requeued(manager, csv_file, patients):
+    job_id = manager.submit(csv_file, csv_file.name, owner="a")
+    # Simula un proceso que murió con el trabajo en curso (latido viejo)
+    with manager._conn:
+        manager._conn.execute("UPDATE jobs SET status = 'running', heartbeat_at = 0, attempts = 1 WHERE id = ?",
+                              (job_id,))
+    manager.start()
+
+    job = _wait(manager, job_id)
+    assert job["status"] == jobs.DONE
+    assert job["attempts"] == 2
+
+
+def test_slow_job_keeps_its_heartbeat(manager, csv_file, monkeypatch):
+    # Un bloque más lento que el límite de latido no hace re-encolar un trabajo vivo
+    score_stream = jobs.streaming.score_stream
+
+    def slow_score_stream(*args, **kwargs):
+        time.sleep(1.5)
+        return score_stream(*args, **kwargs)
+
+    monkeypatch.setattr(jobs.streaming, "score_stream", slow_score_stream)
+    manager.heartbeat_seconds = 0.05
+    job_id = manager.submit(csv_file, csv_file.name, owner="a")
+    manager.start()
+    while manager.get(job_id)["status"] == jobs.QUEUED:
+        time.sleep(0.01)
+
+    time.sleep(0.8)
+    assert manager.recover(stale_seconds=0.5) == 0
+    assert manager.get(job_id)["status"] == jobs.RUNNING
+    job = _wait(manager, job_id)
+    assert job["status"] == jobs.DONE
+    assert job["attempts"] == 1
+
+
+@pytest.mark.parametrize("content", [
+    "Age,Sex,ChestPainType,RestingBP,Cholesterol,FastingBS,RestingECG,MaxHR,ExerciseAngina,Oldpeak,ST_Slope\n",
+    "Age,Sex,ChestPainType,RestingBP,Cholesterol,FastingBS,RestingECG,MaxHR,ExerciseAngina,Oldpeak,ST_Slope\n"
+    "500,X,ASY,140,289,0,Normal,172,N,0,Up\n"
+    "abc,M,ATA,140,289,0,Normal,172,N,0,Up\n",
+], ids=["solo-encabezado", "todas-rechazadas"])
+def test_job_without_scored_rows(manager, tmp_path, content):
+    # Sin filas puntuadas el trabajo termina y sus resultados se pueden abrir (0 filas, mismo esquema)
+    path = tmp_path / "vacio.csv"
+    path.write_text(content)
+    job_id = manager.submit(path, path.name, owner="a", explain=True)
+    manager.start()
+
+    assert _wait(manager, job_id)["status"] == jobs.DONE
+    results = manager.results(job_id)
+    try:
+        assert results.n_rows == 0
+        assert results.n_rejected == content.count("\n") - 1
+        page = results.read_page(0)
+        assert len(page) == 0
+        assert {"Consenso_Final", "Factor_1"} <= set(page.columns)
+        assert manager.export(job_id, "csv").stat().st_size > 0
+    finally:
+        results.close()
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+
+def _sklearn_pipeline(engine, data):
+    """Cadena original del entrenamiento: get_dummies -> reindex -> SimpleImputer -> StandardScaler."""
+    encoded = pd.get_dummies(data).reindex(columns=engine.features_names, fill_value=0)
+    return engine.scaler.transform(engine.imputer.transform(encoded.astype(np.float64)))
+
+
+def test_plan_is_bit_identical_to_sklearn(engine, patients):
+    np.testing.assert_array_equal(engine.plan.transform(patients), _sklearn_pipeline(engine, patients))
+
+
+@pytest.mark.parametrize("row", [0, 17, 500])
+def test_single_patient_matches_batch(engine, patients, row):
+    patient = {k: (None if pd.isna(v) else v) for k, v in patients.iloc[row].items()}
+    np.testing.assert_array_equal(engine.plan.transform(patient)[0], engine.plan.transform(patients)[row])
+
+
+def test_unseen_category_and_missing_column_encode_as_zero(engine, patients):
+    data = patients.head(3).copy()
+    data["ChestPainType"] = "XYZ"
+    reference = _sklearn_pipeline(engine, data.drop(columns=["RestingECG"]))
+    np.testing.assert_array_equal(engine.plan.transform(data.drop(columns=["RestingECG"])), reference)
+
+
+def test_compact_is_float64_rounded_once(engine, patients):
+    X64 = engine.plan.transform(patients)
+    X32 = engine.plan.transform(patients, dtype=np.float32)
+    assert X32.dtype == np.float32
+    np.testing.assert_array_equal(X32, X64.astype(np.float32))
+
+
+@pytest.mark.parametrize("form", ["registros", "columnas", "arrow", "categorical"])
+def test_every_input_form_gives_the_same_matrix(engine, patients, form):
+    data = patients.head(60)
+    if form == "registros":
+        data = [{k: (None if pd.isna(v) else v) for k, v in row.items()} for row in data.to_dict("records")]
+    elif form == "columnas":
+        data = {col: data[col].to_numpy(dtype=object if data[col].dtype.kind not in "if" else None)
+                for col in data.columns}
+    elif form == "arrow":
+        data = pa.Table.from_pandas(data, preserve_index=False)
+    else:
+        data = data.astype({col: "category" for col in ("Sex", "ChestPainType", "ST_Slope")})
+    np.testing.assert_array_equal(engine.plan.transform(data), engine.plan.transform(patients.head(60)))
+
+
+def test_missing_values_are_imputed_like_sklearn(engine, patients):
+    data = patients.head(5).copy()
+    data.loc[[0, 3], "Cholesterol"] = np.nan
+    data.loc[1, "RestingBP"] = np.nan
+    np.testing.assert_array_equal(engine.plan.transform(data), _sklearn_pipeline(engine, data))
+    patient = dict(patients.iloc[0], Cholesterol=None)
+    np.testing.assert_array_equal(engine.plan.transform(patient)[0], engine.plan.transform(data)[0])
+
+
+def test_out_buffer_and_compact_blocks(engine, patients):
+    many = pd.concat([patients] * 10, ignore_index=True)       # Más filas que un bloque compacto
+    buffer = np.empty((len(many) + 5, engine.plan.n_features))
+    X = engine.plan.transform(many, out=buffer)
+    assert np.shares_memory(X, buffer) and X.shape == (len(many), engine.plan.n_features)
+    np.testing.assert_array_equal(engine.plan.transform(many, dtype=np.float32), X.astype(np.float32))
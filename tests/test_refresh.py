@@ -0,0 +1,77 @@
+import copy
+import numpy as np
+import pandas as pd
+import pytest
+from src import bundle, config, refresh, train
+
+
+@pytest.fixture(scope="module")
+def sources():
+    return bundle.load_sources()
+
+
+@pytest.fixture(scope="module")
+def labeled():
+    """Casos "nuevos" con diagnóstico, en el formato de data/02_interim."""
+    return pd.read_csv(config.INTERIM_DATA_PATH).sample(600, replace=True, random_state=1).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("n", [1, 2, 7, 10])
+def test_median_from_counts_matches_numpy(n):
+    values = np.random.default_rng(n).integers(0, 5, n).astype(float)
+    uniques, counts = np.unique(values, return_counts=True)
+    assert refresh._median_from_counts(dict(zip(uniques.tolist(), counts.tolist()))) == np.median(values)
+
+
+def test_rescaled_models_keep_their_predictions(sources):
+    # z = a·z' + c: los modelos re-expresados dan lo mismo sobre z' que los originales sobre z
+    models = copy.deepcopy(sources["models"])
+    _, X_test, _, _ = train.split_interim()
+    Z = sources["scaler"].transform(sources["imputer"].transform(X_test))
+    rng = np.random.default_rng(0)
+    # Cambios de escala del orden de los de un lote de cientos de filas
+    a, c = rng.uniform(0.95, 1.05, Z.shape[1]), rng.normal(0, 0.05, Z.shape[1])
+    state = {"precision": np.eye(Z.shape[1] + 1)}
+    refresh._rescale_models(models, state, a, c)
+
+    for name, model in models.items():
+        before = sources["models"][name].predict(Z)
+        after = model.predict((Z - c) / a)
+        if name == "Support Vector Machine":
+            # Vectores soporte: exacto en la media, aproximado en la escala
+            assert np.mean(before == after) > 0.97, name
+        else:
+            # Árboles: salvo el redondeo a float32 de los umbrales
+            assert np.mean(before == after) > 0.99, name
+
+
+def test_refresh_absorbs_batches_and_chains(tmp_path, labeled):
+    batches = [labeled.iloc[i:i + 200] for i in range(0, 600, 200)]
+    first_path, first = refresh.refresh(batches, bundles_dir=tmp_path, version="v1")
+    X_train, _, _, _ = train.split_interim()
+    assert (first["new_rows"], first["batches"], first["rows_seen"]) == (600, 3, len(X_train) + 600)
+    assert first["new_trees"] > 0
+    assert set(first["prequential_metrics"]) == set(bundle.read_manifest(first_path)["metrics"])
+
+    # Imputer y scaler: los mismos estadísticos que un ajuste sobre entrenamiento + casos nuevos
+    artifacts = bundle.load_bundle(first_path)
+    new = pd.DataFrame(refresh._encode(labeled, list(X_train.columns)), columns=X_train.columns)
+    combined = pd.concat([X_train.astype(float), new], ignore_index=True)
+    np.testing.assert_allclose(artifacts["imputer"].statistics_, combined.median().to_numpy())
+    # Cada lote se imputa con la mediana de ese momento: exacto solo en las columnas sin faltantes
+    imputed = combined.fillna(combined.median())
+    complete = combined.notna().all().to_numpy()
+    for fitted, expected in ((artifacts["scaler"].mean_, imputed.mean().to_numpy()),
+                             (artifacts["scaler"].scale_, imputed.std(ddof=0).to_numpy())):
+        np.testing.assert_allclose(fitted[complete], expected[complete])
+        np.testing.assert_allclose(fitted[~complete], expected[~complete], rtol=1e-3)
+    assert len(artifacts["models"]["Random Forest"].estimators_) <= config.REFRESH_RF_MAX_TREES
+
+    # Un segundo refresco parte del bundle publicado y de su estado acumulado
+    second_path, second = refresh.refresh([labeled.head(100)], bundles_dir=tmp_path, version="v2")
+    assert second["parent"] == artifacts["version"] == "v1"
+    assert second["rows_seen"] == first["rows_seen"] + 100
+    assert bundle.current_bundle(tmp_path) == second_path
+
+    with pytest.raises(ValueError):
+        refresh.refresh([], bundles_dir=tmp_path)
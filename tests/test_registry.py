@@ -0,0 +1,63 @@
+import gc
+import numpy as np
+import pytest
+from src import bundle, registry
+
+
+@pytest.fixture(scope="module")
+def bundles_dir(tmp_path_factory):
+    path = tmp_path_factory.mktemp("bundles")
+    for version in ("a", "b", "c"):
+        bundle.export_bundle(bundles_dir=path, version=version, make_current=False)
+    return path
+
+
+def test_rollback_walks_back_the_promotions(bundles_dir):
+    for version in ("a", "b", "c"):
+        registry.promote(version, bundles_dir)
+
+    # Rollbacks seguidos retroceden por la pila (no alternan entre c y b)
+    assert registry.rollback(bundles_dir)["version"] == "b"
+    assert registry.rollback(bundles_dir)["version"] == "a"
+    with pytest.raises(ValueError):
+        registry.rollback(bundles_dir)
+
+    # Una promoción nueva vuelve a apilar sobre la versión restaurada
+    registry.promote("c", bundles_dir)
+    assert registry.production_stack(bundles_dir) == ["a", "c"]
+    assert registry.rollback(bundles_dir)["version"] == "a"
+    assert bundle.current_bundle(bundles_dir).name == "a"
+
+
+class _Serving:
+    """Motor servido mínimo: `current` cambia de versión como en ServingEngine."""
+
+    def __init__(self, engine):
+        self.current = engine
+
+    def __getattr__(self, name):
+        return getattr(self.current, name)
+
+
+def test_batches_keep_the_pool_of_their_version(engine, patients):
+    from src.engine import InferenceEngine
+    from src.parallel import ParallelBatchExecutor
+
+    newer = InferenceEngine(compiled_dir=None)
+    newer.fingerprint = "nueva"
+    serving = _Serving(engine)
+    executor = ParallelBatchExecutor(serving, max_workers=1, backend="process", task_rows=200)
+    try:
+        pinned = executor.pinned()
+        serving.current = newer
+        executor.predict_many(patients)
+        # La copia fijada (un archivo en curso) conserva el pool de su versión
+        assert set(executor._pools._pools) == {engine.fingerprint, "nueva"}
+        result = pinned.predict_many(patients, cascade=True)
+        np.testing.assert_array_equal(result["high_risk"], engine.predict_many(patients)["high_risk"])
+
+        del pinned
+        gc.collect()
+        assert set(executor._pools._pools) == {"nueva"}
+    finally:
+        executor.close()
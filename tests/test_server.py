@@ -0,0 +1,78 @@
+import asyncio
+import json
+import pytest
+from src import config
+from api.server import ScoringServer
+
+
+def _request(engine, raw):
+    """Envía bytes crudos a un servidor en un puerto libre y retorna (estado, cuerpo) de la respuesta."""
+
+    async def exchange():
+        server = ScoringServer(engine, max_wait_ms=1)
+        server.batcher.start()
+        listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+        try:
+            reader, writer = await asyncio.open_connection(*listener.sockets[0].getsockname()[:2])
+            writer.write(raw)
+            await writer.drain()
+            response = await asyncio.wait_for(reader.read(), 30)
+            writer.close()
+        finally:
+            listener.close()
+            await listener.wait_closed()
+            await server.batcher.stop()
+        head, _, body = response.partition(b"\r\n\r\n")
+        status = int(head.split(b" ", 2)[1])
+        return status, json.loads(body) if b"application/json" in head else body.decode("utf-8")
+
+    return asyncio.run(exchange())
+
+
+def _post(engine, path, payload):
+    body = json.dumps(payload).encode("utf-8")
+    return _request(engine, f"POST {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+                            .encode("latin-1") + body)
+
+
+def _get(engine, path):
+    return _request(engine, f"GET {path} HTTP/1.1\r\nConnection: close\r\n\r\n".encode("latin-1"))
+
+
+def test_predict_routes(engine, patients):
+    patient = patients.iloc[0].to_dict()
+    status, single = _post(engine, "/predict", patient)
+    assert status == 200
+    assert set(single["models"]) == set(engine.model_names)
+    assert 0 <= single["probability"] <= 1
+
+    # En un lote solo se puntúan los válidos: null en la posición del rechazado
+    status, batch = _post(engine, "/predict/batch", [patient, dict(patient, Age=500)])
+    assert status == 200
+    assert batch["results"][0]["probability"] == pytest.approx(single["probability"])
+    assert batch["results"][1] is None
+    assert [r["fila"] for r in batch["rejected"]] == [1]
+
+    status, error = _post(engine, "/predict", dict(patient, Age=500))
+    assert status == 422 and error["details"]
+
+
+def test_get_routes(engine):
+    status, health = _get(engine, "/health")
+    assert status == 200 and health["status"] == "ok"
+    status, metrics = _get(engine, "/metrics")
+    assert status == 200 and isinstance(metrics, str)
+
+
+@pytest.mark.parametrize("raw, status", [
+    (b"GET /nada HTTP/1.1\r\nConnection: close\r\n\r\n", 404),
+    (b"GET /predict HTTP/1.1\r\nConnection: close\r\n\r\n", 405),
+    (b"POST /predict HTTP/1.1\r\nContent-Length: 3\r\nConnection: close\r\n\r\n{x}", 400),
+    (b"POST /predict/batch HTTP/1.1\r\nContent-Length: 2\r\nConnection: close\r\n\r\n{}", 400),
+    (b"basura\r\n\r\n", 400),
+    (b"POST /predict HTTP/1.1\r\nContent-Length: diez\r\n\r\n", 400),
+    (b"POST /predict HTTP/1.1\r\nContent-Length: -5\r\n\r\n", 400),
+    (f"POST /predict HTTP/1.1\r\nContent-Length: {config.API_MAX_BODY_BYTES + 1}\r\n\r\n".encode("latin-1"), 413),
+], ids=["ruta", "metodo", "json", "lote-no-lista", "linea", "largo-no-entero", "largo-negativo", "largo-excesivo"])
+def test_bad_requests(engine, raw, status):
+    assert _request(engine, raw)[0] == status
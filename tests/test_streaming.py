@@ -0,0 +1,163 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc
+import pyarrow.parquet as pq
+import pytest
+from src import config, streaming
+
+
+@pytest.fixture
+def csv_file(tmp_path, patients):
+    path = tmp_path / "lote.csv"
+    patients.to_csv(path, index=False)
+    return path
+
+
+def test_chunked_csv_matches_whole_batch(engine, patients, csv_file):
+    # Bloques de un tamaño que no divide el archivo: mismo resultado que puntuarlo entero
+    fractions = []
+    results = streaming.score_stream(engine, csv_file, "csv", chunk_rows=137, page_rows=100,
+                                     progress=lambda fraction, n_rows: fractions.append(fraction))
+    try:
+        expected = engine.predict_many(patients)
+        assert results.n_rows == len(patients)
+        assert results.n_high_risk == int(expected["high_risk"].sum())
+        assert len(results.batch_starts) == -(-len(patients) // 137)
+
+        pages = [results.read_page(page) for page in range(results.n_pages)]
+        assert [len(page) for page in pages[:-1]] == [100] * (results.n_pages - 1)
+        scored = pd.concat(pages)
+        assert scored.index.tolist() == list(range(len(patients)))
+        np.testing.assert_allclose(scored["Probabilidad_Promedio"], expected["probability"], rtol=1e-6)
+        assert (scored["Consenso_Final"] == "ALTO RIESGO").tolist() == expected["high_risk"].tolist()
+        assert scored["Age"].tolist() == patients["Age"].tolist()
+    finally:
+        results.close()
+    assert fractions == sorted(fractions) and fractions[-1] == 1.0
+
+
+def test_results_spill_to_disk_and_download(engine, patients, csv_file, tmp_path):
+    results = streaming.StreamedResults(spool_max_bytes=1024)
+    try:
+        for chunk, _ in streaming.iter_chunks(str(csv_file), "csv", chunk_rows=300):
+            results.append(streaming.results_batch(chunk, engine.predict_many(chunk), engine.model_names))
+        results.finish()
+        # Superado el límite el archivo temporal pasa a disco, sin cambiar la lectura
+        assert results.file._rolled
+        results.write(tmp_path / "salida.csv", "csv")
+    finally:
+        results.close()
+    written = pd.read_csv(tmp_path / "salida.csv")
+    assert len(written) == len(patients)
+    assert written["Age"].dtype == np.int64          # Enteros sin ".0"
+    assert written["Consenso_Final"].isin(["Bajo Riesgo", "ALTO RIESGO"]).all()
+
+
+def test_rejected_rows_keep_their_file_position(engine, patients, tmp_path):
+    data = patients.head(250).astype(object)
+    data.loc[10, "Age"] = 500
+    data.loc[180, "Sex"] = "X"
+    data.loc[181, "RestingBP"] = "abc"
+    path = tmp_path / "con_errores.csv"
+    data.to_csv(path, index=False)
+
+    results = streaming.score_stream(engine, path, "csv", chunk_rows=100)
+    try:
+        assert results.n_rows == 247 and results.n_rejected == 3
+        report = results.rejection_report()
+        assert report["fila"].tolist() == [10, 180, 181]
+        assert report["columna"].tolist() == ["Age", "Sex", "RestingBP"]
+        assert sum(results.rejection_counts.values()) == 3
+    finally:
+        results.close()
+
+
+def test_score_file_writes_rejections(engine, patients, tmp_path):
+    data = patients.head(50).astype(object)
+    data.loc[3, "Age"] = "abc"
+    source = tmp_path / "lote.csv"
+    data.to_csv(source, index=False)
+
+    summary = streaming.score_file(engine, source, tmp_path / "salida.csv", chunk_rows=20,
+                                   rejections_path=tmp_path / "rechazos.csv")
+    assert summary["rows"] == 49 and summary["rejected"] == 1
+    assert len(pd.read_csv(tmp_path / "salida.csv")) == 49
+    assert pd.read_csv(tmp_path / "rechazos.csv")["fila"].tolist() == [3]
+
+
+def test_missing_required_column_is_reported(engine, patients, tmp_path):
+    path = tmp_path / "incompleto.csv"
+    patients.drop(columns="ST_Slope").head(20).to_csv(path, index=False)
+    results = streaming.score_stream(engine, path, "csv")
+    try:
+        assert results.n_rows == 0 and results.n_rejected == 20
+        assert set(results.rejection_report()["columna"]) == {"ST_Slope"}
+        assert results.read_page(0).columns.tolist() == results.columns
+    finally:
+        results.close()
+
+
+def _write_arrow(table, path, stream=False):
+    with pa.OSFile(str(path), "wb") as sink:
+        writer = (pa.ipc.new_stream if stream else pa.ipc.new_file)(sink, table.schema)
+        writer.write_table(table, max_chunksize=400)
+        writer.close()
+
+
+@pytest.mark.parametrize("fmt, name", [("parquet", "lote.parquet"), ("arrow", "lote.arrow"), ("arrow", "lote.ipc")],
+                         ids=["parquet", "arrow-archivo", "arrow-stream"])
+def test_columnar_inputs_match_whole_batch(engine, patients, tmp_path, fmt, name):
+    # Extracto con columnas de más: solo se leen las 11 requeridas
+    extract = patients.assign(Notas="texto libre", HeartDisease=1)
+    table = pa.Table.from_pandas(extract, preserve_index=False)
+    path = tmp_path / name
+    if fmt == "parquet":
+        pq.write_table(table, path, row_group_size=300)
+    else:
+        _write_arrow(table, path, stream=name.endswith(".ipc"))
+    assert streaming.detect_format(path) == fmt
+
+    chunks = list(streaming.iter_chunks(str(path), fmt, chunk_rows=250))
+    assert all(chunk.schema.names == config.REQUIRED_COLUMNS for chunk, _ in chunks)
+    assert sum(chunk.num_rows for chunk, _ in chunks) == len(patients)
+    assert max(chunk.num_rows for chunk, _ in chunks) <= 250
+
+    expected = engine.predict_many(patients)
+    with open(path, "rb") as source:             # Archivo abierto, como el UploadedFile de Streamlit
+        results = streaming.score_stream(engine, source, fmt, chunk_rows=250)
+    try:
+        assert results.n_rows == len(patients) and "Notas" not in results.columns
+        scored = pa.Table.from_batches(list(results.iter_batches()))
+        np.testing.assert_allclose(scored.column("Probabilidad_Promedio").to_numpy(), expected["probability"],
+                                   rtol=1e-6)
+    finally:
+        results.close()
+
+
+def test_output_formats_round_trip(engine, patients, csv_file, tmp_path):
+    results = streaming.score_stream(engine, csv_file, "csv", chunk_rows=300, explain=True)
+    try:
+        for name in ("salida.parquet", "salida.arrow", "salida.csv"):
+            results.write(tmp_path / name, streaming.detect_format(name))
+        schema = results.schema
+    finally:
+        results.close()
+
+    parquet = pq.read_table(tmp_path / "salida.parquet")
+    arrow = pa.ipc.open_file(pa.memory_map(str(tmp_path / "salida.arrow"))).read_all()
+    # Tipos compactos conservados: votos int8, probabilidades float32, consenso y factores categóricos
+    assert parquet.schema.equals(schema) and arrow.schema.equals(schema)
+    assert schema.field("Votos_Positivos").type == pa.int8()
+    assert schema.field("Probabilidad_Promedio").type == pa.float32()
+    assert pa.types.is_dictionary(schema.field("Consenso_Final").type)
+    assert pa.types.is_dictionary(schema.field("Factor_1").type)
+    assert parquet.equals(arrow)
+    csv = pd.read_csv(tmp_path / "salida.csv")
+    assert csv["Consenso_Final"].tolist() == arrow.column("Consenso_Final").to_pylist()
+    assert len(csv) == len(patients)
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError, match="Formato no soportado"):
+        streaming.detect_format("lote.xlsx")
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+from src import config
+from src.synthetic import SyntheticPatientGenerator
+
+
+@pytest.fixture(scope="module")
+def raw():
+    return pd.read_csv(config.RAW_DATA_PATH)
+
+
+@pytest.fixture(scope="module")
+def generator(raw):
+    return SyntheticPatientGenerator.fit(raw)
+
+
+def test_same_seed_same_patients(generator):
+    first, second = generator.sample(5_000, seed=3), generator.sample(5_000, seed=3)
+    assert all(np.array_equal(first[column], second[column]) for column in generator.columns)
+    other = generator.sample(5_000, seed=4)
+    assert not np.array_equal(first["Age"], other["Age"])
+
+
+def test_marginals_and_correlations_follow_the_raw_data(generator, raw):
+    sample = generator.sample_frame(200_000, seed=0)
+    assert list(sample.columns) == list(raw.columns)
+
+    for column in raw.columns:
+        # Solo valores vistos en los datos reales, con frecuencias parecidas
+        assert set(sample[column].unique()) <= set(raw[column].unique())
+        real = raw[column].value_counts(normalize=True)
+        simulated = sample[column].value_counts(normalize=True).reindex(real.index, fill_value=0)
+        assert np.abs(real - simulated).max() < 0.02, column
+
+    # Dependencias clave: correlación de rangos cercana a la real
+    for a, b in [("Age", "MaxHR"), ("Oldpeak", "HeartDisease"), ("MaxHR", "HeartDisease")]:
+        real = raw[[a, b]].corr(method="spearman").iloc[0, 1]
+        simulated = sample[[a, b]].corr(method="spearman").iloc[0, 1]
+        assert abs(real - simulated) < 0.05, (a, b)
+    rate = sample.groupby("ST_Slope", observed=True)["HeartDisease"].mean()
+    assert rate["Up"] < rate["Flat"]
+
+
+@pytest.mark.parametrize("name", ["pacientes.csv", "pacientes.parquet"])
+def test_write_in_chunks(generator, tmp_path, name):
+    path = generator.write(tmp_path / name, 2_500, seed=7, chunk_rows=1_000)
+    written = pq.read_table(path).to_pandas() if path.suffix == ".parquet" else pd.read_csv(path)
+    assert len(written) == 2_500
+    assert list(written.columns) == generator.columns
+    assert generator.write(tmp_path / ("otra" + path.suffix), 2_500, seed=7, chunk_rows=1_000).read_bytes() \
+        == path.read_bytes()
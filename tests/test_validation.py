@@ -0,0 +1,83 @@
+import numpy as np
+from src import validation
+
+
+def test_training_data_is_valid(patients):
+    check = validation.validate(patients)
+    assert check.n_rejected == 0
+    assert check.issues == []
+
+
+def test_rejections_are_reported_per_row_and_column(patients):
+    data = patients.head(6).astype({"Age": object, "Oldpeak": object, "MaxHR": object}).copy()
+    data.loc[0, "Age"] = "abc"           # no numérico
+    data.loc[1, "Age"] = 500             # fuera de rango
+    data.loc[2, "ChestPainType"] = "XYZ" # categoría desconocida
+    data.loc[3, "Oldpeak"] = None        # vacío en una columna no nullable
+    data.loc[4, "MaxHR"] = 150.5         # no es entero
+
+    check = validation.validate(data)
+    np.testing.assert_array_equal(check.valid, [False, False, False, False, False, True])
+    reasons = {(record["fila"], record["columna"]): record["motivo"] for record in check.records()}
+    assert reasons[0, "Age"] == "no numérico"
+    assert reasons[1, "Age"].startswith("fuera de rango")
+    assert reasons[2, "ChestPainType"].startswith("categoría desconocida")
+    assert reasons[3, "Oldpeak"] == "valor vacío"
+    assert reasons[4, "MaxHR"] == "no es entero"
+    assert check.records(offset=100)[0]["fila"] == 100
+
+
+def test_missing_codes_become_nan(patients):
+    data = patients.head(2).copy()
+    data.loc[0, "Cholesterol"] = 0
+    check = validation.validate(data)
+    assert check.n_rejected == 0
+    assert np.isnan(check.columns["Cholesterol"][0])
+
+
+def test_missing_column_rejects_every_row(patients):
+    check = validation.validate(patients.head(4).drop(columns=["ST_Slope"]))
+    assert check.n_valid == 0
+    assert check.counts() == {("ST_Slope", "columna ausente"): 4}
+
+
+def test_numeric_text_and_extra_columns_pass(patients):
+    data = patients.head(3).astype({"Age": object}).assign(Notas="sin cambios")
+    data["Age"] = data["Age"].astype(str)          # "54": número como texto (ej. CSV sin tipos)
+    check = validation.validate(data)
+    assert check.n_rejected == 0
+    assert check.columns["Age"].dtype == np.float64
+    np.testing.assert_array_equal(check.columns["Age"], patients["Age"].head(3).to_numpy(dtype=np.float64))
+    assert list(check.columns["Notas"]) == ["sin cambios"] * 3
+
+
+def test_each_bad_row_counts_once(patients):
+    data = patients.head(4).astype({"Age": object}).copy()
+    data.loc[1, "Age"] = 10
+    data.loc[1, "Sex"] = None
+    data.loc[2, "Sex"] = "X"
+    check = validation.validate(data)
+    assert check.n_rejected == 2
+    assert [(r["fila"], r["columna"], r["motivo"]) for r in check.records()][:2] == \
+        [(1, "Age", "fuera de rango [20, 90]"), (1, "Sex", "valor vacío")]
+    assert len(check.records(limit=1)) == 1
+    assert check.counts()[("Sex", "valor vacío")] == 1
+
+
+def test_single_patient_is_normalized(patients):
+    patient = dict(patients.iloc[0].to_dict(), Cholesterol=0, Age="61")
+    check = validation.validate(patient)
+    assert check.n_rows == 1 and check.n_rejected == 0
+    normalized = check.patient()
+    assert normalized["Age"] == 61.0 and np.isnan(normalized["Cholesterol"])
+    assert normalized["Sex"] == patient["Sex"] and isinstance(normalized["Sex"], str)
+
+
+def test_partial_failure_scores_only_valid_rows(engine, patients):
+    data = patients.head(30).astype({"Age": object}).copy()
+    data.loc[[4, 20], "Age"] = "abc"
+    check = validation.validate(data)
+    result = engine.predict_many(check.valid_columns())
+    expected = engine.predict_many(patients.head(30).drop(index=[4, 20]))
+    assert len(result) == 28
+    np.testing.assert_array_equal(result["probability"], expected["probability"])